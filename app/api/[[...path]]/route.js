@@ -1,27 +1,223 @@
 import { NextResponse } from 'next/server'
 import { supabase } from '@/lib/supabase'
-import { toDbFormat, fromDbFormat } from '@/lib/dbCase'
+import { WriteBehindBuffer } from '@/lib/write-behind'
+import { getSupabaseFetchStats } from '@/lib/supabase-fetch'
+import { getIdempotencyKey, idempotentId, isUniqueViolation, isValidIdempotencyKey, withIdempotency } from '@/lib/idempotency'
+import { withRouteMetrics } from '@/lib/route-metrics'
+import { saveGameProgress, validateProgressSave } from '@/lib/progress-save'
+import crypto from 'crypto'
+import { tmpdir } from 'os'
+import { join } from 'path'
 
 export const runtime = 'nodejs'
 
+// Optional write-behind mode for game_runs inserts (GAME_RUNS_WRITE_BEHIND=true):
+// runs are acknowledged after a synced journal append and inserted in batches.
+// Needs a long-lived server with a local disk, so it is refused on serverless
+// platforms where the journal and flush timer do not outlive the request.
+let gameRunsBuffer = null
+let writeBehindRefused = false
+
+function isServerless() {
+  return Boolean(process.env.VERCEL || process.env.AWS_LAMBDA_FUNCTION_NAME || process.env.NETLIFY)
+}
+
+function getGameRunsBuffer() {
+  if (process.env.GAME_RUNS_WRITE_BEHIND !== 'true') return null
+  if (isServerless()) {
+    if (!writeBehindRefused) {
+      writeBehindRefused = true
+      console.warn('GAME_RUNS_WRITE_BEHIND ignored: not supported on serverless platforms, inserting directly')
+    }
+    return null
+  }
+  if (!gameRunsBuffer) {
+    gameRunsBuffer = new WriteBehindBuffer({
+      name: 'game_runs',
+      journalDir: process.env.GAME_RUNS_JOURNAL_DIR || join(tmpdir(), 'spiread-write-behind'),
+      maxBatch: parseInt(process.env.GAME_RUNS_BATCH_SIZE) || 100,
+      flushIntervalMs: parseInt(process.env.GAME_RUNS_FLUSH_MS) || 25,
+      maxQueue: parseInt(process.env.GAME_RUNS_MAX_QUEUE) || 5000,
+      // Rows carry their id, so replaying the journal after a crash cannot duplicate runs
+      flush: async (rows) => {
+        const { error } = await supabase
+          .from('game_runs')
+          .upsert(rows, { onConflict: 'id', ignoreDuplicates: true })
+        if (error) throw error
+      }
+    })
+  }
+  return gameRunsBuffer
+}
+
+async function queueGameRun(row) {
+  const buffer = getGameRunsBuffer()
+  if (!buffer) return false
+  try {
+    return await buffer.add(row)
+  } catch (error) {
+    console.error('Error journaling game run:', error)
+    return false
+  }
+}
+
+// Create handlers for idempotent endpoints; they return { status, body }.
+// With an idempotency key the row id is derived from it, so a duplicate from
+// another instance (or after a restart) hits the primary key and we return the
+// row that already exists.
+async function createGameRun(body, idempotencyKey) {
+  const userId = body.userId || body.user_id
+  const gameRunRow = {
+    id: idempotencyKey ? idempotentId('gameRuns', userId, idempotencyKey) : crypto.randomUUID(),
+    user_id: userId,
+    game: body.game,
+    difficulty_level: body.difficultyLevel || body.difficulty_level || 1,
+    duration_ms: body.durationMs || body.duration_ms || 0,
+    score: body.score || 0,
+    metrics: body.metrics || {},
+    created_at: new Date().toISOString()
+  }
+
+  // Write-behind: acknowledge once journaled; falls through to a direct
+  // insert when disabled or when the buffer is full (backpressure)
+  if (await queueGameRun(gameRunRow)) {
+    return { status: 202, body: gameRunRow }
+  }
+
+  const { data: gameRunData, error: gameRunError } = await supabase
+    .from('game_runs')
+    .insert([gameRunRow])
+    .select()
+    .single()
+
+  if (gameRunError && idempotencyKey && isUniqueViolation(gameRunError)) {
+    const { data: existing } = await supabase
+      .from('game_runs')
+      .select()
+      .eq('id', gameRunRow.id)
+      .single()
+    if (existing) return { status: 200, body: existing }
+  }
+
+  if (gameRunError) {
+    console.error('Error creating game run:', gameRunError)
+    return { status: 500, body: { error: 'Failed to create game run' } }
+  }
+
+  return { status: 200, body: gameRunData }
+}
+
+async function createSessionSchedule(body, idempotencyKey) {
+  const userId = body.userId || body.user_id
+  const scheduleId = body.id ||
+    (idempotencyKey
+      ? `ss_${idempotentId('session_schedules', userId, idempotencyKey).replace(/-/g, '')}`
+      : `ss_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`)
+
+  const { data: scheduleData, error: scheduleError } = await supabase
+    .from('sessionSchedules')
+    .insert([{
+      id: scheduleId,
+      userId,
+      startedAt: body.startedAt || body.started_at || new Date().toISOString(),
+      template: body.template,
+      totalDurationMs: body.totalDurationMs || body.total_duration_ms || 0,
+      blocks: body.blocks || []
+    }])
+    .select()
+    .single()
+
+  if (scheduleError && isUniqueViolation(scheduleError)) {
+    const { data: existing } = await supabase
+      .from('sessionSchedules')
+      .select()
+      .eq('id', scheduleId)
+      .single()
+    if (existing) return { status: 200, body: existing }
+  }
+
+  if (scheduleError) {
+    console.error('Error creating session schedule:', scheduleError)
+    return { status: 500, body: { error: 'Failed to create session schedule' } }
+  }
+
+  return { status: 200, body: scheduleData }
+}
+
+async function saveProgressPatch(body) {
+  const validationError = validateProgressSave(body)
+  if (validationError) {
+    return { status: 400, body: { error: validationError } }
+  }
+
+  try {
+    return { status: 200, body: await saveGameProgress(body) }
+  } catch (error) {
+    console.error('Error saving progress:', error)
+    return { status: 500, body: { error: 'Failed to save progress' } }
+  }
+}
+
+// Batched offline sync (POST /api/sync) from the service worker queue:
+// { items: [{ idempotencyKey, type, payload }] } -> { results: [{ idempotencyKey, status }] }
+// Items use the same idempotency scopes as the single-item endpoints, so an
+// action retried through either path is only stored once.
+const SYNC_MAX_ITEMS = 25
+const SYNC_HANDLERS = {
+  game_run: { scope: 'gameRuns', create: createGameRun },
+  session_schedule: { scope: 'session_schedules', create: createSessionSchedule },
+  progress_save: { scope: 'progress_save', create: saveProgressPatch }
+}
+
+async function syncItem(item) {
+  const idempotencyKey = item?.idempotencyKey
+  const handler = SYNC_HANDLERS[item?.type]
+  if (!handler || !item.payload || !isValidIdempotencyKey(idempotencyKey)) {
+    return { idempotencyKey, status: 400 }
+  }
+
+  try {
+    const result = await withIdempotency(
+      handler.scope,
+      item.payload.userId || item.payload.user_id,
+      idempotencyKey,
+      () => handler.create(item.payload, idempotencyKey)
+    )
+    return { idempotencyKey, status: result.status }
+  } catch (error) {
+    console.error(`Error syncing ${item.type}:`, error)
+    return { idempotencyKey, status: 500 }
+  }
+}
+
 // Helper function to handle CORS
 function handleCors() {
   const corsHeaders = {
     'Access-Control-Allow-Origin': '*',
     'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, Idempotency-Key'
   }
   return corsHeaders
 }
 
-export async function OPTIONS() {
+// Metrics label per sub-endpoint; unknown segments share one label so
+// arbitrary paths cannot create new series
+const CATCH_ALL_ENDPOINTS = new Set(['health', 'sessions', 'documents', 'settings', 'gameRuns', 'session_schedules', 'sync'])
+
+function catchAllRoute(request, { params } = {}) {
+  const endpoint = params?.path?.[0]
+  if (!endpoint) return '/api'
+  return CATCH_ALL_ENDPOINTS.has(endpoint) ? `/api/${endpoint}` : '/api/:unknown'
+}
+
+export const OPTIONS = withRouteMetrics(catchAllRoute, async function OPTIONS() {
   return new NextResponse(null, {
     status: 200,
     headers: handleCors()
   })
-}
+})
 
-export async function GET(request, { params }) {
+export const GET = withRouteMetrics(catchAllRoute, async function GET(request, { params }) {
   const { path } = params
   const corsHeaders = handleCors()
 
@@ -38,7 +234,12 @@ export async function GET(request, { params }) {
     switch (endpoint) {
       case 'health':
         return NextResponse.json(
-          { status: 'healthy', timestamp: new Date().toISOString() },
+          {
+            status: 'healthy',
+            timestamp: new Date().toISOString(),
+            supabaseHttp: getSupabaseFetchStats(),
+            gameRunsBuffer: gameRunsBuffer?.getStats() || null
+          },
           { headers: corsHeaders }
         )
 
@@ -189,9 +390,9 @@ export async function GET(request, { params }) {
       { status: 500, headers: corsHeaders }
     )
   }
-}
+})
 
-export async function POST(request, { params }) {
+export const POST = withRouteMetrics(catchAllRoute, async function POST(request, { params }) {
   const { path } = params
   const corsHeaders = handleCors()
 
@@ -288,53 +489,38 @@ export async function POST(request, { params }) {
         return NextResponse.json(settingsData, { headers: corsHeaders })
 
       case 'gameRuns':
-        const { data: gameRunData, error: gameRunError } = await supabase
-          .from('game_runs')
-          .insert([{
-            user_id: body.userId || body.user_id,
-            game: body.game,
-            difficulty_level: body.difficultyLevel || body.difficulty_level || 1,
-            duration_ms: body.durationMs || body.duration_ms || 0,
-            score: body.score || 0,
-            metrics: body.metrics || {},
-            created_at: new Date().toISOString()
-          }])
-          .select()
-          .single()
-
-        if (gameRunError) {
-          console.error('Error creating game run:', gameRunError)
-          return NextResponse.json(
-            { error: 'Failed to create game run' },
-            { status: 500, headers: corsHeaders }
-          )
-        }
-
-        return NextResponse.json(gameRunData, { headers: corsHeaders })
+      case 'session_schedules': {
+        // Retries with the same Idempotency-Key replay the original response
+        const idempotencyKey = getIdempotencyKey(request)
+        const create = endpoint === 'gameRuns' ? createGameRun : createSessionSchedule
+        const result = await withIdempotency(
+          endpoint,
+          body.userId || body.user_id,
+          idempotencyKey,
+          () => create(body, idempotencyKey)
+        )
 
-      case 'session_schedules':
-        const { data: scheduleData, error: scheduleError } = await supabase
-          .from('sessionSchedules')
-          .insert([{
-            id: body.id || `ss_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
-            userId: body.userId || body.user_id,
-            startedAt: body.startedAt || body.started_at || new Date().toISOString(),
-            template: body.template,
-            totalDurationMs: body.totalDurationMs || body.total_duration_ms || 0,
-            blocks: body.blocks || []
-          }])
-          .select()
-          .single()
+        return NextResponse.json(result.body, {
+          status: result.status,
+          headers: result.replayed ? { ...corsHeaders, 'Idempotent-Replayed': 'true' } : corsHeaders
+        })
+      }
 
-        if (scheduleError) {
-          console.error('Error creating session schedule:', scheduleError)
+      case 'sync': {
+        const items = Array.isArray(body.items) ? body.items : []
+        if (items.length === 0 || items.length > SYNC_MAX_ITEMS) {
           return NextResponse.json(
-            { error: 'Failed to create session schedule' },
-            { status: 500, headers: corsHeaders }
+            { error: `items must be an array of 1-${SYNC_MAX_ITEMS} actions` },
+            { status: 400, headers: corsHeaders }
           )
         }
 
-        return NextResponse.json(scheduleData, { headers: corsHeaders })
+        // One at a time: a batch costs one rate-limit token, so it must not
+        // fan out into 25 concurrent writes (and saves apply in queue order)
+        const results = []
+        for (const item of items) results.push(await syncItem(item))
+        return NextResponse.json({ results }, { headers: corsHeaders })
+      }
 
       default:
         return NextResponse.json(
@@ -349,4 +535,4 @@ export async function POST(request, { params }) {
       { status: 500, headers: corsHeaders }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,8 +1,9 @@
 import { NextResponse } from 'next/server';
+import { withRouteMetrics } from '@/lib/route-metrics';
 
 export const runtime = 'nodejs';
 
-export async function GET() {
+export const GET = withRouteMetrics('/api/ai/health', async function GET() {
   try {
     // Determine AI provider based on environment variables
     const openAiKey = process.env.OPENAI_API_KEY;
@@ -72,9 +73,9 @@ export async function GET() {
       }
     );
   }
-}
+});
 
-export async function OPTIONS() {
+export const OPTIONS = withRouteMetrics('/api/ai/health', async function OPTIONS() {
   return NextResponse.json(
     {},
     {
@@ -86,4 +87,4 @@ export async function OPTIONS() {
       }
     }
   );
-}
\ No newline at end of file
+});
\ No newline at end of file
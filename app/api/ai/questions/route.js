@@ -1,9 +1,18 @@
 import { NextResponse } from 'next/server';
 import { z } from 'zod';
-import crypto from 'crypto';
 import getOpenAI from '@/lib/openai';
-import { supabase } from '@/lib/supabase';
-import { toDbFormat, fromDbFormat } from '@/lib/dbCase';
+import { getChunkIndex, selectChunks } from '@/lib/chunk-index';
+import { singleFlight } from '@/lib/single-flight';
+import {
+  checkAndUpdateQuota,
+  getClientKey,
+  updateTokenUsage,
+  generateHash,
+  checkCache,
+  saveToCache
+} from '@/lib/ai-utils';
+import { sseResponse, createJsonArrayItemParser } from '@/lib/ai-stream';
+import { withRouteMetrics } from '@/lib/route-metrics';
 
 export const runtime = 'nodejs';
 
@@ -37,10 +46,11 @@ const RequestSchema = z.object({
   docId: z.string().min(1, 'Document ID is required'),
   locale: z.enum(['es', 'en']).default('es'),
   n: z.number().int().min(3).max(5).default(5),
-  userId: z.string().optional().default('anonymous')
+  userId: z.string().optional().default('anonymous'),
+  stream: z.boolean().optional().default(false)
 });
 
-export async function POST(request) {
+export const POST = withRouteMetrics('/api/ai/questions', async function POST(request) {
   try {
     // Parse and validate request
     const body = await request.json();
@@ -53,7 +63,7 @@ export async function POST(request) {
       );
     }
     
-    const { docId, locale, n, userId } = validationResult.data;
+    const { docId, locale, n, userId, stream } = validationResult.data;
     
     // Check if AI is enabled
     const aiEnabled = process.env.AI_ENABLED === 'true';
@@ -74,7 +84,7 @@ export async function POST(request) {
     }
     
     // Check user quota
-    const quotaCheck = await checkAndUpdateQuota(userId, 'questions');
+    const quotaCheck = await checkAndUpdateQuota(userId, 'questions', { clientKey: getClientKey(request) });
     if (!quotaCheck.allowed) {
       const fallbackQuestions = generateLocalQuestions(docId, locale, n);
       return NextResponse.json({
@@ -94,18 +104,19 @@ export async function POST(request) {
     // For MVP, use sample text - in production, fetch from documents table
     const sampleText = getSampleText(locale);
     
-    // Chunk text (1-2k tokens per chunk) and normalize for stable indexes
-    const { chunks, normalizedText } = chunkText(sampleText, 1500);
-    const selectedChunks = selectRelevantChunks(chunks, n);
-    const chunkIds = selectedChunks.map((_, i) => `chunk_${i}`);
+    // Chunk index (normalized, tokenized, BM25 stats) is built once per document text
+    const chunkIndex = getChunkIndex(docId, sampleText, { maxChunkSize: 1500 });
+    const { normalizedText } = chunkIndex;
+    const selectedChunks = selectRelevantChunks(chunkIndex, n);
+    const chunkIds = selectedChunks.map(chunk => chunk.id);
     
-    // Generate cache key
-    const promptVersion = 'v2'; // Increment when prompts change
+    // Generate cache key (chunk IDs are content-addressed)
+    const promptVersion = 'v3'; // Increment when prompts or chunk selection change
     const cacheInput = `${docId}_questions_${locale}_${n}_${promptVersion}_${chunkIds.join('_')}`;
     const cacheHash = generateHash(cacheInput);
     
-    // Check cache
-    const cachedResult = await checkCache(cacheHash, 'questions');
+    // Check cache (in-process tier, then Supabase)
+    const cachedResult = await checkCache(cacheInput, 'questions');
     if (cachedResult) {
       try {
         const parsed = JSON.parse(cachedResult);
@@ -140,7 +151,7 @@ export async function POST(request) {
     }
     
     // Prepare text for processing
-    const textToProcess = selectedChunks.join('\n\n');
+    const textToProcess = selectedChunks.map(chunk => chunk.text).join('\n\n');
     
     // Generate questions using OpenAI with structured outputs
     const systemPrompt = locale === 'es' 
@@ -177,9 +188,11 @@ For each question:
 
 Respond ONLY with the requested JSON, no additional text.`;
 
-    try {
+    // Concurrent requests for the same document share one upstream call.
+    // onItem (streaming leader only) receives each question as soon as it parses.
+    const generate = (onItem) => singleFlight(cacheHash, async () => {
       const openai = getOpenAI();
-      const completion = await openai.chat.completions.create({
+      const completionRequest = {
         model: "gpt-4o-mini",
         messages: [
           { role: "system", content: systemPrompt },
@@ -188,15 +201,42 @@ Respond ONLY with the requested JSON, no additional text.`;
         max_tokens: 1500,
         temperature: 0.3,
         response_format: { type: "json_object" }
-      });
+      };
       
-      const aiResponse = completion.choices[0].message.content.trim();
-      const tokenCount = completion.usage?.total_tokens || 0;
+      let aiResponse = '';
+      let tokenCount = 0;
+      
+      if (onItem) {
+        let emitted = 0;
+        const parser = createJsonArrayItemParser(['items', 'questions'], (item) => {
+          if (emitted < n) {
+            onItem(validateQuestionItem(item, emitted, normalizedText));
+            emitted++;
+          }
+        });
+        const completionStream = await openai.chat.completions.create({
+          ...completionRequest,
+          stream: true,
+          stream_options: { include_usage: true }
+        });
+        for await (const chunk of completionStream) {
+          const delta = chunk.choices?.[0]?.delta?.content || '';
+          if (delta) {
+            aiResponse += delta;
+            parser.push(delta);
+          }
+          if (chunk.usage) tokenCount = chunk.usage.total_tokens || 0;
+        }
+      } else {
+        const completion = await openai.chat.completions.create(completionRequest);
+        aiResponse = completion.choices[0].message.content;
+        tokenCount = completion.usage?.total_tokens || 0;
+      }
       
       // Parse and validate AI response
       let questionsData;
       try {
-        questionsData = JSON.parse(aiResponse);
+        questionsData = JSON.parse(aiResponse.trim());
       } catch (parseError) {
         console.error('Failed to parse AI response as JSON:', parseError);
         throw new Error('Invalid JSON response from AI');
@@ -205,40 +245,74 @@ Respond ONLY with the requested JSON, no additional text.`;
       // Validate response structure and pass normalized text for evidence validation
       const validatedResponse = validateAndFixQuestions(questionsData, n, docId, locale, chunkIds, normalizedText);
       
-      // Save to cache
+      // Save the fully assembled result to cache
       const cacheData = {
         items: validatedResponse.items,
         meta: validatedResponse.meta
       };
-      await saveToCache(cacheHash, JSON.stringify(cacheData), 'questions', tokenCount);
+      await saveToCache(cacheInput, JSON.stringify(cacheData), 'questions', tokenCount, 'v2');
       
-      // Update token usage
-      await updateTokenUsage(userId, tokenCount);
+      return { cacheData, tokenCount };
+    }, { timeoutMs: 20000, maxWaiters: 200 });
+    
+    const complete = async ({ value: generated, shared }) => {
+      const { cacheData, tokenCount } = generated;
       
-      return NextResponse.json({
+      // Only the request that made the upstream call is charged the tokens
+      if (!shared) {
+        await updateTokenUsage(userId, tokenCount);
+      }
+      
+      return {
         ...cacheData,
         cached: false,
-        tokenCount,
+        coalesced: shared,
+        tokenCount: shared ? 0 : tokenCount,
         provider
+      };
+    };
+    
+    const fallbackResult = () => ({
+      items: generateLocalQuestions(docId, locale, n),
+      meta: {
+        docId,
+        locale,
+        chunkIds: ['fallback'],
+        model: 'local'
+      },
+      cached: false,
+      fallback: true,
+      message: 'AI service error, using local fallback'
+    });
+    
+    // Streaming mode: `item` events as questions become valid, then `done`
+    // with the full result (the same payload the JSON response would carry)
+    if (stream) {
+      return sseResponse(async (send) => {
+        let streamed = 0;
+        try {
+          const flight = await generate((item) => send('item', { index: streamed++, item }));
+          const result = await complete(flight);
+          
+          // Coalesced requests did not see the leader's stream
+          if (flight.shared) {
+            result.items.forEach((item, index) => send('item', { index, item }));
+          }
+          send('done', result);
+        } catch (aiError) {
+          console.error('AI service error:', aiError);
+          send('done', fallbackResult());
+        }
       });
-      
+    }
+    
+    try {
+      return NextResponse.json(await complete(await generate()));
     } catch (aiError) {
       console.error('AI service error:', aiError);
       
       // Fallback to local questions
-      const fallbackQuestions = generateLocalQuestions(docId, locale, n);
-      return NextResponse.json({
-        items: fallbackQuestions,
-        meta: {
-          docId,
-          locale,
-          chunkIds: ['fallback'],
-          model: 'local'
-        },
-        cached: false,
-        fallback: true,
-        message: 'AI service error, using local fallback'
-      });
+      return NextResponse.json(fallbackResult());
     }
     
   } catch (error) {
@@ -248,18 +322,19 @@ Respond ONLY with the requested JSON, no additional text.`;
       { status: 500 }
     );
   }
-}
+});
 
-export async function GET() {
+export const GET = withRouteMetrics('/api/ai/questions', async function GET() {
   return NextResponse.json({ 
     message: 'AI Questions endpoint is working',
-    usage: 'POST with { docId, locale?, n?, userId? }',
+    usage: 'POST with { docId, locale?, n?, userId?, stream? }',
     schema: {
       request: {
         docId: 'string',
         locale: 'es|en',
         n: 'number (1-10)',
-        userId: 'string (optional)'
+        userId: 'string (optional)',
+        stream: 'boolean (optional) - text/event-stream of item events, then done'
       },
       response: {
         items: 'Array<Question>',
@@ -267,208 +342,14 @@ export async function GET() {
       }
     }
   });
-}
+});
 
 // Helper functions
 
-function generateHash(input) {
-  return crypto.createHash('sha256').update(input).digest('hex');
-}
-
-async function checkAndUpdateQuota(userId, requestType) {
-  try {
-    const today = new Date().toISOString().split('T')[0];
-    const currentMonth = new Date().toISOString().slice(0, 7); // YYYY-MM
-    const maxCalls = parseInt(process.env.AI_MAX_CALLS_PER_DAY || '10');
-    const maxTokens = parseInt(process.env.AI_MAX_TOKENS_PER_MONTH || '100000');
-    
-    // Get current usage for today
-    const { data: dailyUsage, error: dailyError } = await supabase
-      .from('ai_usage')
-      .select('*')
-      .eq('user_id', userId)
-      .eq('period_start', today)
-      .single();
-    
-    if (dailyError && dailyError.code !== 'PGRST116') {
-      console.error('Error checking daily quota:', dailyError);
-    }
-    
-    // Check daily quota
-    if (dailyUsage && dailyUsage.calls_used >= maxCalls) {
-      return { allowed: false, remaining: 0, reason: 'Daily calls limit exceeded' };
-    }
-    
-    // Get monthly token usage
-    const { data: monthlyUsages, error: monthlyError } = await supabase
-      .from('ai_usage')
-      .select('tokens_used')
-      .eq('user_id', userId)
-      .gte('period_start', `${currentMonth}-01`)
-      .lt('period_start', `${new Date(new Date().getFullYear(), new Date().getMonth() + 1, 1).toISOString().split('T')[0]}`);
-    
-    if (monthlyError) {
-      console.error('Error checking monthly quota:', monthlyError);
-    }
-    
-    const monthlyTokens = monthlyUsages?.reduce((sum, usage) => sum + (usage.tokens_used || 0), 0) || 0;
-    
-    if (monthlyTokens >= maxTokens) {
-      return { allowed: false, remaining: 0, reason: 'Monthly tokens limit exceeded' };
-    }
-    
-    // If no daily usage record, create one
-    if (!dailyUsage) {
-      const { error: insertError } = await supabase
-        .from('ai_usage')
-        .insert({
-          user_id: userId,
-          period_start: today,
-          calls_used: 1,
-          tokens_used: 0
-        });
-      
-      if (insertError) {
-        console.error('Error creating usage record:', insertError);
-      }
-      
-      return { allowed: true, remaining: maxCalls - 1 };
-    }
-    
-    // Update daily usage
-    const { error: updateError } = await supabase
-      .from('ai_usage')
-      .update({
-        calls_used: dailyUsage.calls_used + 1,
-        updated_at: new Date().toISOString()
-      })
-      .eq('user_id', userId)
-      .eq('period_start', today);
-    
-    if (updateError) {
-      console.error('Error updating daily quota:', updateError);
-    }
-    
-    return { allowed: true, remaining: maxCalls - (dailyUsage.calls_used + 1) };
-    
-  } catch (error) {
-    console.error('Quota check error:', error);
-    return { allowed: true, remaining: 5 }; // Default fallback
-  }
-}
-
-async function checkCache(cacheHash, requestType) {
-  try {
-    const { data, error } = await supabase
-      .from('ai_cache')
-      .select('output_text')
-      .eq('input_hash', cacheHash)
-      .eq('request_type', requestType)
-      .single();
-    
-    if (error && error.code !== 'PGRST116') {
-      console.error('Error checking cache:', error);
-      return null;
-    }
-    
-    if (data) {
-      // Update access count
-      await supabase
-        .from('ai_cache')
-        .update({
-          access_count: supabase.sql`access_count + 1`,
-          last_accessed_at: new Date().toISOString()
-        })
-        .eq('input_hash', cacheHash)
-        .eq('request_type', requestType);
-      
-      return data.output_text;
-    }
-    
-    return null;
-  } catch (error) {
-    console.error('Cache check error:', error);
-    return null;
-  }
-}
-
-async function saveToCache(cacheHash, outputText, requestType, tokenCount) {
-  try {
-    const { error } = await supabase
-      .from('ai_cache')
-      .insert({
-        cache_key: `questions_${Date.now()}`,
-        input_hash: cacheHash,
-        output_text: outputText,
-        request_type: requestType,
-        token_count: tokenCount,
-        ver: 'v2'
-      });
-    
-    if (error) {
-      console.error('Error saving to cache:', error);
-    }
-  } catch (error) {
-    console.error('Cache save error:', error);
-  }
-}
-
-async function updateTokenUsage(userId, tokens) {
-  try {
-    const today = new Date().toISOString().split('T')[0];
-    
-    const { error } = await supabase
-      .from('ai_usage')
-      .update({
-        tokens_used: supabase.sql`tokens_used + ${tokens}`,
-        updated_at: new Date().toISOString()
-      })
-      .eq('user_id', userId)
-      .eq('period_start', today);
-    
-    if (error) {
-      console.error('Error updating token usage:', error);
-    }
-  } catch (error) {
-    console.error('Token usage update error:', error);
-  }
-}
-
-function normalizeText(text) {
-  // Normalize whitespace to ensure stable character indexes
-  return text
-    .replace(/\s+/g, ' ')  // Replace multiple whitespace with single space
-    .replace(/\n\s*\n/g, '\n')  // Replace multiple newlines with single newline
-    .trim();
-}
-
-function chunkText(text, maxChunkSize = 1500) {
-  // Normalize text before chunking to ensure stable indexes
-  const normalizedText = normalizeText(text);
-  const sentences = normalizedText.split(/[.!?]+/).filter(s => s.trim().length > 10);
-  const chunks = [];
-  let currentChunk = '';
-  
-  for (const sentence of sentences) {
-    if (currentChunk.length + sentence.length > maxChunkSize && currentChunk.length > 0) {
-      chunks.push(currentChunk.trim());
-      currentChunk = sentence;
-    } else {
-      currentChunk += (currentChunk ? '. ' : '') + sentence;
-    }
-  }
-  
-  if (currentChunk.trim()) {
-    chunks.push(currentChunk.trim());
-  }
-  
-  return { chunks, normalizedText };
-}
-
-function selectRelevantChunks(chunks, n) {
-  // For MVP, select first 1-3 chunks based on question count
+function selectRelevantChunks(chunkIndex, n) {
+  // 1-3 chunks based on question count, spread across the document
   const numChunks = Math.min(3, Math.max(1, Math.ceil(n / 3)));
-  return chunks.slice(0, numChunks);
+  return selectChunks(chunkIndex, numChunks);
 }
 
 function getSampleText(locale) {
@@ -489,56 +370,56 @@ Visual attention exercises like Schulte tables help expand peripheral visual fie
   return texts[locale] || texts.es;
 }
 
+function validateQuestionItem(item, i, normalizedText = '') {
+  // Validate evidence indexes against normalized text
+  let evidenceQuote = item.evidence?.quote || item.quote || 'Cita del texto';
+  let charStart = item.evidence?.charStart || item.charStart || 0;
+  let charEnd = item.evidence?.charEnd || item.charEnd || 50;
+  
+  // If normalized text is available, validate and adjust evidence indexes
+  if (normalizedText && evidenceQuote) {
+    const quoteInText = normalizedText.indexOf(evidenceQuote);
+    if (quoteInText !== -1) {
+      charStart = quoteInText;
+      charEnd = quoteInText + evidenceQuote.length;
+    } else {
+      // If exact quote not found, try to find a similar portion
+      const words = evidenceQuote.split(' ').slice(0, 5).join(' ');
+      const partialMatch = normalizedText.indexOf(words);
+      if (partialMatch !== -1) {
+        charStart = partialMatch;
+        charEnd = Math.min(partialMatch + evidenceQuote.length, normalizedText.length);
+        evidenceQuote = normalizedText.substring(charStart, charEnd);
+      }
+    }
+  }
+  
+  return {
+    qid: item.qid || `q_${i + 1}`,
+    type: ['main_idea', 'detail', 'inference', 'vocab'].includes(item.type) ? item.type : 'detail',
+    q: item.q || item.question || `Pregunta ${i + 1}`,
+    choices: Array.isArray(item.choices) && item.choices.length >= 4 
+      ? item.choices.slice(0, 4) 
+      : ['Opción A', 'Opción B', 'Opción C', 'Opción D'],
+    correctIndex: typeof item.correctIndex === 'number' && item.correctIndex >= 0 && item.correctIndex <= 3 
+      ? item.correctIndex 
+      : 0,
+    explain: item.explain || item.explanation || 'Explicación basada en el texto',
+    evidence: {
+      quote: evidenceQuote,
+      charStart: Math.max(0, charStart),
+      charEnd: Math.min(charEnd, normalizedText.length || charEnd + 100)
+    }
+  };
+}
+
 function validateAndFixQuestions(questionsData, n, docId, locale, chunkIds, normalizedText = '') {
   try {
     const items = questionsData.items || questionsData.questions || [];
     const validatedItems = [];
     
     for (let i = 0; i < Math.min(n, items.length); i++) {
-      const item = items[i];
-      
-      // Validate evidence indexes against normalized text
-      let evidenceQuote = item.evidence?.quote || item.quote || 'Cita del texto';
-      let charStart = item.evidence?.charStart || item.charStart || 0;
-      let charEnd = item.evidence?.charEnd || item.charEnd || 50;
-      
-      // If normalized text is available, validate and adjust evidence indexes
-      if (normalizedText && evidenceQuote) {
-        const quoteInText = normalizedText.indexOf(evidenceQuote);
-        if (quoteInText !== -1) {
-          charStart = quoteInText;
-          charEnd = quoteInText + evidenceQuote.length;
-        } else {
-          // If exact quote not found, try to find a similar portion
-          const words = evidenceQuote.split(' ').slice(0, 5).join(' ');
-          const partialMatch = normalizedText.indexOf(words);
-          if (partialMatch !== -1) {
-            charStart = partialMatch;
-            charEnd = Math.min(partialMatch + evidenceQuote.length, normalizedText.length);
-            evidenceQuote = normalizedText.substring(charStart, charEnd);
-          }
-        }
-      }
-      
-      const validatedItem = {
-        qid: item.qid || `q_${i + 1}`,
-        type: ['main_idea', 'detail', 'inference', 'vocab'].includes(item.type) ? item.type : 'detail',
-        q: item.q || item.question || `Pregunta ${i + 1}`,
-        choices: Array.isArray(item.choices) && item.choices.length >= 4 
-          ? item.choices.slice(0, 4) 
-          : ['Opción A', 'Opción B', 'Opción C', 'Opción D'],
-        correctIndex: typeof item.correctIndex === 'number' && item.correctIndex >= 0 && item.correctIndex <= 3 
-          ? item.correctIndex 
-          : 0,
-        explain: item.explain || item.explanation || 'Explicación basada en el texto',
-        evidence: {
-          quote: evidenceQuote,
-          charStart: Math.max(0, charStart),
-          charEnd: Math.min(charEnd, normalizedText.length || charEnd + 100)
-        }
-      };
-      
-      validatedItems.push(validatedItem);
+      validatedItems.push(validateQuestionItem(items[i], i, normalizedText));
     }
     
     return {
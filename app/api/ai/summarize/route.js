@@ -3,21 +3,30 @@ import { z } from 'zod';
 import getOpenAI from '@/lib/openai';
 import { 
   checkAndUpdateQuota, 
+  getClientKey,
   checkCache, 
   saveToCache, 
   updateTokenUsage,
   chunkText,
+  generateHash,
   generateLocalSummary
 } from '@/lib/ai-utils';
+import { singleFlight } from '@/lib/single-flight';
+import { sseResponse, createLineParser } from '@/lib/ai-stream';
+import { withRouteMetrics } from '@/lib/route-metrics';
 
 // Input validation schema
 const SummarizeSchema = z.object({
   docId: z.string().min(1, 'Document ID is required'),
   locale: z.enum(['es', 'en']).default('es'),
-  userId: z.string().optional().default('anonymous')
+  userId: z.string().optional().default('anonymous'),
+  stream: z.boolean().optional().default(false)
 });
 
-export async function POST(request) {
+// Bullet lines in the model output
+const isBullet = (line) => line.includes('•') || line.includes('-');
+
+export const POST = withRouteMetrics('/api/ai/summarize', async function POST(request) {
   try {
     // Parse and validate request body
     const body = await request.json();
@@ -30,13 +39,13 @@ export async function POST(request) {
       );
     }
     
-    const { docId, locale, userId } = validationResult.data;
+    const { docId, locale, userId, stream } = validationResult.data;
     
     // For MVP, we'll use a simple text extraction. In production, you'd fetch from your documents table
     const sampleText = "La lectura rápida es una habilidad que puede transformar tu productividad y capacidad de aprendizaje. Muchas personas leen a una velocidad promedio de 200-250 palabras por minuto, pero con entrenamiento adecuado es posible alcanzar velocidades de 500-800 palabras por minuto sin sacrificar la comprensión. El método RSVP presenta las palabras de manera secuencial en el mismo lugar, eliminando los movimientos oculares innecesarios que ralentizan la lectura tradicional.";
     
     // Check user quota
-    const quotaCheck = await checkAndUpdateQuota(userId, 'summarize');
+    const quotaCheck = await checkAndUpdateQuota(userId, 'summarize', { clientKey: getClientKey(request) });
     if (!quotaCheck.allowed) {
       // Use local fallback when quota exceeded
       const localSummary = generateLocalSummary(sampleText);
@@ -69,51 +78,123 @@ export async function POST(request) {
     const chunks = chunkText(sampleText, 1500);
     const textToProcess = chunks[0]; // For MVP, process first chunk
     
-    // Call OpenAI API
-    const openai = getOpenAI();
-    const completion = await openai.chat.completions.create({
-      model: "gpt-4o-mini",
-      messages: [
-        {
-          role: "system",
-          content: locale === 'es' 
-            ? "Eres un experto en resumir textos. Crea un resumen conciso con 3 puntos clave en formato de viñetas y un abstract breve. Responde en español."
-            : "You are an expert text summarizer. Create a concise summary with 3 key bullet points and a brief abstract. Respond in English."
-        },
-        {
-          role: "user",
-          content: textToProcess
+    // Concurrent requests for the same document share one upstream call.
+    // onBullet (streaming leader only) receives each bullet line as it completes.
+    const generate = (onBullet) => singleFlight(generateHash(cacheKey), async () => {
+      // Call OpenAI API
+      const openai = getOpenAI();
+      const completionRequest = {
+        model: "gpt-4o-mini",
+        messages: [
+          {
+            role: "system",
+            content: locale === 'es' 
+              ? "Eres un experto en resumir textos. Crea un resumen conciso con 3 puntos clave en formato de viñetas y un abstract breve. Responde en español."
+              : "You are an expert text summarizer. Create a concise summary with 3 key bullet points and a brief abstract. Respond in English."
+          },
+          {
+            role: "user",
+            content: textToProcess
+          }
+        ],
+        max_tokens: 300,
+        temperature: 0.3,
+      };
+      
+      let summary = '';
+      let tokenCount = 0;
+      
+      if (onBullet) {
+        let emitted = 0;
+        const lines = createLineParser((line) => {
+          if (line.trim() && isBullet(line) && emitted < 3) {
+            onBullet(line.trim());
+            emitted++;
+          }
+        });
+        const completionStream = await openai.chat.completions.create({
+          ...completionRequest,
+          stream: true,
+          stream_options: { include_usage: true }
+        });
+        for await (const chunk of completionStream) {
+          const delta = chunk.choices?.[0]?.delta?.content || '';
+          if (delta) {
+            summary += delta;
+            lines.push(delta);
+          }
+          if (chunk.usage) tokenCount = chunk.usage.total_tokens || 0;
         }
-      ],
-      max_tokens: 300,
-      temperature: 0.3,
-    });
-    
-    const summary = completion.choices[0].message.content.trim();
-    const tokenCount = completion.usage?.total_tokens || 0;
-    
-    // Parse the response to extract bullets and abstract
-    const lines = summary.split('\n').filter(line => line.trim());
-    const bullets = lines.filter(line => line.includes('•') || line.includes('-')).slice(0, 3);
-    const abstract = bullets.join(' ').replace(/[•\-]/g, '').trim();
+        lines.flush();
+      } else {
+        const completion = await openai.chat.completions.create(completionRequest);
+        summary = completion.choices[0].message.content;
+        tokenCount = completion.usage?.total_tokens || 0;
+      }
+      summary = summary.trim();
+      
+      // Parse the response to extract bullets and abstract
+      const lines = summary.split('\n').filter(line => line.trim());
+      const bullets = lines.filter(isBullet).slice(0, 3).map(line => line.trim());
+      const abstract = bullets.join(' ').replace(/[•\-]/g, '').trim();
+      
+      const result = {
+        bullets: bullets.length > 0 ? bullets : [summary],
+        abstract: abstract || summary
+      };
+      
+      // Save the fully assembled result to cache
+      await saveToCache(cacheKey, JSON.stringify(result), 'summarize', tokenCount);
+      
+      return { result, tokenCount };
+    }, { timeoutMs: 20000, maxWaiters: 200 });
     
-    const result = {
-      bullets: bullets.length > 0 ? bullets : [summary],
-      abstract: abstract || summary
+    const complete = async ({ value: generated, shared }) => {
+      const { result, tokenCount } = generated;
+      
+      // Only the request that made the upstream call is charged the tokens
+      if (!shared) {
+        await updateTokenUsage(userId, tokenCount);
+      }
+      
+      return {
+        bullets: result.bullets,
+        abstract: result.abstract,
+        cached: false,
+        coalesced: shared,
+        tokenCount: shared ? 0 : tokenCount
+      };
     };
     
-    // Save to cache
-    await saveToCache(cacheKey, JSON.stringify(result), 'summarize', tokenCount);
-    
-    // Update token usage
-    await updateTokenUsage(userId, tokenCount);
+    // Streaming mode: `bullet` events as lines complete, then `done` with
+    // the full result (the same payload the JSON response would carry)
+    if (stream) {
+      return sseResponse(async (send) => {
+        let streamed = 0;
+        try {
+          const flight = await generate((bullet) => send('bullet', { index: streamed++, bullet }));
+          const result = await complete(flight);
+          
+          // Coalesced requests did not see the leader's stream
+          if (flight.shared) {
+            result.bullets.forEach((bullet, index) => send('bullet', { index, bullet }));
+          }
+          send('done', result);
+        } catch (aiError) {
+          console.error('Summarization error:', aiError);
+          const localSummary = generateLocalSummary(sampleText);
+          send('done', {
+            bullets: localSummary.bullets,
+            abstract: localSummary.abstract,
+            cached: false,
+            fallback: true,
+            message: 'Error en AI, usando resumen local.'
+          });
+        }
+      });
+    }
     
-    return NextResponse.json({
-      bullets: result.bullets,
-      abstract: result.abstract,
-      cached: false,
-      tokenCount
-    });
+    return NextResponse.json(await complete(await generate()));
     
   } catch (error) {
     console.error('Summarization error:', error);
@@ -135,11 +216,11 @@ export async function POST(request) {
       );
     }
   }
-}
+});
 
-export async function GET() {
+export const GET = withRouteMetrics('/api/ai/summarize', async function GET() {
   return NextResponse.json({ 
     message: 'AI Summarize endpoint is working',
-    usage: 'POST with { docId, locale?, userId? }'
+    usage: 'POST with { docId, locale?, userId?, stream? }'
   });
-}
\ No newline at end of file
+});
\ No newline at end of file
@@ -1,11 +1,12 @@
 import { NextResponse } from 'next/server'
+import { withRouteMetrics } from '@/lib/route-metrics'
 
 /**
  * Analytics Testing Endpoint
  * Test analytics tracking and consent functionality
  */
 
-export async function GET(request) {
+export const GET = withRouteMetrics('/api/analytics/test', async function GET(request) {
   try {
     const url = new URL(request.url)
     const testType = url.searchParams.get('type') || 'status'
@@ -68,9 +69,9 @@ export async function GET(request) {
       status: 500 
     })
   }
-}
+})
 
-export async function POST(request) {
+export const POST = withRouteMetrics('/api/analytics/test', async function POST(request) {
   try {
     const body = await request.json()
     const action = body.action
@@ -107,4 +108,4 @@ export async function POST(request) {
       details: error.message
     }, { status: 400 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -0,0 +1,35 @@
+import { renderPrometheus, withRouteMetrics } from '@/lib/route-metrics'
+import crypto from 'crypto'
+
+/**
+ * Prometheus scrape endpoint
+ * Per-route request counts, status classes and latency histograms for this
+ * server instance (see lib/route-metrics.js)
+ * Access: /api/metrics with `Authorization: Bearer $METRICS_TOKEN`. Without
+ * METRICS_TOKEN the route is open in development and disabled in production.
+ */
+
+export const runtime = 'nodejs'
+
+export const GET = withRouteMetrics('/api/metrics', async function GET(request) {
+  const token = process.env.METRICS_TOKEN
+  if (!token && process.env.NODE_ENV === 'production') {
+    return new Response('Not found\n', { status: 404 })
+  }
+  if (token && !isAuthorized(request.headers.get('authorization'), token)) {
+    return new Response('Unauthorized\n', { status: 401 })
+  }
+
+  return new Response(renderPrometheus(), {
+    headers: {
+      'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+      'Cache-Control': 'no-store'
+    }
+  })
+})
+
+// Compare digests so the comparison is constant-time whatever the lengths
+function isAuthorized(header, token) {
+  const digest = value => crypto.createHash('sha256').update(value).digest()
+  return crypto.timingSafeEqual(digest(header || ''), digest(`Bearer ${token}`))
+}
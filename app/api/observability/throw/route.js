@@ -1,4 +1,5 @@
 import { NextResponse } from 'next/server'
+import { withRouteMetrics } from '@/lib/route-metrics'
 
 /**
  * Observability Test Endpoint
@@ -49,7 +50,7 @@ function captureSentryMessage(message, level = 'info', context = {}) {
   return false
 }
 
-export async function GET(request) {
+export const GET = withRouteMetrics('/api/observability/throw', async function GET(request) {
   try {
     const url = new URL(request.url)
     const testType = url.searchParams.get('type') || 'error'
@@ -172,10 +173,10 @@ export async function GET(request) {
       status: 500 
     })
   }
-}
+})
 
 // Health check for observability system
-export async function POST(request) {
+export const POST = withRouteMetrics('/api/observability/throw', async function POST(request) {
   try {
     const body = await request.json()
     const action = body.action || 'status'
@@ -238,4 +239,4 @@ export async function POST(request) {
       error: 'Invalid request body'
     }, { status: 400 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,10 +1,14 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { supabase } from '@/lib/supabase';
 import { fromDbFormat } from '@/lib/dbCase';
+import { withRouteMetrics } from '@/lib/route-metrics';
 
 export const runtime = 'nodejs';
 
-export async function GET(request: NextRequest) {
+// Game keys are interpolated into the select's JSON path
+const GAME_KEY_PATTERN = /^[a-z0-9_]{1,40}$/i;
+
+export const GET = withRouteMetrics('/api/progress/get', async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
     const userId = searchParams.get('userId');
@@ -17,10 +21,18 @@ export async function GET(request: NextRequest) {
       );
     }
 
-    // Fetch user settings with progress
+    if (game && !GAME_KEY_PATTERN.test(game)) {
+      return NextResponse.json(
+        { error: 'Invalid parameter: game' },
+        { status: 400 }
+      );
+    }
+
+    // Single game: project progress->game at the database so the cost does not
+    // grow with the number of games the user has played
     const { data, error } = await supabase
       .from('settings')
-      .select('progress')
+      .select(game ? `gameProgress:progress->${game}` : 'progress')
       .eq('user_id', userId)
       .single();
 
@@ -32,29 +44,10 @@ export async function GET(request: NextRequest) {
       );
     }
 
-    // If no settings exist, return default progress
-    if (!data || !data.progress) {
-      const defaultProgress = game ? { [game]: getDefaultProgress(game) } : {};
-      return NextResponse.json(
-        { progress: defaultProgress },
-        {
-          status: 200,
-          headers: {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type',
-          }
-        }
-      );
-    }
-
-    // Convert response to camelCase
-    const response = fromDbFormat(data);
-    const progress = response.progress || {};
-
     // If specific game requested, return only that game's progress
     if (game) {
-      const gameProgress = progress[game] || getDefaultProgress(game);
+      const stored = (data as any)?.gameProgress;
+      const gameProgress = stored ? fromDbFormat(stored) : getDefaultProgress(game);
       return NextResponse.json(
         { progress: { [game]: gameProgress } },
         {
@@ -68,6 +61,13 @@ export async function GET(request: NextRequest) {
       );
     }
 
+    // Game keys (e.g. memory_digits) are identifiers, not column names:
+    // only each game's fields are converted to camelCase
+    const progress: Record<string, any> = {};
+    for (const [key, value] of Object.entries((data as any)?.progress || {})) {
+      progress[key] = fromDbFormat(value);
+    }
+
     // Return all progress
     return NextResponse.json(
       { progress },
@@ -88,9 +88,9 @@ export async function GET(request: NextRequest) {
       { status: 500 }
     );
   }
-}
+});
 
-export async function OPTIONS() {
+export const OPTIONS = withRouteMetrics('/api/progress/get', async function OPTIONS() {
   return NextResponse.json(
     {},
     {
@@ -102,7 +102,7 @@ export async function OPTIONS() {
       }
     }
   );
-}
+});
 
 /**
  * Get default progress for a specific game
@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { supabase } from '@/lib/supabase';
-import { toDbFormat, fromDbFormat } from '@/lib/dbCase';
+import { saveGameProgress, validateProgressSave } from '@/lib/progress-save';
+import { withRouteMetrics } from '@/lib/route-metrics';
 
 export const runtime = 'nodejs';
 
@@ -12,70 +12,26 @@ interface SaveProgressRequest {
     lastBestScore: number;
     [key: string]: any;
   };
+  // Client time the progress was recorded (ms or ISO); older saves are ignored
+  updatedAt?: number | string;
 }
 
-export async function POST(request: NextRequest) {
+export const POST = withRouteMetrics('/api/progress/save', async function POST(request: NextRequest) {
   try {
     const body = await request.json() as SaveProgressRequest;
-    const { userId, game, progress } = body;
+    const { game } = body;
 
-    // Validate required fields
-    if (!userId || !game || !progress) {
-      return NextResponse.json(
-        { error: 'Missing required fields: userId, game, progress' },
-        { status: 400 }
-      );
-    }
-
-    // Validate progress structure
-    if (typeof progress.lastLevel !== 'number' || typeof progress.lastBestScore !== 'number') {
-      return NextResponse.json(
-        { error: 'Invalid progress structure. Must include lastLevel and lastBestScore as numbers' },
-        { status: 400 }
-      );
-    }
-
-    // Get current settings to preserve existing progress
-    const { data: existingSettings, error: fetchError } = await supabase
-      .from('settings')
-      .select('progress')
-      .eq('user_id', userId)
-      .single();
-
-    if (fetchError && fetchError.code !== 'PGRST116') {
-      console.error('Error fetching existing settings:', fetchError);
-      return NextResponse.json(
-        { error: 'Failed to fetch current settings' },
-        { status: 500 }
-      );
+    const validationError = validateProgressSave(body);
+    if (validationError) {
+      return NextResponse.json({ error: validationError }, { status: 400 });
     }
 
-    // Merge with existing progress
-    const currentProgress = existingSettings?.progress || {};
-    const updatedProgress = {
-      ...currentProgress,
-      [game]: {
-        ...currentProgress[game],
-        ...progress,
-        updatedAt: new Date().toISOString()
-      }
-    };
-
-    // Convert to database format
-    const dbData = toDbFormat({
-      userId,
-      progress: updatedProgress,
-      updatedAt: new Date().toISOString()
-    });
-
-    // Upsert settings record
-    const { data, error } = await supabase
-      .from('settings')
-      .upsert(dbData)
-      .select()
-      .single();
-
-    if (error) {
+    // Merge into settings.progress[game] in one statement (row-locked upsert),
+    // so concurrent saves cannot drop each other's fields
+    let response;
+    try {
+      response = await saveGameProgress(body);
+    } catch (error) {
       console.error('Error saving progress:', error);
       return NextResponse.json(
         { error: 'Failed to save progress' },
@@ -83,13 +39,10 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Convert response back to camelCase
-    const response = fromDbFormat(data);
-
     return NextResponse.json(
       { 
         success: true, 
-        progress: response.progress[game],
+        progress: response,
         message: `Progress saved for ${game}`
       },
       {
@@ -109,9 +62,9 @@ export async function POST(request: NextRequest) {
       { status: 500 }
     );
   }
-}
+});
 
-export async function OPTIONS() {
+export const OPTIONS = withRouteMetrics('/api/progress/save', async function OPTIONS() {
   return NextResponse.json(
     {},
     {
@@ -123,4 +76,4 @@ export async function OPTIONS() {
       }
     }
   );
-}
\ No newline at end of file
+});
\ No newline at end of file
@@ -1,15 +1,25 @@
 import { NextResponse } from 'next/server'
 import { getRateLimitMetrics } from '@/lib/rate-limit'
+import { withRouteMetrics } from '@/lib/route-metrics'
 
 /**
  * Rate Limit Metrics Endpoint
  * Provides monitoring data for rate limiting
- * Access: /api/rate-limit/metrics
+ * Access: /api/rate-limit/metrics?window=5m (latency window: 30s, 5m, 1h or ms; max 1h)
  */
 
-export async function GET() {
+const WINDOW_UNITS = { ms: 1, s: 1000, m: 60 * 1000, h: 60 * 60 * 1000 }
+
+function parseWindow(value) {
+  const match = /^(\d+)(ms|s|m|h)?$/.exec(value || '')
+  if (!match) return undefined
+  return parseInt(match[1], 10) * WINDOW_UNITS[match[2] || 'ms']
+}
+
+export const GET = withRouteMetrics('/api/rate-limit/metrics', async function GET(request) {
   try {
-    const metrics = getRateLimitMetrics()
+    const windowMs = parseWindow(request?.nextUrl?.searchParams.get('window'))
+    const metrics = getRateLimitMetrics(windowMs ? { windowMs } : undefined)
     
     // Calculate rates and percentages
     const totalRequests = metrics.totalRequests || 0
@@ -24,7 +34,10 @@ export async function GET() {
         totalBlocks,
         blockRatePercentage: parseFloat(blockRate),
         storeType: metrics.storeType,
-        responseTimeP95Ms: metrics.responseTimeP95
+        latencyWindowMs: metrics.windowMs,
+        responseTimeP50Ms: metrics.responseTimeP50,
+        responseTimeP95Ms: metrics.responseTimeP95,
+        responseTimeP99Ms: metrics.responseTimeP99
       },
       byEndpoint: {
         ai: {
@@ -32,6 +45,7 @@ export async function GET() {
           blocks: metrics.blocks.ai || 0,
           blockRate: metrics.hits.ai > 0 ? 
             ((metrics.blocks.ai || 0) / metrics.hits.ai * 100).toFixed(2) : 0,
+          latencyMs: metrics.latency.ai || null,
           limit: '30 requests/minute'
         },
         progress: {
@@ -39,11 +53,14 @@ export async function GET() {
           blocks: metrics.blocks.progress || 0,
           blockRate: metrics.hits.progress > 0 ? 
             ((metrics.blocks.progress || 0) / metrics.hits.progress * 100).toFixed(2) : 0,
+          latencyMs: metrics.latency.progress || null,
           limit: '120 requests/minute'
         }
       },
       health: {
         redisConnected: metrics.storeType === 'redis',
+        redisCircuit: metrics.redis?.circuit || null,
+        redisTimeouts: metrics.redis?.timeouts || 0,
         memoryFallback: metrics.storeType === 'memory'
       }
     }, {
@@ -63,10 +80,10 @@ export async function GET() {
       status: 500 
     })
   }
-}
+})
 
 // Health check for rate limiting system
-export async function POST(request) {
+export const POST = withRouteMetrics('/api/rate-limit/metrics', async function POST(request) {
   try {
     const body = await request.json()
     const action = body.action
@@ -109,4 +126,4 @@ export async function POST(request) {
       status: 400 
     })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -7,6 +7,33 @@ import { Badge } from '@/components/ui/badge'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { Brain, MessageSquare, Loader2, Sparkles, CheckCircle, XCircle, Quote } from 'lucide-react'
 
+// Read a text/event-stream response, calling onEvent(event, data) per frame
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let frameEnd
+    while ((frameEnd = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, frameEnd)
+      buffer = buffer.slice(frameEnd + 2)
+
+      const event = frame.match(/^event: (.*)$/m)?.[1] || 'message'
+      const data = frame.match(/^data: (.*)$/m)?.[1]
+      if (data) onEvent(event, JSON.parse(data))
+    }
+  }
+}
+
+// Streaming AI routes answer with SSE; cached/fallback answers stay plain JSON
+const isEventStream = (response) =>
+  (response.headers.get('content-type') || '').includes('text/event-stream')
+
 export default function AIToolsPanel({ document, userId = 'anonymous', locale = 'es' }) {
   const [loading, setLoading] = useState({ summarize: false, questions: false })
   const [results, setResults] = useState({ summary: null, questions: null })
@@ -52,13 +79,34 @@ export default function AIToolsPanel({ document, userId = 'anonymous', locale =
         body: JSON.stringify({
           docId: document.id,
           locale,
-          userId
+          userId,
+          stream: true
         })
       })
 
-      const data = await response.json()
+      let data
+      if (response.ok && isEventStream(response)) {
+        // Show bullets as they arrive; `done` carries the full result
+        setResults(prev => ({ ...prev, summary: { bullets: [], abstract: '', streaming: true } }))
+        await readEventStream(response, (event, payload) => {
+          if (event === 'bullet') {
+            setResults(prev => ({
+              ...prev,
+              summary: { ...prev.summary, bullets: [...prev.summary.bullets, payload.bullet] }
+            }))
+          } else if (event === 'done') {
+            data = payload
+          } else if (event === 'error') {
+            // Drop the partial result; the alert below shows the error
+            setResults(prev => ({ ...prev, summary: null }))
+            data = payload
+          }
+        })
+      } else {
+        data = await response.json()
+      }
       
-      if (response.ok) {
+      if (response.ok && data && !data.error) {
         setResults(prev => ({ ...prev, summary: data }))
         if (data.tokenCount && !data.cached && !data.fallback) {
           setUsage(prev => ({ 
@@ -69,7 +117,7 @@ export default function AIToolsPanel({ document, userId = 'anonymous', locale =
           }))
         }
       } else {
-        alert(`Error: ${data.error}`)
+        alert(`Error: ${data?.error}`)
       }
     } catch (error) {
       console.error('Error summarizing:', error)
@@ -95,17 +143,39 @@ export default function AIToolsPanel({ document, userId = 'anonymous', locale =
           docId: document.id,
           locale,
           n: questionCount,
-          userId
+          userId,
+          stream: true
         })
       })
 
-      const data = await response.json()
+      setUserAnswers({})
+      setQuizCompleted(false)
+      setSelectedQuestionIndex(null)
+
+      let data
+      if (response.ok && isEventStream(response)) {
+        // Show questions as they arrive; `done` carries the full result
+        setResults(prev => ({ ...prev, questions: { items: [], streaming: true } }))
+        await readEventStream(response, (event, payload) => {
+          if (event === 'item') {
+            setResults(prev => ({
+              ...prev,
+              questions: { ...prev.questions, items: [...prev.questions.items, payload.item] }
+            }))
+          } else if (event === 'done') {
+            data = payload
+          } else if (event === 'error') {
+            // Drop the partial result; the alert below shows the error
+            setResults(prev => ({ ...prev, questions: null }))
+            data = payload
+          }
+        })
+      } else {
+        data = await response.json()
+      }
       
-      if (response.ok) {
+      if (response.ok && data && !data.error) {
         setResults(prev => ({ ...prev, questions: data }))
-        setUserAnswers({})
-        setQuizCompleted(false)
-        setSelectedQuestionIndex(null)
         
         if (data.tokenCount && !data.cached && !data.fallback) {
           setUsage(prev => ({ 
@@ -116,7 +186,7 @@ export default function AIToolsPanel({ document, userId = 'anonymous', locale =
           }))
         }
       } else {
-        alert(`Error: ${data.error}`)
+        alert(`Error: ${data?.error}`)
       }
     } catch (error) {
       console.error('Error generating questions:', error)
@@ -187,7 +257,7 @@ export default function AIToolsPanel({ document, userId = 'anonymous', locale =
   }
 
   const canCompleteQuiz = () => {
-    return getTotalQuestions() > 0 && getAnsweredCount() === getTotalQuestions()
+    return !results.questions?.streaming && getTotalQuestions() > 0 && getAnsweredCount() === getTotalQuestions()
   }
 
   return (
@@ -22,13 +22,7 @@ import { GAME_STATES, AUTO_PAUSE_DELAY } from '@/lib/constants'
 import { AdaptiveDifficulty } from '@/lib/adaptive-difficulty'
 import { useAppStore } from '@/lib/store'
 import { supabase } from '@/lib/supabase'
-import { 
-  updateUserProfile, 
-  updateStreak, 
-  checkAchievements, 
-  isValidGameRun,
-  calculateXpGain 
-} from '@/lib/gamification'
+import { completeGameRun } from '@/lib/gamification'
 
 // Import new UX components (PR A)
 import GameIntro from './games/GameIntro'
@@ -276,16 +270,14 @@ export default function GameShell({
         metrics: results.metrics || {}
       }
 
-      // Check if this is a valid run for gamification
-      const isValid = isValidGameRun(gameData)
+      // XP, streak and achievements in one round trip
+      // (invalid runs only break the streak)
+      const { isValid, profile: profileUpdate, streak: streakUpdate, achievements: newAchievements } =
+        await completeGameRun(sessionId, gameData)
       
       if (isValid) {
-        // Calculate and award XP
-        const xpGain = calculateXpGain(results.score || 0)
-        const profileUpdate = await updateUserProfile(sessionId, xpGain)
-        
         if (profileUpdate) {
-          toast.success(`¡+${xpGain} XP! Nivel ${profileUpdate.level}`, {
+          toast.success(`¡+${profileUpdate.xpGain} XP! Nivel ${profileUpdate.level}`, {
             duration: 3000,
             icon: '⭐'
           })
@@ -298,9 +290,6 @@ export default function GameShell({
           }
         }
 
-        // Update streak
-        const streakUpdate = await updateStreak(sessionId, true)
-        
         if (streakUpdate && streakUpdate.increased) {
           toast.success(`¡Racha de ${streakUpdate.current} días!`, {
             duration: 3000,
@@ -308,9 +297,6 @@ export default function GameShell({
           })
         }
 
-        // Check and unlock achievements
-        const newAchievements = await checkAchievements(sessionId, gameData)
-        
         newAchievements.forEach(achievement => {
           toast.success(`¡Logro desbloqueado: ${achievement.title}!`, {
             description: achievement.description,
@@ -318,9 +304,6 @@ export default function GameShell({
             icon: achievement.icon
           })
         })
-      } else {
-        // Invalid run - might break streak
-        await updateStreak(sessionId, false)
       }
     } catch (error) {
       console.error('Error updating gamification:', error)
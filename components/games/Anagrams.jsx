@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect, useCallback, useRef } from 'react'
+import { useState, useEffect, useCallback, useRef, useMemo } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import GameShell from '../GameShell'
 import { Button } from '@/components/ui/button'
@@ -11,6 +11,7 @@ import { Progress } from '@/components/ui/progress'
 import { Switch } from '@/components/ui/switch'
 import { Timer, Trophy, Target, TrendingUp, Lightbulb, CheckCircle, Shuffle, Flame } from 'lucide-react'
 import { WORD_BANK } from '@/lib/word-bank'
+import { getAnagramIndex, getWordsOfLength, isValidAnagram } from '@/lib/word-index'
 import { getLastLevel, setLastLevel, getLastBestScore, updateBestScore, updateGameProgress, GAME_IDS } from '@/lib/progress-tracking'
 
 const GAME_CONFIG = {
@@ -94,6 +95,7 @@ export default function Anagrams({
     timePerAnagram: adaptiveDifficulty.timePerWord
   }
   const wordsData = WORD_BANK.anagrams[locale] || WORD_BANK.anagrams.es
+  const anagramIndex = useMemo(() => getAnagramIndex(locale), [locale])
   const anagramStartTime = useRef(null)
   const anagramTimer = useRef(null)
 
@@ -121,10 +123,18 @@ export default function Anagrams({
 
   // Get random word for current length
   const getRandomWord = useCallback(() => {
-    const wordsOfLength = wordsData[effectiveConfig.length] || []
+    // Indexed by real length; the bank's buckets contain a few mislabelled words
+    let wordsOfLength = getWordsOfLength(anagramIndex, effectiveConfig.length)
+    if (wordsOfLength.length === 0) wordsOfLength = wordsData[effectiveConfig.length] || []
     if (wordsOfLength.length === 0) return 'test'
     return wordsOfLength[Math.floor(Math.random() * wordsOfLength.length)]
-  }, [effectiveConfig.length, wordsData])
+  }, [effectiveConfig.length, wordsData, anagramIndex])
+
+  // Accept the target or any other dictionary word using exactly its letters
+  const isCorrectAnswer = useCallback((input) => {
+    if (normalizeText(input) === normalizeText(currentWord)) return true
+    return isValidAnagram(anagramIndex, input, currentWord)
+  }, [currentWord, anagramIndex, normalizeText])
 
   // Shuffle letters to create anagram
   const shuffleWord = useCallback((word) => {
@@ -242,15 +252,11 @@ export default function Anagrams({
     const value = e.target.value
     setUserInput(value)
     
-    // Normalize both input and target word for comparison
-    const normalizedInput = normalizeText(value)
-    const normalizedTarget = normalizeText(currentWord)
-    
     // Check if correct
-    if (normalizedInput === normalizedTarget) {
+    if (isCorrectAnswer(value)) {
       handleCorrectAnswer()
     }
-  }, [currentWord, normalizeText])
+  }, [isCorrectAnswer])
 
   // Handle correct answer
   const handleCorrectAnswer = useCallback(() => {
@@ -318,14 +324,11 @@ export default function Anagrams({
   // Handle key press (Enter to submit)
   const handleKeyPress = useCallback((e) => {
     if (e.key === 'Enter') {
-      const normalizedInput = normalizeText(userInput)
-      const normalizedTarget = normalizeText(currentWord)
-      
-      if (normalizedInput === normalizedTarget) {
+      if (isCorrectAnswer(userInput)) {
         handleCorrectAnswer()
       }
     }
-  }, [userInput, currentWord, handleCorrectAnswer, normalizeText])
+  }, [userInput, handleCorrectAnswer, isCorrectAnswer])
 
   // Auto-start first anagram
   useEffect(() => {
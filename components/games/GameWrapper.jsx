@@ -7,14 +7,7 @@ import { Progress } from '@/components/ui/progress'
 import { Play, Square, Pause, ArrowLeft } from 'lucide-react'
 import { useAppStore } from '@/lib/store'
 import { supabase } from '@/lib/supabase'
-import { 
-  updateUserProfile, 
-  updateStreak, 
-  checkAchievements, 
-  isValidGameRun,
-  calculateXpGain,
-  calculateLevel 
-} from '@/lib/gamification'
+import { completeGameRun } from '@/lib/gamification'
 import { getLastLevel, setLastLevel } from '@/lib/progress-tracking'
 import { calculateLevelProgression } from '@/lib/level-progression'
 
@@ -134,19 +127,10 @@ export default function GameWrapper({
 
     if (!userProfile?.id) return
 
-    // Calculate XP gain
-    const xpGain = calculateXpGain(finalScore)
-    const previousLevel = calculateLevel(userProfile.xp || 0)
-
     try {
       // Save game run to database
       await saveGameRun(finalScore, metrics)
       
-      // Update XP and check for level up
-      const profileUpdate = await updateUserProfile(userProfile.id, { xp: xpGain })
-      const leveledUp = profileUpdate && profileUpdate.levelUp
-      
-      // Update streak
       const gameRunData = {
         game: gameConfig.name,
         score: finalScore,
@@ -155,11 +139,10 @@ export default function GameWrapper({
         metrics
       }
       
-      const isValid = isValidGameRun(gameRunData)
-      await updateStreak(userProfile.id, isValid)
-      
-      // Check achievements
-      const newAchievements = await checkAchievements(userProfile.id, gameRunData)
+      // XP, streak and achievements in one round trip
+      const { profile: profileUpdate, achievements: newAchievements } =
+        await completeGameRun(userProfile.id, gameRunData)
+      const leveledUp = profileUpdate && profileUpdate.levelUp
       
       // Update progress
       await updateGameProgress(finalScore, metrics)
@@ -309,15 +292,6 @@ export default function GameWrapper({
       if (updateError) {
         console.error('Error updating progress:', updateError)
       }
-
-      // Update XP and streaks
-      if (isValidGameRun(finalScore, DURATION_MS, metrics)) {
-        const xpGain = calculateXpGain(gameConfig.name, finalScore, newLevel)
-        await updateUserProfile(userProfile.id, { xp: userProfile.xp + xpGain })
-        await updateStreak(userProfile.id)
-        await checkAchievements(userProfile.id, gameConfig.name, finalScore)
-      }
-
     } catch (error) {
       console.error('Error in updateGameProgress:', error)
     }
@@ -1,7 +1,7 @@
 'use client'
 
 import { useState, useEffect, useRef, useCallback } from 'react'
-import { generateGrid, getGridConfig } from '@/lib/letters/generateGrid'
+import { getGridConfig, takeLevelGrid } from '@/lib/letters/generateGrid'
 import { useCountdown } from '@/hooks/useCountdown'
 import HeaderBar from './common/HeaderBar'
 import SummaryDialog from './common/SummaryDialog'
@@ -72,24 +72,16 @@ export default function LettersGrid({
     }
   })
 
-  // Initialize grid synchronously on mount
+  // Take a pre-generated grid for the level (generated synchronously if none is ready)
   useEffect(() => {
-    const config = getGridConfig(level)
+    const { config, cells: newGrid, seed } = takeLevelGrid(level)
     setGridConfig(config)
     
-    // Generate grid synchronously
-    const newGrid = generateGrid({
-      rows: config.rows,
-      cols: config.cols,
-      targetLetter: config.targetLetter,
-      targetCount: config.targetCount,
-      confusables: config.confusables
-    })
-    
     setGrid(newGrid)
     setGameStats(prev => ({
       ...prev,
-      totalTargets: config.targetCount
+      totalTargets: config.targetCount,
+      seed // (level, seed) replays this exact grid
     }))
     
     // Mark grid as ready after next paint
@@ -190,15 +182,16 @@ export default function LettersGrid({
   const resetGame = useCallback(() => {
     setPhase('ready')
     setSelectedCells(new Set())
-    setGameStats({
+    setGameStats(prev => ({
       hits: 0,
       misses: 0,
       falsePositives: 0,
       totalTargets: gridConfig.targetCount,
       accuracy: 0,
       avgResponseTime: 0,
-      selections: []
-    })
+      selections: [],
+      seed: prev.seed
+    }))
     selectionTimesRef.current = []
     showingCountdown.reset()
     playingCountdown.reset()
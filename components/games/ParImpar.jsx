@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { generateNumberGrid } from '@/lib/parimpar/generateNumberGrid';
+import { takeNumberGrid } from '@/lib/parimpar/generateNumberGrid';
 import { useCountdown } from '@/hooks/useCountdown';
 import HeaderBar from './common/HeaderBar';
 import SummaryDialog from './common/SummaryDialog';
@@ -21,7 +21,7 @@ function median(arr) {
     : sorted[mid];
 }
 
-function computeStats(grid, selectedIds, reactionTimes) {
+function computeStats(grid, selectedIds, reactionTimes, seed) {
   let correct = 0, incorrect = 0, missed = 0;
   const targets = grid.filter((g) => g.isTarget).map((g) => g.id);
   const selected = Array.from(selectedIds);
@@ -41,6 +41,7 @@ function computeStats(grid, selectedIds, reactionTimes) {
     total: grid.length,
     selected: selected.length,
     targets: targets.length,
+    seed, // replays this exact grid
   };
 }
 
@@ -125,6 +126,7 @@ const ParImpar = () => {
   const [phase, setPhase] = useState('READY');
   const [ready, setReady] = useState(false);
   const [grid, setGrid] = useState([]);
+  const [seed, setSeed] = useState(null);
   const [selectedIds, setSelectedIds] = useState(new Set());
   const [reactionTimes, setReactionTimes] = useState([]);
   const selectStart = useRef(null);
@@ -138,7 +140,7 @@ const ParImpar = () => {
 
   useEffect(() => {
     if (typeof window === 'undefined') return;
-    const items = generateNumberGrid({
+    const { items, seed: gridSeed } = takeNumberGrid({
       gridSize: GRID_SIZE,
       targetParity: PARITY,
       ratioTargets: RATIO_TARGETS,
@@ -146,6 +148,7 @@ const ParImpar = () => {
       max: MAX,
     });
     setGrid(items);
+    setSeed(gridSeed);
     setReady(true);
   }, []);
 
@@ -189,7 +192,7 @@ const ParImpar = () => {
     setPhase('READY');
     setSelectedIds(new Set());
     setReactionTimes([]);
-    const items = generateNumberGrid({
+    const { items, seed: gridSeed } = takeNumberGrid({
       gridSize: GRID_SIZE,
       targetParity: PARITY,
       ratioTargets: RATIO_TARGETS,
@@ -197,6 +200,7 @@ const ParImpar = () => {
       max: MAX,
     });
     setGrid(items);
+    setSeed(gridSeed);
     setReady(true);
     timer.reset();
   };
@@ -255,7 +259,7 @@ const ParImpar = () => {
       
       {phase === 'SUMMARY' && (
         <SummaryDialog
-          stats={computeStats(grid, selectedIds, reactionTimes)}
+          stats={computeStats(grid, selectedIds, reactionTimes, seed)}
           onClose={resetGame}
         />
       )}
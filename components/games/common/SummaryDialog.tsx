@@ -10,6 +10,7 @@ interface SummaryStats {
   total: number;
   selected: number;
   targets: number;
+  seed?: number;
 }
 
 interface SummaryDialogProps {
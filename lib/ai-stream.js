@@ -0,0 +1,150 @@
+/**
+ * Streaming helpers for the AI routes (server-sent events)
+ *
+ * - sseResponse: wraps an async handler in a text/event-stream Response
+ * - createJsonArrayItemParser: pulls complete objects out of a JSON array
+ *   (e.g. `{"items": [ {...}, {...} ]}`) while the JSON is still arriving
+ * - createLineParser: emits complete lines from streamed text
+ */
+
+const encoder = new TextEncoder();
+
+/**
+ * @param {Function} handler - async (send) => void; send(event, data)
+ *   writes one SSE frame and is a no-op once the client has gone away.
+ *   The handler keeps running after a disconnect so shared generations
+ *   still complete for the other callers.
+ * @returns {Response}
+ */
+export function sseResponse(handler) {
+  let closed = false;
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event, data) => {
+        if (closed) return;
+        try {
+          controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`));
+        } catch (error) {
+          // Stream already errored or cancelled
+          closed = true;
+        }
+      };
+
+      try {
+        await handler(send);
+      } catch (error) {
+        if (!closed) {
+          console.error('SSE handler error:', error);
+          send('error', { error: 'Stream failed' });
+        }
+      } finally {
+        if (!closed) {
+          closed = true;
+          controller.close();
+        }
+      }
+    },
+
+    // Client disconnected
+    cancel() {
+      closed = true;
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream; charset=utf-8',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no'
+    }
+  });
+}
+
+/**
+ * Incrementally extract the objects of the first array found under one of `keys`
+ * @param {string[]} keys - Candidate property names, e.g. ['items', 'questions']
+ * @param {Function} onItem - Called with each parsed object, in order
+ * @returns {{ push: (text: string) => void }}
+ */
+export function createJsonArrayItemParser(keys, onItem) {
+  const keyPattern = new RegExp(`"(?:${keys.join('|')})"\\s*:\\s*\\[`);
+  let buffer = '';
+  let arrayStart = -1;
+  let scanFrom = 0;
+  let depth = 0;
+  let inString = false;
+  let escaped = false;
+  let itemStart = -1;
+  let done = false;
+
+  return {
+    push(text) {
+      if (done) return;
+      buffer += text;
+
+      if (arrayStart === -1) {
+        const match = keyPattern.exec(buffer);
+        if (!match) return;
+        arrayStart = match.index + match[0].length;
+        scanFrom = arrayStart;
+      }
+
+      for (let i = scanFrom; i < buffer.length; i++) {
+        const ch = buffer[i];
+
+        if (inString) {
+          if (escaped) escaped = false;
+          else if (ch === '\\') escaped = true;
+          else if (ch === '"') inString = false;
+          continue;
+        }
+
+        if (ch === '"') {
+          inString = true;
+        } else if (ch === '{') {
+          if (depth === 0) itemStart = i;
+          depth++;
+        } else if (ch === '}') {
+          depth--;
+          if (depth === 0 && itemStart !== -1) {
+            let item;
+            try {
+              item = JSON.parse(buffer.slice(itemStart, i + 1));
+            } catch (error) {
+              // Malformed item; the full-response validation handles it
+            }
+            itemStart = -1;
+            if (item !== undefined) onItem(item);
+          }
+        } else if (ch === ']' && depth === 0) {
+          done = true;
+          return;
+        }
+      }
+      scanFrom = buffer.length;
+    }
+  };
+}
+
+/**
+ * Emit complete lines as text arrives; flush() emits the trailing partial line
+ */
+export function createLineParser(onLine) {
+  let pending = '';
+
+  return {
+    push(text) {
+      pending += text;
+      let newline;
+      while ((newline = pending.indexOf('\n')) !== -1) {
+        onLine(pending.slice(0, newline));
+        pending = pending.slice(newline + 1);
+      }
+    },
+    flush() {
+      if (pending) onLine(pending);
+      pending = '';
+    }
+  };
+}
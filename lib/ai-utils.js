@@ -1,6 +1,7 @@
 import crypto from 'crypto';
 import { v4 as uuidv4 } from 'uuid';
-import { supabase } from './supabase';
+import { supabase, supabaseAdmin } from './supabase';
+import { TtlLruStore } from './ttl-store';
 
 // Generate a hash for caching
 export function generateHash(text) {
@@ -8,91 +9,198 @@ export function generateHash(text) {
 }
 
 // Check and update user quota
-export async function checkAndUpdateQuota(userId, requestType) {
-  const today = new Date().toISOString().split('T')[0];
-  
-  // Get current quota
-  const { data: quota, error } = await supabase
-    .from('ai_usage')
-    .select('*')
-    .eq('user_id', userId)
-    .single();
+// One atomic increment-and-check (consume_ai_call RPC): concurrent requests
+// cannot double-spend, and there is no select-then-update round trip.
+// The quota RPCs are service-role only (SUPABASE_SERVICE_ROLE) and key on a
+// uuid, so callers without a user id (userId 'anonymous') get a separate
+// in-memory daily quota per client (IP), AI_ANON_MAX_CALLS_PER_DAY.
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+const memoryQuota = new TtlLruStore({
+  maxEntries: 10000,
+  resolutionMs: 60 * 1000,
+  horizonMs: 24 * 60 * 60 * 1000
+});
+
+function isUserId(userId) {
+  return typeof userId === 'string' && UUID_PATTERN.test(userId);
+}
+
+/**
+ * Client key for the anonymous quota (first x-forwarded-for hop, as the rate limiter)
+ */
+export function getClientKey(request) {
+  const forwarded = request.headers.get('x-forwarded-for');
+  return (forwarded && forwarded.split(',')[0].trim()) ||
+    request.headers.get('x-real-ip') ||
+    'unknown';
+}
+
+// Per-instance daily call counter, for callers the database quota cannot key
+function consumeMemoryQuota(key, maxCalls) {
+  const day = today();
+  const now = Date.now();
+  const quotaKey = `${key}|${day}`;
+  const used = memoryQuota.get(quotaKey, now) || 0;
   
-  if (error && error.code !== 'PGRST116') {
-    console.error('Error checking quota:', error);
-    throw new Error('Failed to check quota');
-  }
-  
-  // If no quota record or last reset was not today, create/reset
-  if (!quota || quota.period_start !== today) {
-    const { error: upsertError } = await supabase
-      .from('ai_usage')
-      .upsert({
-        user_id: userId,
-        calls_used: 1,
-        tokens_used: 0,
-        period_start: today,
-        updated_at: new Date().toISOString()
-      });
-    
-    if (upsertError) {
-      console.error('Error resetting quota:', upsertError);
-      throw new Error('Failed to reset quota');
-    }
-    
-    return { allowed: true, remaining: getMaxRequests() - 1 };
+  if (used >= maxCalls) {
+    return { allowed: false, remaining: 0, reason: 'Daily calls limit exceeded' };
   }
   
-  // Check if quota exceeded
-  const maxRequests = getMaxRequests();
-  if (quota.calls_used >= maxRequests) {
-    return { allowed: false, remaining: 0 };
+  memoryQuota.sweep(now);
+  memoryQuota.set(quotaKey, used + 1, Date.parse(`${day}T00:00:00Z`) + 24 * 60 * 60 * 1000);
+  return { allowed: true, remaining: maxCalls - used - 1 };
+}
+
+export async function checkAndUpdateQuota(userId, requestType, { clientKey = 'unknown' } = {}) {
+  if (!isUserId(userId)) {
+    return consumeMemoryQuota(`anon:${clientKey}`, getMaxAnonymousRequests());
   }
   
-  // Update quota
-  const { error: updateError } = await supabase
-    .from('ai_usage')
-    .update({
-      calls_used: quota.calls_used + 1,
-      updated_at: new Date().toISOString()
-    })
-    .eq('user_id', userId);
+  if (!supabaseAdmin) {
+    console.error('Error checking quota: SUPABASE_SERVICE_ROLE is not configured');
+    return consumeMemoryQuota(`user:${userId}`, getMaxRequests());
+  }
+  
+  const { data, error } = await supabaseAdmin.rpc('consume_ai_call', {
+    p_user_id: userId,
+    p_max_calls: getMaxRequests(),
+    p_max_tokens_month: getMaxTokensPerMonth(),
+    p_day: today()
+  });
   
-  if (updateError) {
-    console.error('Error updating quota:', updateError);
-    throw new Error('Failed to update quota');
+  if (error) {
+    // Fail open: quota storage problems must not block reading. (Before the
+    // atomic RPC this path threw and the route answered 500.)
+    console.error('Error checking quota:', error);
+    return { allowed: true, remaining: null };
   }
   
-  return { allowed: true, remaining: maxRequests - (quota.calls_used + 1) };
+  const result = Array.isArray(data) ? data[0] : data;
+  return {
+    allowed: !!result?.allowed,
+    remaining: result?.remaining ?? 0,
+    ...(result?.reason ? { reason: result.reason } : {})
+  };
 }
 
 // Update token usage
-export async function updateTokenUsage(userId, tokens) {
-  const { error } = await supabase
-    .from('ai_usage')
-    .update({
-      tokens_used: tokens,
-      updated_at: new Date().toISOString()
-    })
-    .eq('user_id', userId);
+// Concurrent requests are coalesced per (user, day) into one add_ai_tokens
+// RPC. The returned promise settles when that write is done; routes await it
+// before finishing the response, so usage is not lost when a serverless
+// instance is frozen or shut down right after the request.
+const TOKEN_FLUSH_INTERVAL_MS = 25;
+const TOKEN_FLUSH_MAX_ENTRIES = 100;
+let pendingBatch = null;
+
+export function updateTokenUsage(userId, tokens) {
+  // Only real users are tracked in ai_usage; anonymous callers are call-limited
+  if (!(tokens > 0) || !isUserId(userId)) return Promise.resolve();
   
-  if (error) {
-    console.error('Error updating token usage:', error);
+  if (!pendingBatch) {
+    let resolve;
+    const done = new Promise(r => { resolve = r; });
+    pendingBatch = { entries: new Map(), done, resolve, timer: null };
+    pendingBatch.timer = setTimeout(flushTokenUsage, TOKEN_FLUSH_INTERVAL_MS);
+  }
+  
+  const batch = pendingBatch;
+  const day = today();
+  const key = `${userId}|${day}`;
+  const pending = batch.entries.get(key);
+  if (pending) {
+    pending.tokens += tokens;
+  } else {
+    batch.entries.set(key, { user_id: userId, day, tokens });
+  }
+  
+  if (batch.entries.size >= TOKEN_FLUSH_MAX_ENTRIES) {
+    flushTokenUsage();
+  }
+  return batch.done;
+}
+
+export async function flushTokenUsage() {
+  const batch = pendingBatch;
+  if (!batch) return;
+  pendingBatch = null;
+  clearTimeout(batch.timer);
+  
+  try {
+    if (!supabaseAdmin) {
+      console.error('Error updating token usage: SUPABASE_SERVICE_ROLE is not configured');
+      return;
+    }
+    
+    const { error } = await supabaseAdmin.rpc('add_ai_tokens', {
+      p_entries: Array.from(batch.entries.values())
+    });
+    if (error) {
+      console.error('Error updating token usage:', error);
+    }
+  } finally {
+    batch.resolve();
   }
 }
 
+function today() {
+  return new Date().toISOString().split('T')[0];
+}
+
 // Get max requests based on configuration
 function getMaxRequests() {
   return parseInt(process.env.AI_MAX_CALLS_PER_DAY || '10');
 }
 
+function getMaxAnonymousRequests() {
+  return parseInt(process.env.AI_ANON_MAX_CALLS_PER_DAY || '3');
+}
+
+function getMaxTokensPerMonth() {
+  return parseInt(process.env.AI_MAX_TOKENS_PER_MONTH || '100000');
+}
+
+// In-process tier in front of the Supabase ai_cache table.
+// Hot documents are served from memory; recent misses are cached briefly
+// (negative entries) so bursts of misses do not each query Supabase.
+const MEMORY_CACHE_TTL_MS = parseInt(process.env.AI_CACHE_MEMORY_TTL_MS || String(10 * 60 * 1000));
+const NEGATIVE_CACHE_TTL_MS = parseInt(process.env.AI_CACHE_NEGATIVE_TTL_MS || '10000');
+const CACHE_MISS = Symbol('ai-cache-miss');
+
+const memoryCache = new TtlLruStore({
+  maxEntries: 5000,
+  maxBytes: parseInt(process.env.AI_CACHE_MEMORY_MAX_BYTES || String(8 * 1024 * 1024)),
+  // UTF-16 string size plus a small per-entry overhead
+  sizeOf: value => (value === CACHE_MISS ? 0 : value.length * 2) + 64,
+  resolutionMs: 5000,
+  horizonMs: MEMORY_CACHE_TTL_MS
+});
+
+const cacheStats = { memoryHits: 0, negativeHits: 0, dbHits: 0, misses: 0 };
+
+function memoryCacheKey(inputHash, requestType) {
+  return `${requestType}:${inputHash}`;
+}
+
 // Check cache for existing results
 export async function checkCache(inputText, requestType) {
   const inputHash = generateHash(inputText);
+  const key = memoryCacheKey(inputHash, requestType);
+  const now = Date.now();
+  
+  const cached = memoryCache.get(key, now);
+  if (cached === CACHE_MISS) {
+    cacheStats.negativeHits++;
+    return null;
+  }
+  if (cached !== undefined) {
+    cacheStats.memoryHits++;
+    return cached;
+  }
   
   const { data, error } = await supabase
     .from('ai_cache')
-    .select('*')
+    .select('id, output_text, access_count')
     .eq('input_hash', inputHash)
     .eq('request_type', requestType)
     .single();
@@ -103,26 +211,37 @@ export async function checkCache(inputText, requestType) {
   }
   
   if (data) {
-    // Update access count and timestamp
-    await supabase
+    cacheStats.dbHits++;
+    memoryCache.set(key, data.output_text, now + MEMORY_CACHE_TTL_MS);
+    
+    // Update access count and timestamp off the request path
+    supabase
       .from('ai_cache')
       .update({
-        access_count: data.access_count + 1,
+        access_count: (data.access_count || 0) + 1,
         last_accessed_at: new Date().toISOString()
       })
-      .eq('id', data.id);
+      .eq('id', data.id)
+      .then(({ error: updateError }) => {
+        if (updateError) console.error('Error updating cache access:', updateError);
+      });
     
     return data.output_text;
   }
   
+  cacheStats.misses++;
+  memoryCache.set(key, CACHE_MISS, now + NEGATIVE_CACHE_TTL_MS);
   return null;
 }
 
 // Save result to cache
-export async function saveToCache(inputText, outputText, requestType, tokenCount) {
+export async function saveToCache(inputText, outputText, requestType, tokenCount, ver = 'v1') {
   const inputHash = generateHash(inputText);
   const cacheKey = `${requestType}_${uuidv4()}`;
   
+  // Replaces any negative entry so this instance serves the result at once
+  memoryCache.set(memoryCacheKey(inputHash, requestType), outputText, Date.now() + MEMORY_CACHE_TTL_MS);
+  
   const { error } = await supabase
     .from('ai_cache')
     .insert({
@@ -131,7 +250,7 @@ export async function saveToCache(inputText, outputText, requestType, tokenCount
       output_text: outputText,
       request_type: requestType,
       token_count: tokenCount,
-      ver: 'v1',
+      ver,
       created_at: new Date().toISOString(),
       last_accessed_at: new Date().toISOString()
     });
@@ -141,6 +260,15 @@ export async function saveToCache(inputText, outputText, requestType, tokenCount
   }
 }
 
+// Cache tier statistics
+export function getAiCacheStats() {
+  return {
+    ...cacheStats,
+    memoryEntries: memoryCache.size,
+    memoryBytes: memoryCache.bytes
+  };
+}
+
 // Chunk text for processing
 export function chunkText(text, maxChunkSize = 2000) {
   const sentences = text.split(/[.!?]+/).filter(s => s.trim().length > 0);
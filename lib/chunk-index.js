@@ -0,0 +1,204 @@
+import crypto from 'crypto';
+import { TtlLruStore } from './ttl-store';
+
+/**
+ * Per-document chunk index for AI question generation
+ *
+ * A document is normalized, split into sentence-aligned chunks and tokenized
+ * once, then cached by docId + text hash. Each chunk gets a content-addressed
+ * ID (`chunk_<index>_<hash>`), so cache keys built from chunk IDs stay stable
+ * for unchanged text and change when the text does.
+ *
+ * Chunk selection scores chunks with BM25 against the document's own key
+ * terms (highest TF-IDF) and picks the best chunk in each equal slice of the
+ * document, so long documents are covered end to end instead of always
+ * asking about the first paragraph.
+ */
+
+const INDEX_CACHE_TTL_MS = 60 * 60 * 1000;
+const indexCache = new TtlLruStore({
+  maxEntries: 200,
+  resolutionMs: 60 * 1000,
+  horizonMs: INDEX_CACHE_TTL_MS
+});
+
+// BM25 parameters (standard defaults)
+const K1 = 1.2;
+const B = 0.75;
+const QUERY_TERMS = 12;
+
+const STOPWORDS = new Set([
+  // es
+  'para', 'como', 'pero', 'este', 'esta', 'estos', 'estas', 'que', 'los', 'las',
+  'del', 'una', 'uno', 'unos', 'unas', 'con', 'por', 'sin', 'sus', 'son', 'mas',
+  'muy', 'tambien', 'puede', 'pueden', 'sobre', 'entre', 'cuando', 'donde', 'solo',
+  'sino', 'tan', 'ser', 'hay', 'fue', 'han', 'ese', 'esa', 'eso', 'nos', 'les',
+  // en
+  'the', 'and', 'for', 'that', 'this', 'with', 'from', 'are', 'was', 'were', 'but',
+  'not', 'can', 'also', 'its', 'their', 'they', 'which', 'into', 'more', 'than',
+  'only', 'like', 'have', 'has', 'your', 'you', 'our', 'all', 'any'
+]);
+
+export function normalizeText(text) {
+  // Normalize whitespace to ensure stable character indexes
+  return text
+    .replace(/\s+/g, ' ')  // Replace multiple whitespace with single space
+    .replace(/\n\s*\n/g, '\n')  // Replace multiple newlines with single newline
+    .trim();
+}
+
+export function tokenize(text) {
+  return text
+    .toLowerCase()
+    .normalize('NFD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .split(/[^a-z0-9ñ]+/)
+    .filter(token => token.length > 2 && !STOPWORDS.has(token));
+}
+
+export function chunkText(text, maxChunkSize = 1500) {
+  // Normalize text before chunking to ensure stable indexes
+  const normalizedText = normalizeText(text);
+  const sentences = normalizedText.split(/[.!?]+/).filter(s => s.trim().length > 10);
+  const chunks = [];
+  let currentChunk = '';
+
+  for (const sentence of sentences) {
+    if (currentChunk.length + sentence.length > maxChunkSize && currentChunk.length > 0) {
+      chunks.push(currentChunk.trim());
+      currentChunk = sentence;
+    } else {
+      currentChunk += (currentChunk ? '. ' : '') + sentence;
+    }
+  }
+
+  if (currentChunk.trim()) {
+    chunks.push(currentChunk.trim());
+  }
+
+  return { chunks, normalizedText };
+}
+
+function sha1(text) {
+  return crypto.createHash('sha1').update(text).digest('hex');
+}
+
+function buildChunkIndex(docId, text, textHash, maxChunkSize) {
+  const { chunks, normalizedText } = chunkText(text, maxChunkSize);
+  const documentFrequency = new Map();
+  let totalLength = 0;
+
+  const indexedChunks = chunks.map((content, i) => {
+    const tokens = tokenize(content);
+    const termFrequency = new Map();
+    for (const token of tokens) {
+      termFrequency.set(token, (termFrequency.get(token) || 0) + 1);
+    }
+    for (const term of termFrequency.keys()) {
+      documentFrequency.set(term, (documentFrequency.get(term) || 0) + 1);
+    }
+    totalLength += tokens.length;
+
+    return {
+      id: `chunk_${i}_${sha1(content).slice(0, 8)}`,
+      position: i,
+      text: content,
+      length: tokens.length,
+      termFrequency
+    };
+  });
+
+  const chunkCount = indexedChunks.length;
+  const idf = new Map();
+  for (const [term, df] of documentFrequency) {
+    idf.set(term, Math.log(1 + (chunkCount - df + 0.5) / (df + 0.5)));
+  }
+
+  // Key terms of the whole document: corpus-wide TF x IDF
+  const termWeight = new Map();
+  for (const chunk of indexedChunks) {
+    for (const [term, tf] of chunk.termFrequency) {
+      termWeight.set(term, (termWeight.get(term) || 0) + tf * idf.get(term));
+    }
+  }
+  const keyTerms = Array.from(termWeight.entries())
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, QUERY_TERMS)
+    .map(([term]) => term);
+
+  return {
+    docId,
+    textHash,
+    normalizedText,
+    chunks: indexedChunks,
+    idf,
+    keyTerms,
+    averageLength: chunkCount > 0 ? totalLength / chunkCount : 0,
+    selections: new Map()
+  };
+}
+
+/**
+ * Get (or build and cache) the chunk index for a document
+ */
+export function getChunkIndex(docId, text, { maxChunkSize = 1500 } = {}) {
+  const textHash = sha1(text);
+  const cacheKey = `${docId}:${maxChunkSize}:${textHash}`;
+  const now = Date.now();
+
+  let index = indexCache.get(cacheKey, now);
+  if (!index) {
+    index = buildChunkIndex(docId, text, textHash, maxChunkSize);
+    indexCache.set(cacheKey, index, now + INDEX_CACHE_TTL_MS);
+  }
+  return index;
+}
+
+/**
+ * BM25 score of a chunk for the given query terms
+ */
+export function scoreChunk(index, chunk, queryTerms) {
+  let score = 0;
+  const lengthNorm = 1 - B + B * (chunk.length / (index.averageLength || 1));
+
+  for (const term of queryTerms) {
+    const tf = chunk.termFrequency.get(term);
+    if (!tf) continue;
+    score += index.idf.get(term) * (tf * (K1 + 1)) / (tf + K1 * lengthNorm);
+  }
+  return score;
+}
+
+/**
+ * Select `count` chunks spread across the document, best BM25 match per slice
+ * @returns {Array} chunk records in document order
+ */
+export function selectChunks(index, count, queryTerms = index.keyTerms) {
+  const { chunks } = index;
+  if (chunks.length <= count) return chunks;
+
+  const useCache = queryTerms === index.keyTerms;
+  if (useCache && index.selections.has(count)) {
+    return index.selections.get(count);
+  }
+
+  const selected = [];
+  for (let slice = 0; slice < count; slice++) {
+    const start = Math.floor((slice * chunks.length) / count);
+    const end = Math.floor(((slice + 1) * chunks.length) / count);
+    let best = chunks[start];
+    let bestScore = -1;
+
+    for (let i = start; i < end; i++) {
+      const score = scoreChunk(index, chunks[i], queryTerms);
+      if (score > bestScore) {
+        best = chunks[i];
+        bestScore = score;
+      }
+    }
+    selected.push(best);
+  }
+
+  if (useCache) index.selections.set(count, selected);
+  return selected;
+}
@@ -0,0 +1,42 @@
+/**
+ * Tests for the per-document chunk index
+ * Validates caching, content-addressed chunk IDs and spread-out selection
+ */
+
+import { describe, test, expect } from 'vitest'
+import { getChunkIndex, selectChunks } from '@/lib/chunk-index'
+
+describe('Chunk Index', () => {
+  test('should cache the index per document text', () => {
+    const mockText = 'La lectura rápida necesita práctica.\n\nCada párrafo trata un tema distinto.'
+
+    expect(getChunkIndex('doc-1', mockText)).toBe(getChunkIndex('doc-1', mockText))
+    expect(getChunkIndex('doc-1', mockText + ' Más texto.')).not.toBe(getChunkIndex('doc-1', mockText))
+  })
+
+  test('should give stable, content-addressed chunk IDs', () => {
+    const mockText = Array.from({ length: 40 }, (_, i) =>
+      `Paragraph ${i} talks about topic${i} in detail. Speed reading needs practice and attention to every sentence.`
+    ).join('\n\n')
+
+    const ids = getChunkIndex('doc-2', mockText, { maxChunkSize: 300 }).chunks.map(chunk => chunk.id)
+    const copyIds = getChunkIndex('doc-2-copy', mockText, { maxChunkSize: 300 }).chunks.map(chunk => chunk.id)
+
+    expect(copyIds).toEqual(ids) // same text, same IDs, whatever the document id
+    expect(new Set(ids).size).toBe(ids.length)
+  })
+
+  test('should spread the selection across the whole document', () => {
+    const mockText = Array.from({ length: 60 }, (_, i) =>
+      `Paragraph ${i} talks about topic${i} in detail. Speed reading needs practice and attention to every sentence.`
+    ).join('\n\n')
+    const index = getChunkIndex('doc-3', mockText, { maxChunkSize: 300 })
+
+    const selected = selectChunks(index, 3)
+    const last = index.chunks.length - 1
+
+    expect(selected).toHaveLength(3)
+    expect(selected[0].position).toBeLessThan(last / 3)
+    expect(selected[2].position).toBeGreaterThanOrEqual((2 * last) / 3)
+  })
+})
@@ -0,0 +1,226 @@
+/**
+ * Buffered ingestion for CSP violation reports
+ *
+ * Reports are sampled, then aggregated in memory by (directive, blocked URI)
+ * with counts; a periodic flush logs one line per group instead of one log
+ * write per violation. A report storm from a misconfigured third-party script
+ * costs a map increment per report.
+ *
+ * - Sampling (CSP_REPORT_SAMPLE_RATE, 0..1) applies per report to warning and
+ *   info violations, and their counts are scaled back up on flush. Critical
+ *   violations are never sampled out, so sampling needs the parsed report;
+ *   the route caps the body size instead
+ * - Bounded: at most CSP_REPORT_MAX_GROUPS groups per interval, extra groups
+ *   are only counted as dropped
+ * - Blocked URIs are reduced to their origin (or keyword like 'inline'), so
+ *   query strings cannot create new groups
+ *
+ * Env: CSP_REPORT_SAMPLE_RATE (default 1), CSP_REPORT_FLUSH_MS (10000),
+ *      CSP_REPORT_MAX_GROUPS (1000)
+ */
+
+const MAX_FIELD_LENGTH = 512
+
+const config = {
+  sampleRate: clampRate(parseFloat(process.env.CSP_REPORT_SAMPLE_RATE)),
+  flushIntervalMs: parseInt(process.env.CSP_REPORT_FLUSH_MS) || 10000,
+  maxGroups: parseInt(process.env.CSP_REPORT_MAX_GROUPS) || 1000
+}
+
+let groups = new Map()
+let flushTimer = null
+const stats = { received: 0, sampledOut: 0, aggregated: 0, invalid: 0, dropped: 0, flushes: 0 }
+
+function clampRate(rate) {
+  return Number.isFinite(rate) ? Math.min(1, Math.max(0, rate)) : 1
+}
+
+function truncate(value) {
+  if (value == null) return undefined
+  const text = String(value)
+  return text.length > MAX_FIELD_LENGTH ? text.slice(0, MAX_FIELD_LENGTH) : text
+}
+
+/**
+ * Whether to aggregate one report; critical violations are always kept
+ */
+export function shouldSampleReport(severity) {
+  if (severity === 'critical' || config.sampleRate >= 1 || Math.random() < config.sampleRate) return true
+  stats.sampledOut++
+  return false
+}
+
+/**
+ * Reports from a parsed request body, for both the legacy
+ * application/csp-report shape and the Reporting API array
+ */
+export function extractReports(body) {
+  if (Array.isArray(body)) {
+    return body
+      .filter(entry => !entry?.type || entry.type === 'csp-violation')
+      .map(entry => entry?.body || entry)
+      .filter(Boolean)
+  }
+  const report = body?.['csp-report'] || body
+  return report && typeof report === 'object' ? [report] : []
+}
+
+/**
+ * Normalize one raw report to the fields we keep
+ */
+export function normalizeViolation(report) {
+  return {
+    documentURI: truncate(report['document-uri'] || report.documentURL || report.documentURI),
+    referrer: truncate(report.referrer),
+    blockedURI: truncate(report['blocked-uri'] || report.blockedURL || report.blockedURI),
+    violatedDirective: truncate(report['violated-directive'] || report.violatedDirective),
+    effectiveDirective: truncate(report['effective-directive'] || report.effectiveDirective),
+    statusCode: report['status-code'] || report.statusCode,
+    sourceFile: truncate(report['source-file'] || report.sourceFile),
+    lineNumber: report['line-number'] || report.lineNumber,
+    columnNumber: report['column-number'] || report.columnNumber,
+    sample: truncate(report.sample)
+  }
+}
+
+/**
+ * Blocked URI reduced to a low-cardinality key: origin for URLs, the scheme
+ * for data:/blob: etc., keywords ('inline', 'eval') as is
+ */
+export function blockedOrigin(blockedURI) {
+  if (!blockedURI) return 'none'
+  try {
+    const url = new URL(blockedURI)
+    return url.origin !== 'null' ? url.origin : url.protocol
+  } catch (error) {
+    return blockedURI.split(/[?#]/)[0]
+  }
+}
+
+/**
+ * Determine violation severity based on the blocked URI and directive
+ */
+export function determineSeverity(violation) {
+  const blockedURI = violation.blockedURI || ''
+  const directive = violation.violatedDirective || violation.effectiveDirective || ''
+
+  // Critical violations - these indicate potential security issues
+  if (
+    blockedURI.includes('eval') ||
+    blockedURI.includes('javascript:') ||
+    directive.includes('script-src') && blockedURI.includes('unsafe-') ||
+    blockedURI.includes('data:') && directive.includes('script-src')
+  ) {
+    return 'critical'
+  }
+
+  // Warning violations - these might be legitimate third-party resources
+  if (
+    directive.includes('connect-src') ||
+    directive.includes('img-src') ||
+    directive.includes('font-src') ||
+    blockedURI.includes('google') ||
+    blockedURI.includes('vercel') ||
+    blockedURI.includes('sentry')
+  ) {
+    return 'warning'
+  }
+
+  // Info violations - typically benign
+  return 'info'
+}
+
+/**
+ * Add the reports from one request to the current interval
+ * @param {Array} reports - Raw reports from extractReports()
+ * @param {Object} meta - { userAgent }
+ */
+export function ingestCspReports(reports, meta = {}) {
+  const now = Date.now()
+
+  for (const report of reports) {
+    stats.received++
+    const violation = normalizeViolation(report)
+    const severity = determineSeverity(violation)
+    if (!shouldSampleReport(severity)) continue
+
+    const directive = violation.effectiveDirective || violation.violatedDirective || 'unknown'
+    const origin = blockedOrigin(violation.blockedURI)
+    // Severity is part of the key so sampled and unsampled counts never mix
+    const key = `${severity} ${directive} ${origin}`
+
+    let group = groups.get(key)
+    if (!group) {
+      if (groups.size >= config.maxGroups) {
+        stats.dropped++
+        continue
+      }
+      group = {
+        directive,
+        blockedOrigin: origin,
+        severity,
+        count: 0,
+        firstSeen: now,
+        lastSeen: now,
+        // First report of the group, kept as an example
+        example: { ...violation, userAgent: truncate(meta.userAgent) }
+      }
+      groups.set(key, group)
+    }
+    group.count++
+    group.lastSeen = now
+    stats.aggregated++
+  }
+
+  scheduleFlush()
+}
+
+/**
+ * Count a request whose body could not be parsed
+ */
+export function recordInvalidReport() {
+  stats.invalid++
+}
+
+function scheduleFlush() {
+  if (flushTimer) return
+  flushTimer = setTimeout(flushCspReports, config.flushIntervalMs)
+  flushTimer.unref?.()
+}
+
+/**
+ * Log the aggregated groups of the current interval and start a new one
+ * @returns {Array} the flushed groups, with sampled counts scaled by the sample rate
+ */
+export function flushCspReports() {
+  clearTimeout(flushTimer)
+  flushTimer = null
+  if (groups.size === 0) return []
+
+  const flushed = Array.from(groups.values(), group => ({
+    ...group,
+    estimatedCount: group.severity === 'critical'
+      ? group.count
+      : Math.round(group.count / (config.sampleRate || 1))
+  }))
+  groups = new Map()
+  stats.flushes++
+
+  for (const group of flushed) {
+    const logMessage = `CSP Violation [${group.severity}] x${group.estimatedCount}: ${group.directive} - ${group.blockedOrigin}`
+
+    if (group.severity === 'critical') {
+      console.error('🚨 CSP CRITICAL VIOLATION:', logMessage, group.example)
+    } else if (group.severity === 'warning') {
+      console.warn('⚠️ CSP WARNING:', logMessage)
+    } else {
+      console.info('ℹ️ CSP INFO:', logMessage)
+    }
+  }
+
+  return flushed
+}
+
+export function getCspReportStats() {
+  return { ...stats, pendingGroups: groups.size, sampleRate: config.sampleRate }
+}
@@ -0,0 +1,54 @@
+/**
+ * Tests for CSP report ingestion
+ * Validates report parsing, grouping and sampling of critical violations
+ */
+
+import { describe, test, expect } from 'vitest'
+import { blockedOrigin, extractReports, flushCspReports, getCspReportStats, ingestCspReports } from '@/lib/csp-reports'
+
+describe('CSP Report Ingestion', () => {
+  test('should extract legacy and Reporting API reports', () => {
+    expect(extractReports({ 'csp-report': { 'blocked-uri': 'inline' } })).toEqual([{ 'blocked-uri': 'inline' }])
+    expect(extractReports([
+      { type: 'csp-violation', body: { blockedURL: 'https://a.example/x.js' } },
+      { type: 'deprecation', body: { id: 'foo' } }
+    ])).toEqual([{ blockedURL: 'https://a.example/x.js' }])
+    expect(extractReports(null)).toEqual([])
+  })
+
+  test('should reduce blocked URIs to low-cardinality keys', () => {
+    expect(blockedOrigin('https://cdn.example.com/a.js?v=123')).toBe('https://cdn.example.com')
+    expect(blockedOrigin('data:image/png;base64,AAAA')).toBe('data:')
+    expect(blockedOrigin('inline')).toBe('inline')
+    expect(blockedOrigin(undefined)).toBe('none')
+  })
+
+  test('should aggregate reports by directive and blocked origin', () => {
+    const report = query => ({
+      'effective-directive': 'script-src-elem',
+      'blocked-uri': `https://tracker.example/t.js?${query}`
+    })
+    ingestCspReports([report('a=1'), report('a=2'), report('a=3')])
+    ingestCspReports([{ 'effective-directive': 'img-src', 'blocked-uri': 'https://img.example/p.png' }])
+
+    expect(getCspReportStats().pendingGroups).toBe(2)
+
+    const groups = flushCspReports()
+    const scripts = groups.find(group => group.directive === 'script-src-elem')
+    expect(scripts.blockedOrigin).toBe('https://tracker.example')
+    expect(scripts.count).toBe(3)
+    expect(scripts.estimatedCount).toBe(3)
+    expect(getCspReportStats().pendingGroups).toBe(0)
+  })
+
+  test('should keep critical violations apart from sampled groups', () => {
+    ingestCspReports([
+      { 'effective-directive': 'script-src', 'blocked-uri': 'eval' },
+      { 'effective-directive': 'script-src', 'blocked-uri': 'eval' }
+    ])
+
+    const [group] = flushCspReports()
+    expect(group.severity).toBe('critical')
+    expect(group.estimatedCount).toBe(2)
+  })
+})
@@ -3,6 +3,22 @@
  * Converts between camelCase (UI/TS) and snake_case (DB) naming conventions
  */
 
+// Key conversions are memoized; DB rows reuse a small set of column names.
+// Bounded so user-controlled JSON keys cannot grow the caches without limit.
+const KEY_CACHE_LIMIT = 2000;
+const snakeKeyCache = new Map<string, string>();
+const camelKeyCache = new Map<string, string>();
+
+function cachedKey(cache: Map<string, string>, key: string, convert: (key: string) => string): string {
+  let converted = cache.get(key);
+  if (converted === undefined) {
+    converted = convert(key);
+    if (cache.size >= KEY_CACHE_LIMIT) cache.clear();
+    cache.set(key, converted);
+  }
+  return converted;
+}
+
 /**
  * Convert a camelCase string to snake_case
  */
@@ -17,72 +33,46 @@ export function toCamelCase(str: string): string {
   return str.replace(/_([a-z])/g, (_, letter) => letter.toUpperCase());
 }
 
-/**
- * Deep convert object keys from camelCase to snake_case
- */
-export function toSnake(obj: any): any {
-  if (obj === null || obj === undefined) {
-    return obj;
-  }
-  
-  if (typeof obj === 'string' || typeof obj === 'number' || typeof obj === 'boolean') {
+function convertKeys(
+  obj: any,
+  cache: Map<string, string>,
+  convert: (key: string) => string
+): any {
+  if (obj === null || typeof obj !== 'object' || obj instanceof Date) {
     return obj;
   }
-  
-  if (obj instanceof Date) {
-    return obj;
-  }
-  
+
   if (Array.isArray(obj)) {
-    return obj.map(item => toSnake(item));
-  }
-  
-  if (typeof obj === 'object') {
-    const result: any = {};
-    
-    for (const [key, value] of Object.entries(obj)) {
-      const snakeKey = toSnakeCase(key);
-      result[snakeKey] = toSnake(value);
+    const result = new Array(obj.length);
+    for (let i = 0; i < obj.length; i++) {
+      result[i] = convertKeys(obj[i], cache, convert);
     }
-    
     return result;
   }
-  
-  return obj;
+
+  const result: any = {};
+  const keys = Object.keys(obj);
+
+  for (let i = 0; i < keys.length; i++) {
+    const key = keys[i];
+    result[cachedKey(cache, key, convert)] = convertKeys(obj[key], cache, convert);
+  }
+
+  return result;
+}
+
+/**
+ * Deep convert object keys from camelCase to snake_case
+ */
+export function toSnake(obj: any): any {
+  return convertKeys(obj, snakeKeyCache, toSnakeCase);
 }
 
 /**
  * Deep convert object keys from snake_case to camelCase
  */
 export function toCamel(obj: any): any {
-  if (obj === null || obj === undefined) {
-    return obj;
-  }
-  
-  if (typeof obj === 'string' || typeof obj === 'number' || typeof obj === 'boolean') {
-    return obj;
-  }
-  
-  if (obj instanceof Date) {
-    return obj;
-  }
-  
-  if (Array.isArray(obj)) {
-    return obj.map(item => toCamel(item));
-  }
-  
-  if (typeof obj === 'object') {
-    const result: any = {};
-    
-    for (const [key, value] of Object.entries(obj)) {
-      const camelKey = toCamelCase(key);
-      result[camelKey] = toCamel(value);
-    }
-    
-    return result;
-  }
-  
-  return obj;
+  return convertKeys(obj, camelKeyCache, toCamelCase);
 }
 
 /**
@@ -138,167 +138,180 @@ function getPreviousDate(dateString) {
   return date.toISOString().split('T')[0];
 }
 
-// Check and unlock achievements
-export async function checkAchievements(userId, gameData) {
-  try {
-    const achievements = [];
-    
-    // Get existing achievements
-    const { data: existing, error: fetchError } = await supabase
-      .from('achievements')
-      .select('achievement_type')
-      .eq('user_id', userId);
-
-    if (fetchError) {
-      console.error('Error fetching achievements:', fetchError);
-      return [];
-    }
-
-    const existingTypes = existing?.map(a => a.achievement_type) || [];
-
-    // Check first_run achievement
-    if (!existingTypes.includes('first_run')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'first_run',
-        title: 'Primer Entrenamiento',
-        description: 'Completaste tu primera sesión de entrenamiento',
-        icon: '🎯',
-        unlocked_at: new Date().toISOString()
-      });
-    }
-
-    // EXISTING ACHIEVEMENTS (Phase 1-2)
-    
-    // Check speed achievements
-    if (gameData.game === 'rsvp' && gameData.metrics?.wpm_end >= 600 && !existingTypes.includes('speed_600_wpm')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'speed_600_wpm',
-        title: 'Velocidad Supersónica',
-        description: 'Alcanzaste 600 WPM en lectura rápida',
-        icon: '⚡',
-        unlocked_at: new Date().toISOString()
-      });
-    }
-
-    // Check Schulte achievements
-    if (gameData.game === 'shuttle' && gameData.metrics?.difficulty_level >= 7 && !existingTypes.includes('schulte_7x7')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'schulte_7x7',
-        title: 'Maestro Schulte',
-        description: 'Completaste una tabla Schulte 7x7',
-        icon: '🎯',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+// Achievement rules, evaluated only for the game they belong to.
+// `game: null` rules apply to every run; `check` tests the run and
+// `minStreak` the streak after it. Types, titles, icons and minStreak are
+// mirrored by the allowlist in complete_game_run (supabase/migrations).
+export const ACHIEVEMENT_RULES = [
+  {
+    type: 'first_run',
+    game: null,
+    title: 'Primer Entrenamiento',
+    description: 'Completaste tu primera sesión de entrenamiento',
+    icon: '🎯'
+  },
+  {
+    type: 'week_streak_7',
+    game: null,
+    title: 'Constancia Semanal',
+    description: 'Mantuviste una racha de 7 días',
+    icon: '🔥',
+    minStreak: 7
+  },
+
+  // EXISTING ACHIEVEMENTS (Phase 1-2)
+  {
+    type: 'speed_600_wpm',
+    game: 'rsvp',
+    title: 'Velocidad Supersónica',
+    description: 'Alcanzaste 600 WPM en lectura rápida',
+    icon: '⚡',
+    check: (gameData) => gameData.metrics?.wpm_end >= 600
+  },
+  {
+    type: 'schulte_7x7',
+    game: 'shuttle',
+    title: 'Maestro Schulte',
+    description: 'Completaste una tabla Schulte 7x7',
+    icon: '🎯',
+    check: (gameData) => gameData.metrics?.difficulty_level >= 7
+  },
+  {
+    type: 'digits_7',
+    game: 'memory_digits',
+    title: 'Memoria Excepcional',
+    description: 'Recordaste una secuencia de 7 dígitos',
+    icon: '🧠',
+    check: (gameData) => gameData.metrics?.max_digits >= 7
+  },
+  {
+    type: 'twinwords_90acc',
+    game: 'twin_words',
+    title: 'Ojo de Águila',
+    description: 'Logaste 90% de precisión en Twin Words',
+    icon: '👁️',
+    check: (gameData) => gameData.metrics?.accuracy >= 90
+  },
+
+  // NEW PHASE 3 GAME ACHIEVEMENTS
+  {
+    type: 'runningwords_lvl10',
+    game: 'running_words',
+    title: 'Memoria Secuencial',
+    description: 'Alcanzaste nivel 10 en Running Words',
+    icon: '🏃',
+    check: (gameData) => gameData.difficulty_level >= 10
+  },
+  {
+    type: 'letters_grid_15',
+    game: 'letters_grid',
+    title: 'Vista de Águila',
+    description: 'Completaste una cuadrícula 15x15 en Letters Grid',
+    icon: '🎯',
+    check: (gameData) => gameData.metrics?.N >= 15
+  },
+  {
+    type: 'wordsearch_10_words',
+    game: 'word_search',
+    title: 'Cazador de Palabras',
+    description: 'Encontraste 10 o más palabras en una sola partida',
+    icon: '🔍',
+    check: (gameData) => gameData.metrics?.wordsFound >= 10
+  },
+  {
+    type: 'anagram_7len',
+    game: 'anagrams',
+    title: 'Descifrador Experto',
+    description: 'Resolviste un anagrama de 7 o más letras',
+    icon: '🔤',
+    check: (gameData) => gameData.metrics?.length >= 7 && gameData.metrics?.solved === true
+  },
+
+  // NEW AI ACHIEVEMENT (Phase 2)
+  {
+    type: 'reading_quiz_5of5',
+    game: 'reading_quiz',
+    title: 'Comprensión Perfecta',
+    description: 'Acertaste 5 de 5 preguntas en el quiz de comprensión',
+    icon: '🧠',
+    check: (gameData) => gameData.metrics?.correct === gameData.metrics?.total && gameData.metrics?.total >= 5
+  }
+];
+
+const GLOBAL_RULES = ACHIEVEMENT_RULES.filter(rule => !rule.game);
+const RULES_BY_GAME = new Map();
+ACHIEVEMENT_RULES.forEach(rule => {
+  if (!rule.game) return;
+  if (!RULES_BY_GAME.has(rule.game)) RULES_BY_GAME.set(rule.game, []);
+  RULES_BY_GAME.get(rule.game).push(rule);
+});
+
+export function getRulesForGame(game) {
+  return [...GLOBAL_RULES, ...(RULES_BY_GAME.get(game) || [])];
+}
 
-    // Check Memory Digits achievements
-    if (gameData.game === 'memory_digits' && gameData.metrics?.max_digits >= 7 && !existingTypes.includes('digits_7')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'digits_7',
-        title: 'Memoria Excepcional',
-        description: 'Recordaste una secuencia de 7 dígitos',
-        icon: '🧠',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+function passesRunCheck(rule, gameData) {
+  return !rule.check || rule.check(gameData) === true;
+}
 
-    // Check Twin Words achievements
-    if (gameData.game === 'twin_words' && gameData.metrics?.accuracy >= 90 && !existingTypes.includes('twinwords_90acc')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'twinwords_90acc',
-        title: 'Ojo de Águila',
-        description: 'Logaste 90% de precisión en Twin Words',
-        icon: '👁️',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+// Unlocked achievement types per user. Unlocks only ever grow, so a user's
+// set is loaded once and then kept current from our own inserts.
+const UNLOCKED_CACHE_TTL_MS = 10 * 60 * 1000;
+const unlockedCache = new Map();
 
-    // NEW PHASE 3 GAME ACHIEVEMENTS
-    
-    // Running Words - Level 10 achievement
-    if (gameData.game === 'running_words' && gameData.difficulty_level >= 10 && !existingTypes.includes('runningwords_lvl10')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'runningwords_lvl10',
-        title: 'Memoria Secuencial',
-        description: 'Alcanzaste nivel 10 en Running Words',
-        icon: '🏃',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+async function getUnlockedTypes(userId) {
+  const cached = unlockedCache.get(userId);
+  if (cached && Date.now() - cached.loadedAt < UNLOCKED_CACHE_TTL_MS) {
+    return cached.types;
+  }
 
-    // Letters Grid - N>=15 achievement
-    if (gameData.game === 'letters_grid' && gameData.metrics?.N >= 15 && !existingTypes.includes('letters_grid_15')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'letters_grid_15',
-        title: 'Vista de Águila',
-        description: 'Completaste una cuadrícula 15x15 en Letters Grid',
-        icon: '🎯',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+  const { data: existing, error: fetchError } = await supabase
+    .from('achievements')
+    .select('achievement_type')
+    .eq('user_id', userId);
 
-    // Word Search - 10+ words in one run
-    if (gameData.game === 'word_search' && gameData.metrics?.wordsFound >= 10 && !existingTypes.includes('wordsearch_10_words')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'wordsearch_10_words',
-        title: 'Cazador de Palabras',
-        description: 'Encontraste 10 o más palabras en una sola partida',
-        icon: '🔍',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+  if (fetchError) {
+    console.error('Error fetching achievements:', fetchError);
+    return null;
+  }
 
-    // Anagrams - 7+ letter word solved
-    if (gameData.game === 'anagrams' && gameData.metrics?.length >= 7 && gameData.metrics?.solved === true && !existingTypes.includes('anagram_7len')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'anagram_7len',
-        title: 'Descifrador Experto',
-        description: 'Resolviste un anagrama de 7 o más letras',
-        icon: '🔤',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+  const types = new Set(existing?.map(a => a.achievement_type) || []);
+  unlockedCache.set(userId, { types, loadedAt: Date.now() });
+  return types;
+}
 
-    // NEW AI ACHIEVEMENT (Phase 2)
-    
-    // Reading Quiz - Perfect 5/5 score
-    if (gameData.game === 'reading_quiz' && gameData.metrics?.correct === gameData.metrics?.total && gameData.metrics?.total >= 5 && !existingTypes.includes('reading_quiz_5of5')) {
-      achievements.push({
-        user_id: userId,
-        achievement_type: 'reading_quiz_5of5',
-        title: 'Comprensión Perfecta',
-        description: 'Acertaste 5 de 5 preguntas en el quiz de comprensión',
-        icon: '🧠',
-        unlocked_at: new Date().toISOString()
-      });
+// Check and unlock achievements
+// Pass `context.streak` (e.g. the result of updateStreak) to skip the streak read.
+export async function checkAchievements(userId, gameData, context = {}) {
+  try {
+    const unlocked = await getUnlockedTypes(userId);
+    if (!unlocked) return [];
+
+    const pending = getRulesForGame(gameData.game).filter(rule => !unlocked.has(rule.type));
+    if (pending.length === 0) return [];
+
+    let streak = context.streak;
+    if (streak === undefined && pending.some(rule => rule.minStreak)) {
+      const { data } = await supabase
+        .from('streaks')
+        .select('current')
+        .eq('user_id', userId)
+        .single();
+      streak = data;
     }
 
-    // Check streak achievements
-    const { data: streak } = await supabase
-      .from('streaks')
-      .select('current')
-      .eq('user_id', userId)
-      .single();
-
-    if (streak?.current >= 7 && !existingTypes.includes('week_streak_7')) {
-      achievements.push({
+    const unlockedAt = new Date().toISOString();
+    const achievements = pending
+      .filter(rule => passesRunCheck(rule, gameData))
+      .filter(rule => !rule.minStreak || streak?.current >= rule.minStreak)
+      .map(rule => ({
         user_id: userId,
-        achievement_type: 'week_streak_7',
-        title: 'Constancia Semanal',
-        description: 'Mantuviste una racha de 7 días',
-        icon: '🔥',
-        unlocked_at: new Date().toISOString()
-      });
-    }
+        achievement_type: rule.type,
+        title: rule.title,
+        description: rule.description,
+        icon: rule.icon,
+        unlocked_at: unlockedAt
+      }));
 
     // Insert new achievements
     if (achievements.length > 0) {
@@ -310,6 +323,7 @@ export async function checkAchievements(userId, gameData) {
         console.error('Error inserting achievements:', insertError);
         return [];
       }
+      achievements.forEach(achievement => unlocked.add(achievement.achievement_type));
     }
 
     return achievements;
@@ -319,6 +333,56 @@ export async function checkAchievements(userId, gameData) {
   }
 }
 
+// Apply XP, streak and achievement unlocks for a finished run in one RPC
+// (complete_game_run). Falls back to the separate calls if the RPC fails.
+// Returns { profile, streak, achievements } in the shapes of updateUserProfile,
+// updateStreak and checkAchievements.
+export async function completeGameRun(userId, gameData) {
+  const isValid = isValidGameRun(gameData);
+  const xpGain = isValid ? calculateXpGain(gameData.score || 0) : 0;
+
+  // Rules already known to be unlocked are not sent. Only the type is: the
+  // RPC takes titles, icons and streak minimums from its own list.
+  const unlocked = unlockedCache.get(userId)?.types;
+  const candidates = isValid
+    ? getRulesForGame(gameData.game)
+        .filter(rule => !unlocked?.has(rule.type) && passesRunCheck(rule, gameData))
+        .map(rule => ({ type: rule.type }))
+    : [];
+
+  try {
+    const { data, error } = await supabase
+      .rpc('complete_game_run', {
+        p_user_id: userId,
+        p_xp_gain: xpGain,
+        p_is_valid: isValid,
+        p_candidates: candidates
+      })
+      .single();
+
+    if (error) throw error;
+
+    unlockedCache.set(userId, { types: new Set(data.unlocked_types || []), loadedAt: Date.now() });
+
+    return {
+      isValid,
+      profile: isValid ? { xp: data.xp, level: data.level, xpGain, levelUp: data.level_up } : null,
+      streak: { current: data.streak_current, longest: data.streak_longest, increased: data.streak_increased },
+      achievements: (data.new_achievements || []).map(achievement => ({ user_id: userId, ...achievement }))
+    };
+  } catch (error) {
+    console.error('complete_game_run failed, using separate updates:', error);
+  }
+
+  if (!isValid) {
+    return { isValid, profile: null, streak: await updateStreak(userId, false), achievements: [] };
+  }
+  const profile = await updateUserProfile(userId, xpGain);
+  const streak = await updateStreak(userId, true);
+  const achievements = await checkAchievements(userId, gameData, { streak: streak || undefined });
+  return { isValid, profile, streak, achievements };
+}
+
 // Get user stats
 export async function getUserStats(userId) {
   try {
@@ -0,0 +1,100 @@
+/**
+ * Pre-generated grid pool
+ * Keeps a few ready grids per key (e.g. level) so round transitions take a
+ * grid instead of generating one, and refills in browser idle time.
+ */
+
+type IdleHandle = { cancel: () => void };
+
+function scheduleIdle(callback: () => void): IdleHandle {
+  if (typeof window !== 'undefined' && 'requestIdleCallback' in window) {
+    const id = (window as any).requestIdleCallback(callback, { timeout: 1000 });
+    return { cancel: () => (window as any).cancelIdleCallback(id) };
+  }
+  const id = setTimeout(callback, 0);
+  return { cancel: () => clearTimeout(id) };
+}
+
+export interface GridPoolOptions {
+  /** Grids kept ready per key */
+  size?: number;
+  /** Max keys kept; least recently used keys are dropped */
+  maxKeys?: number;
+}
+
+export class GridPool<K, T> {
+  private pools = new Map<K, T[]>();
+  private pending = new Set<K>();
+  private idle: IdleHandle | null = null;
+  private generate: (key: K) => T;
+  private size: number;
+  private maxKeys: number;
+
+  constructor(generate: (key: K) => T, { size = 3, maxKeys = 8 }: GridPoolOptions = {}) {
+    this.generate = generate;
+    this.size = size;
+    this.maxKeys = maxKeys;
+  }
+
+  /**
+   * Take a ready grid for `key` (generated synchronously if the pool is empty)
+   * and schedule a refill
+   */
+  take(key: K): T {
+    const pool = this.touch(key);
+    const grid = pool.length > 0 ? (pool.shift() as T) : this.generate(key);
+    this.prefill(key);
+    return grid;
+  }
+
+  /**
+   * Fill the pool for `key` (e.g. the next level) in idle time
+   */
+  prefill(key: K): void {
+    this.touch(key);
+    this.pending.add(key);
+    if (!this.idle) this.idle = scheduleIdle(() => this.refill());
+  }
+
+  available(key: K): number {
+    return this.pools.get(key)?.length ?? 0;
+  }
+
+  clear(): void {
+    this.idle?.cancel();
+    this.idle = null;
+    this.pending.clear();
+    this.pools.clear();
+  }
+
+  private touch(key: K): T[] {
+    let pool = this.pools.get(key);
+    if (pool) {
+      this.pools.delete(key);
+    } else {
+      pool = [];
+      if (this.pools.size >= this.maxKeys) {
+        const oldest = this.pools.keys().next().value as K;
+        this.pools.delete(oldest);
+        this.pending.delete(oldest);
+      }
+    }
+    this.pools.set(key, pool);
+    return pool;
+  }
+
+  // Generate one grid per idle callback so refills never block a frame for long
+  private refill(): void {
+    this.idle = null;
+    for (const key of this.pending) {
+      const pool = this.pools.get(key);
+      if (!pool || pool.length >= this.size) {
+        this.pending.delete(key);
+        continue;
+      }
+      pool.push(this.generate(key));
+      break;
+    }
+    if (this.pending.size > 0) this.idle = scheduleIdle(() => this.refill());
+  }
+}
@@ -0,0 +1,94 @@
+import crypto from 'crypto'
+import { TtlLruStore } from './ttl-store'
+
+/**
+ * Idempotency keys for create endpoints (POST /api/gameRuns, /api/session_schedules)
+ *
+ * Clients send `Idempotency-Key: <uuid>`; retries with the same key get the
+ * original response instead of creating another row.
+ *
+ * - Recent results live in an in-memory LRU (24h), and concurrent duplicates
+ *   wait for the first request instead of racing it
+ * - Across restarts and instances, the row id is derived from (user, key), so
+ *   the primary key is the unique constraint: a duplicate insert fails with
+ *   23505 and the route answers with the existing row
+ */
+
+const KEY_TTL_MS = 24 * 60 * 60 * 1000
+const KEY_PATTERN = /^[A-Za-z0-9_\-:.]{8,128}$/
+
+const results = new TtlLruStore({
+  maxEntries: parseInt(process.env.IDEMPOTENCY_MAX_KEYS) || 10000,
+  resolutionMs: 60 * 1000,
+  horizonMs: KEY_TTL_MS
+})
+const pending = new Map()
+
+export const IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+/**
+ * @returns {string|null} the request's idempotency key, or null if absent/invalid
+ */
+export function getIdempotencyKey(request) {
+  const key = request.headers.get(IDEMPOTENCY_HEADER)
+  return isValidIdempotencyKey(key) ? key : null
+}
+
+/**
+ * Keys sent in a request body (batched sync) follow the header's format
+ */
+export function isValidIdempotencyKey(key) {
+  return typeof key === 'string' && KEY_PATTERN.test(key)
+}
+
+/**
+ * Deterministic row id for (scope, user, key), as a UUID-formatted hash
+ */
+export function idempotentId(scope, userId, key) {
+  const hex = crypto.createHash('sha256').update(`${scope}:${userId || ''}:${key}`).digest('hex')
+  // Version 5-style layout so it is a valid uuid column value
+  return [
+    hex.slice(0, 8),
+    hex.slice(8, 12),
+    '5' + hex.slice(13, 16),
+    ((parseInt(hex[16], 16) & 0x3) | 0x8).toString(16) + hex.slice(17, 20),
+    hex.slice(20, 32)
+  ].join('-')
+}
+
+/**
+ * Run `handler` once per (scope, user, key)
+ * @param {Function} handler - async () => ({ status, body }); only 2xx results are remembered
+ * @returns {Promise<{ status: number, body: any, replayed: boolean }>}
+ */
+export async function withIdempotency(scope, userId, key, handler) {
+  if (!key) return { ...(await handler()), replayed: false }
+
+  const cacheKey = `${scope}:${userId || ''}:${key}`
+  const cached = results.get(cacheKey)
+  if (cached) return { ...cached, replayed: true }
+
+  const inflight = pending.get(cacheKey)
+  if (inflight) return { ...(await inflight), replayed: true }
+
+  const promise = Promise.resolve().then(handler)
+  pending.set(cacheKey, promise)
+  try {
+    const result = await promise
+    if (result.status >= 200 && result.status < 300) {
+      const now = Date.now()
+      results.sweep(now)
+      results.set(cacheKey, result, now + KEY_TTL_MS)
+    }
+    return { ...result, replayed: false }
+  } finally {
+    pending.delete(cacheKey)
+  }
+}
+
+/**
+ * Postgres unique violation (duplicate idempotent insert)
+ */
+export function isUniqueViolation(error) {
+  return error?.code === '23505'
+}
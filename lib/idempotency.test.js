@@ -0,0 +1,64 @@
+/**
+ * Tests for Idempotency-Key handling
+ * Validates key parsing, derived ids and replay of stored results
+ */
+
+import { describe, test, expect } from 'vitest'
+import { getIdempotencyKey, idempotentId, withIdempotency } from '@/lib/idempotency'
+
+const requestWithKey = key => ({ headers: new Headers(key ? { 'Idempotency-Key': key } : {}) })
+
+describe('Idempotency Keys', () => {
+  test('should accept well-formed keys only', () => {
+    expect(getIdempotencyKey(requestWithKey('4f6c1e2a-8d2b-4c1e-9a7b-0d1e2f3a4b5c'))).toBe('4f6c1e2a-8d2b-4c1e-9a7b-0d1e2f3a4b5c')
+    expect(getIdempotencyKey(requestWithKey('short'))).toBeNull()
+    expect(getIdempotencyKey(requestWithKey('has spaces in it'))).toBeNull()
+    expect(getIdempotencyKey(requestWithKey(null))).toBeNull()
+  })
+
+  test('should derive a stable uuid per scope, user and key', () => {
+    const id = idempotentId('gameRuns', 'user-1', 'key-12345')
+    expect(id).toMatch(/^[0-9a-f]{8}-[0-9a-f]{4}-5[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$/)
+    expect(idempotentId('gameRuns', 'user-1', 'key-12345')).toBe(id)
+    expect(idempotentId('gameRuns', 'user-2', 'key-12345')).not.toBe(id)
+    expect(idempotentId('session_schedules', 'user-1', 'key-12345')).not.toBe(id)
+  })
+
+  test('should replay the first successful response', async () => {
+    let calls = 0
+    const handler = async () => ({ status: 200, body: { n: ++calls } })
+
+    const first = await withIdempotency('gameRuns', 'u', 'replay-key-1', handler)
+    const second = await withIdempotency('gameRuns', 'u', 'replay-key-1', handler)
+
+    expect(first).toEqual({ status: 200, body: { n: 1 }, replayed: false })
+    expect(second).toEqual({ status: 200, body: { n: 1 }, replayed: true })
+    expect(calls).toBe(1)
+  })
+
+  test('should share one execution between concurrent duplicates', async () => {
+    let calls = 0
+    const handler = () => new Promise(resolve => setTimeout(() => resolve({ status: 202, body: ++calls }), 10))
+
+    const results = await Promise.all([
+      withIdempotency('gameRuns', 'u', 'concurrent-key', handler),
+      withIdempotency('gameRuns', 'u', 'concurrent-key', handler)
+    ])
+
+    expect(calls).toBe(1)
+    expect(results.map(r => r.replayed).sort()).toEqual([false, true])
+  })
+
+  test('should not remember failures or keyless requests', async () => {
+    let calls = 0
+    const failing = async () => ({ status: 500, body: { n: ++calls } })
+
+    await withIdempotency('gameRuns', 'u', 'failing-key-1', failing)
+    const retry = await withIdempotency('gameRuns', 'u', 'failing-key-1', failing)
+    expect(retry.body.n).toBe(2)
+
+    await withIdempotency('gameRuns', 'u', null, async () => ({ status: 200, body: ++calls }))
+    await withIdempotency('gameRuns', 'u', null, async () => ({ status: 200, body: ++calls }))
+    expect(calls).toBe(4)
+  })
+})
@@ -3,7 +3,7 @@
  * Verifies fast, synchronous grid generation
  */
 
-import { generateGrid, getGridConfig, getConfusables } from '../lib/letters/generateGrid.ts'
+import { generateGrid, getGridConfig, getConfusables, generateLevelGrid } from '@/lib/letters/generateGrid'
 
 describe('Letters Grid Generator', () => {
   test('should generate grid synchronously and quickly', () => {
@@ -161,4 +161,14 @@ describe('Letters Grid Generator', () => {
     // Very unlikely to have identical target positions in random generation
     expect(positions1).not.toEqual(positions2)
   })
+
+  test('same level and seed should generate the same grid', () => {
+    const first = generateLevelGrid(12, 42)
+    const replay = generateLevelGrid(12, 42)
+    const other = generateLevelGrid(12, 43)
+    
+    expect(replay.cells).toEqual(first.cells)
+    expect(other.cells).not.toEqual(first.cells)
+    expect(first.cells.filter(cell => cell.isTarget)).toHaveLength(first.config.targetCount)
+  })
 })
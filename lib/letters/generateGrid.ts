@@ -3,6 +3,9 @@
  * Ensures no async race conditions and < 600ms render on phones
  */
 
+import { createRng, randomSeed } from '../seeded-random';
+import { GridPool } from '../grid-pool';
+
 export type GridCell = {
   id: string;
   char: string;
@@ -15,18 +18,25 @@ export interface GenerateGridArgs {
   targetLetter: string;
   targetCount: number;
   confusables: string[];
+  /** Seed for a reproducible grid; omitted uses Math.random */
+  seed?: number;
 }
 
+const DEFAULT_FILLERS = [
+  'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
+  'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'
+];
+
 /**
  * Generates a grid with guaranteed target letters and confusable fillers
  * @param args Grid generation parameters
  * @returns Array of grid cells in row-major order
  */
 export function generateGrid(args: GenerateGridArgs): GridCell[] {
-  const { rows, cols, targetLetter, targetCount, confusables } = args;
+  const { rows, cols, targetLetter, targetCount, confusables, seed } = args;
+  const random = seed === undefined ? Math.random : createRng(seed);
   
   const totalCells = rows * cols;
-  const grid: GridCell[] = [];
   
   // Validate inputs
   if (targetCount > totalCells) {
@@ -37,58 +47,37 @@ export function generateGrid(args: GenerateGridArgs): GridCell[] {
     throw new Error('Must have at least 1 target');
   }
   
-  // Create array of all positions
-  const positions = Array.from({ length: totalCells }, (_, i) => i);
-  
-  // Shuffle positions using Fisher-Yates algorithm for even distribution
-  for (let i = positions.length - 1; i > 0; i--) {
-    const j = Math.floor(Math.random() * (i + 1));
-    [positions[i], positions[j]] = [positions[j], positions[i]];
-  }
-  
-  // Place target letters first
-  const targetPositions = positions.slice(0, targetCount);
-  const nonTargetPositions = positions.slice(targetCount);
-  
-  // Initialize all cells as non-targets
-  for (let i = 0; i < totalCells; i++) {
-    grid[i] = {
-      id: `cell-${i}`,
-      char: '',
-      isTarget: false
-    };
-  }
-  
-  // Place targets
-  targetPositions.forEach(pos => {
-    grid[pos] = {
-      id: `cell-${pos}`,
-      char: targetLetter,
-      isTarget: true
-    };
-  });
-  
   // Fill remaining cells with confusables
   // If no confusables provided, use a default set
-  const fillers = confusables.length > 0 ? confusables : [
-    'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 
-    'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'
-  ].filter(char => char !== targetLetter);
+  const fillers = confusables.length > 0
+    ? confusables
+    : DEFAULT_FILLERS.filter(char => char !== targetLetter);
   
   // Ensure we have enough fillers
   if (fillers.length === 0) {
     throw new Error('No confusable characters available for filling grid');
   }
   
-  // Fill non-target positions
-  nonTargetPositions.forEach(pos => {
-    const randomChar = fillers[Math.floor(Math.random() * fillers.length)];
-    grid[pos] = {
-      id: `cell-${pos}`,
-      char: randomChar,
-      isTarget: false
-    };
-  });
+  // Partial Fisher-Yates: only the first targetCount positions need shuffling
+  const positions = new Uint16Array(totalCells);
+  for (let i = 0; i < totalCells; i++) positions[i] = i;
+  
+  const isTarget = new Uint8Array(totalCells);
+  for (let i = 0; i < targetCount; i++) {
+    const j = i + Math.floor(random() * (totalCells - i));
+    const pos = positions[j];
+    positions[j] = positions[i];
+    positions[i] = pos;
+    isTarget[pos] = 1;
+  }
+  
+  // One cell object per position
+  const grid: GridCell[] = new Array(totalCells);
+  for (let pos = 0; pos < totalCells; pos++) {
+    grid[pos] = isTarget[pos]
+      ? { id: `cell-${pos}`, char: targetLetter, isTarget: true }
+      : { id: `cell-${pos}`, char: fillers[Math.floor(random() * fillers.length)], isTarget: false };
+  }
   
   return grid;
 }
@@ -159,3 +148,37 @@ export function getGridConfig(level: number): {
     confusables: getConfusables(targetLetter)
   };
 }
+
+export interface LevelGrid {
+  level: number;
+  seed: number;
+  config: ReturnType<typeof getGridConfig>;
+  cells: GridCell[];
+}
+
+/**
+ * Generate the grid for a level; the same (level, seed) always yields the same grid
+ * @param level Game level (1-20)
+ * @param seed Round seed (random when omitted); log it to replay the round
+ */
+export function generateLevelGrid(level: number, seed: number = randomSeed()): LevelGrid {
+  const config = getGridConfig(level);
+  return {
+    level,
+    seed,
+    config,
+    cells: generateGrid({ ...config, seed })
+  };
+}
+
+// Ready grids per level, refilled in idle time
+const levelGridPool = new GridPool<number, LevelGrid>((level) => generateLevelGrid(level));
+
+/**
+ * Take a pre-generated grid for a level and queue the next level's grids
+ */
+export function takeLevelGrid(level: number): LevelGrid {
+  const grid = levelGridPool.take(level);
+  levelGridPool.prefill(level + 1);
+  return grid;
+}
@@ -66,4 +66,12 @@ describe('generateNumberGrid', () => {
     
     expect(grid.every(item => item.value >= 10 && item.value <= 50)).toBe(true);
   });
+
+  test('same seed reproduces the grid', () => {
+    const opts = { gridSize: 16, targetParity: 'odd', ratioTargets: 0.45, min: 1, max: 99 };
+    const grid = generateNumberGrid({ ...opts, seed: 7 });
+
+    expect(generateNumberGrid({ ...opts, seed: 7 })).toEqual(grid);
+    expect(new Set(grid.map(item => item.value)).size).toBe(16);
+  });
 });
@@ -1,28 +1,38 @@
+import { createRng, randomSeed } from '../seeded-random';
+import { GridPool } from '../grid-pool';
+
 export type GridItem = { id: string; value: number; isTarget: boolean };
 
-export function generateNumberGrid(opts: {
+export type NumberGridOptions = {
   gridSize: number;
   targetParity: 'even' | 'odd';
   ratioTargets: number;
   min: number;
   max: number;
-}): GridItem[] {
-  const { gridSize, targetParity, ratioTargets, min, max } = opts;
+  /** Seed for a reproducible grid; omitted uses Math.random */
+  seed?: number;
+};
+
+export function generateNumberGrid(opts: NumberGridOptions): GridItem[] {
+  const { gridSize, targetParity, ratioTargets, min, max, seed } = opts;
+  const random = seed === undefined ? Math.random : createRng(seed);
   const isTarget = (n: number) =>
     targetParity === 'even' ? n % 2 === 0 : n % 2 !== 0;
   const totalTargets = Math.round(gridSize * ratioTargets);
   const totalDistractors = gridSize - totalTargets;
-  const range = Array.from({ length: max - min + 1 }, (_, i) => min + i);
-  const targets = range.filter(isTarget);
-  const distractors = range.filter((n) => !isTarget(n));
+  const targets: number[] = [];
+  const distractors: number[] = [];
+  for (let n = min; n <= max; n++) {
+    (isTarget(n) ? targets : distractors).push(n);
+  }
+  // Partial Fisher-Yates: draws `count` distinct values without splicing
   function pickRandom(arr: number[], count: number): number[] {
-    const copy = [...arr];
-    const out: number[] = [];
-    while (out.length < count && copy.length) {
-      const idx = Math.floor(Math.random() * copy.length);
-      out.push(copy.splice(idx, 1)[0]);
+    const n = Math.min(count, arr.length);
+    for (let i = 0; i < n; i++) {
+      const j = i + Math.floor(random() * (arr.length - i));
+      [arr[i], arr[j]] = [arr[j], arr[i]];
     }
-    return out;
+    return arr.slice(0, n);
   }
   const chosenTargets = pickRandom(targets, totalTargets);
   const chosenDistractors = pickRandom(distractors, totalDistractors);
@@ -30,8 +40,29 @@ export function generateNumberGrid(opts: {
     ...chosenDistractors.map((v) => ({ value: v, isTarget: false }))];
   // Shuffle
   for (let i = all.length - 1; i > 0; i--) {
-    const j = Math.floor(Math.random() * (i + 1));
+    const j = Math.floor(random() * (i + 1));
     [all[i], all[j]] = [all[j], all[i]];
   }
-  return all.map((item, idx) => ({ ...item, id: String(idx) }));
+  return all.map((item, idx) => ({ id: String(idx), value: item.value, isTarget: item.isTarget }));
+}
+
+export type SeededNumberGrid = { seed: number; items: GridItem[] };
+
+const pools = new Map<string, GridPool<string, SeededNumberGrid>>();
+
+/**
+ * Take a pre-generated grid for these options (refilled in idle time).
+ * The returned seed reproduces the grid via generateNumberGrid({ ...opts, seed }).
+ */
+export function takeNumberGrid(opts: Omit<NumberGridOptions, 'seed'>): SeededNumberGrid {
+  const key = `${opts.gridSize}:${opts.targetParity}:${opts.ratioTargets}:${opts.min}:${opts.max}`;
+  let pool = pools.get(key);
+  if (!pool) {
+    pool = new GridPool<string, SeededNumberGrid>(() => {
+      const seed = randomSeed();
+      return { seed, items: generateNumberGrid({ ...opts, seed }) };
+    });
+    pools.set(key, pool);
+  }
+  return pool.take(key);
 }
@@ -0,0 +1,57 @@
+/**
+ * Progress saves shared by /api/progress/save and queued progress_save
+ * actions in /api/sync
+ *
+ * Saves carry the client time the progress was recorded (`updatedAt`, ms or
+ * ISO string). save_game_progress ignores a patch older than the one already
+ * stored, so an offline save synced late cannot roll back lastLevel or
+ * lastBestScore; saves without it are stamped with the server time.
+ */
+
+import { supabase } from './supabase'
+import { toDbFormat, fromDbFormat } from './dbCase'
+
+// Client clocks ahead of ours would make later saves look stale
+const MAX_CLOCK_SKEW_MS = 5 * 60 * 1000
+
+/**
+ * @returns {string|null} error message for a 400, or null when valid
+ */
+export function validateProgressSave(body) {
+  const userId = body?.userId || body?.user_id
+  if (!userId || !body.game || !body.progress) {
+    return 'Missing required fields: userId, game, progress'
+  }
+  const { progress } = body
+  if (typeof progress.lastLevel !== 'number' || typeof progress.lastBestScore !== 'number') {
+    return 'Invalid progress structure. Must include lastLevel and lastBestScore as numbers'
+  }
+  if (body.updatedAt != null && parseUpdatedAt(body.updatedAt) === null) {
+    return 'Invalid updatedAt'
+  }
+  return null
+}
+
+function parseUpdatedAt(value) {
+  const time = typeof value === 'number' ? value : Date.parse(value)
+  return Number.isFinite(time) && time > 0 ? time : null
+}
+
+/**
+ * Merge a validated save into settings.progress[game]
+ * @returns {Promise<Object>} the game's stored progress (camelCase), which is
+ *   unchanged when the save was older than it
+ */
+export async function saveGameProgress(body) {
+  const updatedAt = body.updatedAt != null ? parseUpdatedAt(body.updatedAt) : null
+  const { data, error } = await supabase.rpc('save_game_progress', {
+    p_user_id: body.userId || body.user_id,
+    p_game: body.game,
+    p_patch: toDbFormat(body.progress),
+    p_client_updated_at: updatedAt === null
+      ? null
+      : new Date(Math.min(updatedAt, Date.now() + MAX_CLOCK_SKEW_MS)).toISOString()
+  })
+  if (error) throw error
+  return fromDbFormat(data || {})
+}
@@ -0,0 +1,159 @@
+/**
+ * Streaming quantile sketches for latency metrics
+ *
+ * DDSketch: values are counted in logarithmic buckets so every quantile is
+ * reported within a fixed relative error (1% by default), memory is bounded
+ * by `maxBuckets`, and two sketches merge by adding bucket counts.
+ *
+ * WindowedSketch keeps a ring of per-slot sketches so quantiles can be
+ * queried over any trailing window up to `slotMs * slots`.
+ */
+
+export class DDSketch {
+  constructor({ relativeAccuracy = 0.01, maxBuckets = 2048 } = {}) {
+    this.relativeAccuracy = relativeAccuracy
+    this.maxBuckets = maxBuckets
+    this.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+    this.logGamma = Math.log(this.gamma)
+    this.buckets = new Map()
+    this.zeroCount = 0
+    this.count = 0
+    this.sum = 0
+    this.min = Infinity
+    this.max = -Infinity
+  }
+
+  add(value, weight = 1) {
+    if (!(value >= 0)) return
+
+    this.count += weight
+    this.sum += value * weight
+    if (value < this.min) this.min = value
+    if (value > this.max) this.max = value
+
+    // Sub-microsecond timings are indistinguishable from zero here
+    if (value < 1e-3) {
+      this.zeroCount += weight
+      return
+    }
+
+    const index = Math.ceil(Math.log(value) / this.logGamma)
+    this.buckets.set(index, (this.buckets.get(index) || 0) + weight)
+
+    if (this.buckets.size > this.maxBuckets) {
+      this._collapseLowest()
+    }
+  }
+
+  merge(other) {
+    if (other.count === 0) return this
+
+    this.count += other.count
+    this.sum += other.sum
+    this.zeroCount += other.zeroCount
+    if (other.min < this.min) this.min = other.min
+    if (other.max > this.max) this.max = other.max
+
+    for (const [index, count] of other.buckets) {
+      this.buckets.set(index, (this.buckets.get(index) || 0) + count)
+    }
+    while (this.buckets.size > this.maxBuckets) {
+      this._collapseLowest()
+    }
+    return this
+  }
+
+  quantile(q) {
+    if (this.count === 0) return 0
+    if (q <= 0) return this.min
+    if (q >= 1) return this.max
+
+    const rank = q * (this.count - 1)
+    let seen = this.zeroCount
+    if (rank < seen) return 0
+
+    const indexes = Array.from(this.buckets.keys()).sort((a, b) => a - b)
+    for (const index of indexes) {
+      seen += this.buckets.get(index)
+      if (rank < seen) {
+        // Bucket midpoint keeps the estimate within relativeAccuracy
+        const value = 2 * Math.pow(this.gamma, index) / (this.gamma + 1)
+        return Math.min(Math.max(value, this.min), this.max)
+      }
+    }
+    return this.max
+  }
+
+  clear() {
+    this.buckets.clear()
+    this.zeroCount = 0
+    this.count = 0
+    this.sum = 0
+    this.min = Infinity
+    this.max = -Infinity
+  }
+
+  // Fold the two smallest buckets together; keeps accuracy on the tail
+  _collapseLowest() {
+    const indexes = Array.from(this.buckets.keys()).sort((a, b) => a - b)
+    const [lowest, next] = indexes
+    this.buckets.set(next, this.buckets.get(next) + this.buckets.get(lowest))
+    this.buckets.delete(lowest)
+  }
+}
+
+export class WindowedSketch {
+  constructor({ slotMs = 60 * 1000, slots = 60, relativeAccuracy = 0.01, maxBuckets = 2048 } = {}) {
+    this.slotMs = slotMs
+    this.options = { relativeAccuracy, maxBuckets }
+    this.ring = Array.from({ length: slots }, () => ({
+      start: -1,
+      sketch: new DDSketch(this.options)
+    }))
+  }
+
+  get maxWindowMs() {
+    return this.slotMs * this.ring.length
+  }
+
+  add(value, now = Date.now()) {
+    const start = now - (now % this.slotMs)
+    const slot = this.ring[Math.floor(now / this.slotMs) % this.ring.length]
+
+    if (slot.start !== start) {
+      slot.start = start
+      slot.sketch.clear()
+    }
+    slot.sketch.add(value)
+  }
+
+  /**
+   * Merge every slot that overlaps the trailing window into one sketch
+   */
+  snapshot(windowMs = this.maxWindowMs, now = Date.now()) {
+    const merged = new DDSketch(this.options)
+    const oldest = now - Math.min(windowMs, this.maxWindowMs)
+
+    for (const slot of this.ring) {
+      if (slot.start >= 0 && slot.start + this.slotMs > oldest && slot.start <= now) {
+        merged.merge(slot.sketch)
+      }
+    }
+    return merged
+  }
+}
+
+/**
+ * Summarize a sketch as the p50/p95/p99 shape used by metrics endpoints
+ */
+export function summarizeSketch(sketch) {
+  const round = (value) => Math.round(value * 100) / 100
+
+  return {
+    count: sketch.count,
+    p50: round(sketch.quantile(0.5)),
+    p95: round(sketch.quantile(0.95)),
+    p99: round(sketch.quantile(0.99)),
+    max: sketch.count > 0 ? round(sketch.max) : 0
+  }
+}
@@ -0,0 +1,58 @@
+/**
+ * Tests for the DDSketch quantile sketch
+ * Validates relative accuracy, merging, bounded memory and time windows
+ */
+
+import { describe, test, expect } from 'vitest'
+import { DDSketch, WindowedSketch } from '@/lib/quantile-sketch'
+
+describe('DDSketch', () => {
+  test('should keep quantiles within relative accuracy', () => {
+    const sketch = new DDSketch({ relativeAccuracy: 0.01 })
+    for (let i = 1; i <= 10000; i++) {
+      sketch.add(i / 10)
+    }
+
+    for (const q of [0.5, 0.95, 0.99]) {
+      const exact = (1 + q * 9999) / 10
+      expect(Math.abs(sketch.quantile(q) - exact) / exact).toBeLessThan(0.02)
+    }
+  })
+
+  test('should give the same result merged as added to one sketch', () => {
+    const even = new DDSketch()
+    const odd = new DDSketch()
+    const all = new DDSketch()
+    for (let i = 1; i <= 500; i++) {
+      if (i % 2 === 0) even.add(i)
+      else odd.add(i)
+      all.add(i)
+    }
+
+    even.merge(odd)
+    expect(even.count).toBe(all.count)
+    expect(even.quantile(0.95)).toBe(all.quantile(0.95))
+  })
+
+  test('should keep memory bounded', () => {
+    const sketch = new DDSketch({ maxBuckets: 64 })
+    for (let i = 1; i <= 100000; i++) {
+      sketch.add(i)
+    }
+
+    expect(sketch.buckets.size).toBeLessThanOrEqual(64)
+    expect(sketch.quantile(0.99)).toBeGreaterThan(90000) // high quantiles stay accurate
+  })
+})
+
+describe('WindowedSketch', () => {
+  test('should only count samples inside the requested window', () => {
+    const windowed = new WindowedSketch({ slotMs: 1000, slots: 10 })
+    windowed.add(100, 0)
+    windowed.add(5, 9500)
+
+    expect(windowed.snapshot(10000, 9500).count).toBe(2)
+    expect(windowed.snapshot(1000, 9500).count).toBe(1)
+    expect(windowed.snapshot(1000, 9500).quantile(0.5)).toBeCloseTo(5, 0)
+  })
+})
@@ -1,112 +1,68 @@
 /**
  * Rate Limiting Implementation for Spiread APIs
- * Supports Upstash Redis (preferred) and in-memory token bucket (fallback)
+ * Supports Upstash Redis (preferred) and in-memory store (fallback)
+ * 
+ * Algorithm: GCRA (generic cell rate algorithm). Each key stores a single
+ * "theoretical arrival time" (TAT), so a decision is one atomic Redis script
+ * call and O(1) memory per key, with no burst at fixed window boundaries.
  * 
  * Rate Limits:
  * - /api/ai/*: 30 requests/minute
  * - /api/progress/*: 120 requests/minute
+ * - /api/sync: 30 requests/minute (each a batch of up to 25 offline actions)
  * 
  * Key: IP + userId for authenticated users, IP only for anonymous
  */
 
 import { NextResponse } from 'next/server'
+import { WindowedSketch, summarizeSketch } from './quantile-sketch'
+import { getUpstashClient } from './upstash'
+import { TtlLruStore } from './ttl-store'
 
 // Rate limit configurations
 const RATE_LIMITS = {
   '/api/ai/': {
     requests: 30,
     windowMs: 60 * 1000, // 1 minute
-    message: 'AI API rate limit exceeded. Try again later.',
-    retryAfter: 60
+    message: 'AI API rate limit exceeded. Try again later.'
   },
   '/api/progress/': {
     requests: 120,
     windowMs: 60 * 1000, // 1 minute  
-    message: 'Progress API rate limit exceeded. Try again later.',
-    retryAfter: 60
+    message: 'Progress API rate limit exceeded. Try again later.'
+  },
+  '/api/sync': {
+    requests: 30,
+    windowMs: 60 * 1000, // 1 minute
+    message: 'Sync API rate limit exceeded. Try again later.'
   }
 }
 
 // In-memory store for fallback (when Redis unavailable)
-const memoryStore = new Map()
+// Bounded LRU with a timer-wheel expiry index keyed by each key's TAT
+const memoryStore = new TtlLruStore({
+  maxEntries: parseInt(process.env.RATE_LIMIT_MEMORY_MAX_KEYS || '10000', 10),
+  horizonMs: Math.max(...Object.values(RATE_LIMITS).map(config => config.windowMs))
+})
 
 // Metrics collection
+// Latency is kept per route prefix in 1-minute sketch slots (last hour)
 const metrics = {
   hits: new Map(),
   blocks: new Map(),
-  responseTimes: []
+  latency: new Map()
 }
 
+const monotonicNow = () => (typeof performance !== 'undefined' ? performance.now() : Date.now())
+
 /**
  * Redis client setup (Upstash)
+ * Returns null when unconfigured or while the client's circuit is open,
+ * so the caller falls back to the in-memory store without waiting.
  */
-let redisClient = null
-
-async function getRedisClient() {
-  if (redisClient) return redisClient
-
-  const redisUrl = process.env.UPSTASH_REDIS_REST_URL
-  const redisToken = process.env.UPSTASH_REDIS_REST_TOKEN
-
-  if (!redisUrl || !redisToken) {
-    console.warn('Redis credentials not configured, using in-memory rate limiting')
-    return null
-  }
-
-  try {
-    // Use Upstash REST API for serverless compatibility
-    redisClient = {
-      async get(key) {
-        const response = await fetch(`${redisUrl}/get/${key}`, {
-          headers: { Authorization: `Bearer ${redisToken}` }
-        })
-        const data = await response.json()
-        return data.result
-      },
-
-      async set(key, value, options = {}) {
-        const params = new URLSearchParams()
-        if (options.ex) params.append('EX', options.ex.toString())
-        
-        const response = await fetch(`${redisUrl}/set/${key}?${params}`, {
-          method: 'POST',
-          headers: { 
-            Authorization: `Bearer ${redisToken}`,
-            'Content-Type': 'application/json'
-          },
-          body: JSON.stringify(value)
-        })
-        return response.ok
-      },
-
-      async incr(key) {
-        const response = await fetch(`${redisUrl}/incr/${key}`, {
-          method: 'POST',
-          headers: { Authorization: `Bearer ${redisToken}` }
-        })
-        const data = await response.json()
-        return data.result
-      },
-
-      async expire(key, seconds) {
-        const response = await fetch(`${redisUrl}/expire/${key}/${seconds}`, {
-          method: 'POST',
-          headers: { Authorization: `Bearer ${redisToken}` }
-        })
-        return response.ok
-      }
-    }
-    
-    // Test connection
-    await redisClient.set('rate_limit_test', 'ok', { ex: 1 })
-    console.log('✅ Redis rate limiting enabled')
-    return redisClient
-
-  } catch (error) {
-    console.warn('Redis connection failed, using in-memory rate limiting:', error.message)
-    redisClient = null
-    return null
-  }
+function getRedisClient() {
+  const client = getUpstashClient()
+  return client && client.available ? client : null
 }
 
 /**
@@ -137,71 +93,111 @@ function getRateLimitKey(request, rateLimitPath) {
 }
 
 /**
- * Redis-based rate limiting
+ * GCRA decision for a single request
+ *
+ * A key may send `limit` requests per `windowMs`; one request "costs"
+ * emissionMs = windowMs / limit. The stored TAT is the time at which the
+ * key would be fully drained again.
+ *
+ * @param {number|null} tat - Stored theoretical arrival time (ms), or null
+ * @param {number} now - Current time (ms)
+ * @param {number} limit - Requests allowed per window
+ * @param {number} windowMs - Window length (ms)
+ * @returns {{ allowed: boolean, tat: number, remaining: number, resetTime: number, retryAfterMs: number }}
+ */
+export function gcra(tat, now, limit, windowMs) {
+  const emissionMs = windowMs / limit
+  const base = tat != null && tat > now ? tat : now
+  const newTat = base + emissionMs
+  const allowAt = newTat - windowMs
+
+  if (now < allowAt) {
+    return {
+      allowed: false,
+      tat: base,
+      remaining: 0,
+      resetTime: base,
+      retryAfterMs: allowAt - now
+    }
+  }
+
+  return {
+    allowed: true,
+    tat: newTat,
+    remaining: Math.floor((windowMs - (newTat - now)) / emissionMs),
+    resetTime: newTat,
+    retryAfterMs: 0
+  }
+}
+
+// Same decision as gcra(), executed atomically inside Redis.
+// Uses the Redis clock so all edge instances agree on "now".
+// Returns { allowed, remaining, resetInMs, retryAfterMs }.
+const GCRA_SCRIPT = `
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local emission = window / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local newTat = tat + emission
+local allowAt = newTat - window
+if now < allowAt then
+  return {0, 0, math.ceil(tat - now), math.ceil(allowAt - now)}
+end
+redis.call('SET', KEYS[1], string.format('%.3f', newTat), 'PX', math.ceil(newTat - now))
+return {1, math.floor((window - (newTat - now)) / emission), math.ceil(newTat - now), 0}
+`
+
+/**
+ * Redis-based rate limiting (single EVAL round trip)
  */
 async function checkRateLimitRedis(key, limit, windowMs) {
-  const redis = await getRedisClient()
+  const redis = getRedisClient()
   if (!redis) return null
 
   try {
-    const current = await redis.incr(key)
-    
-    if (current === 1) {
-      // First request in window, set expiration
-      await redis.expire(key, Math.ceil(windowMs / 1000))
-    }
+    const [allowed, remaining, resetInMs, retryAfterMs] = await redis.eval(
+      GCRA_SCRIPT, [key], [limit, windowMs]
+    )
 
     return {
-      count: current,
-      remaining: Math.max(0, limit - current),
-      resetTime: Date.now() + windowMs
+      allowed: allowed === 1,
+      remaining,
+      resetTime: Date.now() + resetInMs,
+      retryAfterMs
     }
   } catch (error) {
-    console.error('Redis rate limit error:', error)
+    console.warn('Redis rate limit error, using in-memory fallback:', error.message)
     return null
   }
 }
 
 /**
- * In-memory token bucket rate limiting (fallback)
+ * In-memory GCRA rate limiting (fallback)
+ * Stores one TAT number per key.
  */
 function checkRateLimitMemory(key, limit, windowMs) {
   const now = Date.now()
-  
-  if (!memoryStore.has(key)) {
-    memoryStore.set(key, {
-      count: 1,
-      resetTime: now + windowMs
-    })
-    return {
-      count: 1,
-      remaining: limit - 1,
-      resetTime: now + windowMs
-    }
-  }
+  memoryStore.sweep(now)
 
-  const bucket = memoryStore.get(key)
-  
-  // Reset if window expired
-  if (now >= bucket.resetTime) {
-    bucket.count = 1
-    bucket.resetTime = now + windowMs
-  } else {
-    bucket.count++
-  }
+  const result = gcra(memoryStore.get(key, now), now, limit, windowMs)
 
-  return {
-    count: bucket.count,
-    remaining: Math.max(0, limit - bucket.count),
-    resetTime: bucket.resetTime
+  if (result.allowed) {
+    // A key's state is irrelevant once its TAT has passed
+    memoryStore.set(key, result.tat, result.tat)
   }
+
+  return result
 }
 
 /**
  * Update metrics
  */
 function updateMetrics(rateLimitPath, blocked, responseTime) {
-  const path = rateLimitPath.replace('/', '')
+  // '/api/ai/' -> 'ai', matching the keys read by /api/rate-limit/metrics
+  const path = rateLimitPath.split('/').filter(Boolean).pop()
   
   // Count hits
   const hits = metrics.hits.get(path) || 0
@@ -213,12 +209,12 @@ function updateMetrics(rateLimitPath, blocked, responseTime) {
     metrics.blocks.set(path, blocks + 1)
   }
   
-  // Track response times (keep last 100)
-  if (responseTime) {
-    metrics.responseTimes.push(responseTime)
-    if (metrics.responseTimes.length > 100) {
-      metrics.responseTimes.shift()
+  // Track response times in a fixed-memory sketch
+  if (responseTime != null) {
+    if (!metrics.latency.has(path)) {
+      metrics.latency.set(path, new WindowedSketch())
     }
+    metrics.latency.get(path).add(responseTime)
   }
 }
 
@@ -226,7 +222,7 @@ function updateMetrics(rateLimitPath, blocked, responseTime) {
  * Main rate limiting function
  */
 export async function rateLimitCheck(request) {
-  const startTime = Date.now()
+  const startTime = monotonicNow()
   const pathname = new URL(request.url).pathname
 
   // Find matching rate limit configuration
@@ -254,14 +250,14 @@ export async function rateLimitCheck(request) {
     result = checkRateLimitMemory(key, rateLimitConfig.requests, rateLimitConfig.windowMs)
   }
 
-  const responseTime = Date.now() - startTime
-  const blocked = result.count > rateLimitConfig.requests
+  const responseTime = monotonicNow() - startTime
+  const blocked = !result.allowed
 
   // Update metrics
   updateMetrics(rateLimitPath, blocked, responseTime)
 
   if (blocked) {
-    console.warn(`Rate limit exceeded for ${pathname}: ${result.count}/${rateLimitConfig.requests}`)
+    console.warn(`Rate limit exceeded for ${pathname}: limit ${rateLimitConfig.requests}/${rateLimitConfig.windowMs}ms`)
     
     return {
       allowed: false,
@@ -269,12 +265,12 @@ export async function rateLimitCheck(request) {
         error: rateLimitConfig.message,
         code: 'RATE_LIMIT_EXCEEDED',
         limit: rateLimitConfig.requests,
-        current: result.count,
+        retryAfterMs: Math.ceil(result.retryAfterMs),
         resetTime: result.resetTime
       }, {
         status: 429,
         headers: {
-          'Retry-After': rateLimitConfig.retryAfter.toString(),
+          'Retry-After': Math.max(1, Math.ceil(result.retryAfterMs / 1000)).toString(),
           'X-RateLimit-Limit': rateLimitConfig.requests.toString(),
           'X-RateLimit-Remaining': result.remaining.toString(),
           'X-RateLimit-Reset': Math.ceil(result.resetTime / 1000).toString()
@@ -295,17 +291,33 @@ export async function rateLimitCheck(request) {
 
 /**
  * Get current metrics
+ * @param {Object} options
+ * @param {number} options.windowMs - Trailing window for latency quantiles (max 1 hour)
  */
-export function getRateLimitMetrics() {
-  const p95ResponseTime = metrics.responseTimes.length > 0 ? 
-    metrics.responseTimes.sort((a, b) => a - b)[Math.floor(metrics.responseTimes.length * 0.95)] : 0
+export function getRateLimitMetrics({ windowMs = 5 * 60 * 1000 } = {}) {
+  const latency = {}
+  let overall = null
+
+  for (const [path, windowed] of metrics.latency) {
+    const sketch = windowed.snapshot(windowMs)
+    latency[path] = summarizeSketch(sketch)
+    overall = overall ? overall.merge(sketch) : sketch
+  }
+
+  const overallSummary = overall ? summarizeSketch(overall) : null
 
   return {
     timestamp: new Date().toISOString(),
+    windowMs,
     hits: Object.fromEntries(metrics.hits),
     blocks: Object.fromEntries(metrics.blocks),
-    responseTimeP95: p95ResponseTime,
-    storeType: redisClient ? 'redis' : 'memory',
+    latency,
+    responseTimeP50: overallSummary?.p50 || 0,
+    responseTimeP95: overallSummary?.p95 || 0,
+    responseTimeP99: overallSummary?.p99 || 0,
+    storeType: getRedisClient() ? 'redis' : 'memory',
+    redis: getUpstashClient()?.getStats() || null,
+    memoryStore: { size: memoryStore.size, ...memoryStore.stats },
     totalRequests: Array.from(metrics.hits.values()).reduce((a, b) => a + b, 0),
     totalBlocks: Array.from(metrics.blocks.values()).reduce((a, b) => a + b, 0)
   }
@@ -313,17 +325,10 @@ export function getRateLimitMetrics() {
 
 /**
  * Clean up expired entries from memory store (periodic cleanup)
+ * Only visits expiry slots elapsed since the last sweep.
  */
 export function cleanupMemoryStore() {
-  const now = Date.now()
-  let cleaned = 0
-  
-  for (const [key, bucket] of memoryStore.entries()) {
-    if (now >= bucket.resetTime) {
-      memoryStore.delete(key)
-      cleaned++
-    }
-  }
+  const cleaned = memoryStore.sweep()
   
   if (cleaned > 0) {
     console.log(`Cleaned up ${cleaned} expired rate limit entries`)
@@ -333,4 +338,4 @@ export function cleanupMemoryStore() {
 // Auto cleanup every 5 minutes
 if (typeof setInterval !== 'undefined') {
   setInterval(cleanupMemoryStore, 5 * 60 * 1000)
-}
\ No newline at end of file
+}
@@ -0,0 +1,50 @@
+/**
+ * Tests for the GCRA rate limit decision
+ * Validates burst size, remaining quota and smooth refill
+ */
+
+import { describe, test, expect } from 'vitest'
+import { gcra } from '@/lib/rate-limit'
+
+describe('GCRA Rate Limiting', () => {
+  test('should allow a full burst of `limit` requests then block', () => {
+    let tat = null
+    let allowed = 0
+
+    for (let i = 0; i < 35; i++) {
+      const result = gcra(tat, 1000, 30, 60000)
+      if (result.allowed) {
+        allowed++
+        tat = result.tat
+      }
+    }
+
+    expect(allowed).toBe(30)
+  })
+
+  test('should report remaining quota and retry delay', () => {
+    const first = gcra(null, 0, 30, 60000)
+    expect(first.remaining).toBe(29)
+
+    let tat = first.tat
+    for (let i = 0; i < 29; i++) {
+      tat = gcra(tat, 0, 30, 60000).tat
+    }
+
+    const blocked = gcra(tat, 0, 30, 60000)
+    expect(blocked.allowed).toBe(false)
+    expect(blocked.retryAfterMs).toBe(2000) // one emission interval (60s / 30)
+  })
+
+  test('should refill smoothly instead of at window boundaries', () => {
+    let tat = null
+    for (let i = 0; i < 30; i++) {
+      tat = gcra(tat, 0, 30, 60000).tat
+    }
+
+    // One emission interval later exactly one request is allowed again
+    const next = gcra(tat, 2000, 30, 60000)
+    expect(next.allowed).toBe(true)
+    expect(gcra(next.tat, 2000, 30, 60000).allowed).toBe(false)
+  })
+})
@@ -0,0 +1,152 @@
+/**
+ * Per-route request metrics for app/api handlers
+ *
+ * Wrap a handler with withRouteMetrics(route, handler) to record, per
+ * (route, method): request counts by status class, a fixed-bucket latency
+ * histogram and in-flight requests. renderPrometheus() exports everything in
+ * Prometheus text exposition format (scraped from /api/metrics).
+ *
+ * - Latency is time until the handler returns its Response; for streamed
+ *   responses that is time to first byte, not stream duration
+ * - Thrown errors are recorded as 5xx and rethrown
+ * - Label cardinality is bounded: past MAX_SERIES, new routes share 'other'
+ *   (one series per method, created even when the map is full)
+ *
+ * Counters are per server instance; Prometheus aggregates across instances.
+ */
+
+// Seconds, as Prometheus expects; cumulative `le` buckets are built on export
+export const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+const MAX_SERIES = 500
+const OVERFLOW_ROUTE = 'other'
+const STATUS_CLASSES = ['1xx', '2xx', '3xx', '4xx', '5xx']
+
+const series = new Map()
+
+const monotonicNow = () => (typeof performance !== 'undefined' ? performance.now() : Date.now())
+
+function getSeries(route, method) {
+  const key = `${route} ${method}`
+  let entry = series.get(key)
+  if (!entry) {
+    if (series.size >= MAX_SERIES && route !== OVERFLOW_ROUTE) return getSeries(OVERFLOW_ROUTE, method)
+    entry = {
+      route,
+      method,
+      inFlight: 0,
+      statuses: new Array(STATUS_CLASSES.length).fill(0),
+      // Non-cumulative counts per bucket; the last slot is +Inf
+      buckets: new Array(LATENCY_BUCKETS.length + 1).fill(0),
+      sum: 0,
+      count: 0
+    }
+    series.set(key, entry)
+  }
+  return entry
+}
+
+function bucketIndex(seconds) {
+  let i = 0
+  while (i < LATENCY_BUCKETS.length && seconds > LATENCY_BUCKETS[i]) i++
+  return i
+}
+
+/**
+ * Record one finished request
+ * @param {string} route - Route label, e.g. '/api/ai/summarize'
+ * @param {string} method - HTTP method
+ * @param {number} status - Response status code
+ * @param {number} durationMs - Handler latency
+ */
+export function recordRequest(route, method, status, durationMs) {
+  const entry = getSeries(route, method)
+  const seconds = durationMs / 1000
+  const statusIndex = Math.min(4, Math.max(0, Math.floor(status / 100) - 1))
+
+  entry.statuses[statusIndex]++
+  entry.buckets[bucketIndex(seconds)]++
+  entry.sum += seconds
+  entry.count++
+}
+
+/**
+ * Wrap a route handler with metrics
+ * @param {string|Function} route - Route label, or (request, context) => label
+ *   for handlers serving several endpoints (e.g. the [[...path]] catch-all)
+ * @param {Function} handler - async (request, context) => Response
+ * @returns {Function} handler with the same signature
+ */
+export function withRouteMetrics(route, handler) {
+  return async function instrumented(request, context) {
+    const label = typeof route === 'function' ? route(request, context) : route
+    const requestMethod = request?.method || handler.name || 'ANY'
+    const entry = getSeries(label, requestMethod)
+    const start = monotonicNow()
+    let status = 500
+
+    entry.inFlight++
+    try {
+      const response = await handler(request, context)
+      status = response?.status || 200
+      return response
+    } finally {
+      entry.inFlight--
+      recordRequest(label, requestMethod, status, monotonicNow() - start)
+    }
+  }
+}
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')
+}
+
+function formatBound(bound) {
+  return bound === Infinity ? '+Inf' : String(bound)
+}
+
+/**
+ * All recorded series in Prometheus text exposition format (version 0.0.4)
+ */
+export function renderPrometheus() {
+  const entries = Array.from(series.values())
+  const lines = []
+
+  lines.push('# HELP spiread_http_requests_total API requests by route, method and status class.')
+  lines.push('# TYPE spiread_http_requests_total counter')
+  for (const entry of entries) {
+    const labels = `route="${escapeLabel(entry.route)}",method="${entry.method}"`
+    entry.statuses.forEach((count, i) => {
+      if (count > 0) lines.push(`spiread_http_requests_total{${labels},status_class="${STATUS_CLASSES[i]}"} ${count}`)
+    })
+  }
+
+  lines.push('# HELP spiread_http_request_duration_seconds API handler latency.')
+  lines.push('# TYPE spiread_http_request_duration_seconds histogram')
+  for (const entry of entries) {
+    const labels = `route="${escapeLabel(entry.route)}",method="${entry.method}"`
+    let cumulative = 0
+    entry.buckets.forEach((count, i) => {
+      cumulative += count
+      const bound = formatBound(i < LATENCY_BUCKETS.length ? LATENCY_BUCKETS[i] : Infinity)
+      lines.push(`spiread_http_request_duration_seconds_bucket{${labels},le="${bound}"} ${cumulative}`)
+    })
+    lines.push(`spiread_http_request_duration_seconds_sum{${labels}} ${entry.sum}`)
+    lines.push(`spiread_http_request_duration_seconds_count{${labels}} ${entry.count}`)
+  }
+
+  lines.push('# HELP spiread_http_requests_in_flight API requests currently being handled.')
+  lines.push('# TYPE spiread_http_requests_in_flight gauge')
+  for (const entry of entries) {
+    lines.push(`spiread_http_requests_in_flight{route="${escapeLabel(entry.route)}",method="${entry.method}"} ${entry.inFlight}`)
+  }
+
+  return lines.join('\n') + '\n'
+}
+
+/**
+ * Drop all series (tests)
+ */
+export function resetRouteMetrics() {
+  series.clear()
+}
@@ -0,0 +1,61 @@
+/**
+ * Tests for per-route request metrics
+ * Validates Prometheus output, status classes and series limits
+ */
+
+import { describe, test, expect, beforeEach } from 'vitest'
+import { recordRequest, renderPrometheus, resetRouteMetrics, withRouteMetrics } from '@/lib/route-metrics'
+
+const sample = (text, line) => text.split('\n').find(l => l.startsWith(line))
+
+describe('Route Metrics', () => {
+  beforeEach(() => resetRouteMetrics())
+
+  test('should export cumulative latency buckets and status classes', () => {
+    recordRequest('/api/gameRuns', 'POST', 200, 3)
+    recordRequest('/api/gameRuns', 'POST', 202, 40)
+    recordRequest('/api/gameRuns', 'POST', 500, 2000)
+
+    const text = renderPrometheus()
+    const labels = 'route="/api/gameRuns",method="POST"'
+
+    expect(sample(text, `spiread_http_requests_total{${labels},status_class="2xx"}`)).toBe(`spiread_http_requests_total{${labels},status_class="2xx"} 2`)
+    expect(sample(text, `spiread_http_requests_total{${labels},status_class="5xx"}`)).toBe(`spiread_http_requests_total{${labels},status_class="5xx"} 1`)
+    expect(sample(text, `spiread_http_request_duration_seconds_bucket{${labels},le="0.005"}`)).toBe(`spiread_http_request_duration_seconds_bucket{${labels},le="0.005"} 1`)
+    expect(sample(text, `spiread_http_request_duration_seconds_bucket{${labels},le="0.05"}`)).toBe(`spiread_http_request_duration_seconds_bucket{${labels},le="0.05"} 2`)
+    expect(sample(text, `spiread_http_request_duration_seconds_bucket{${labels},le="+Inf"}`)).toBe(`spiread_http_request_duration_seconds_bucket{${labels},le="+Inf"} 3`)
+    expect(sample(text, `spiread_http_request_duration_seconds_count{${labels}}`)).toBe(`spiread_http_request_duration_seconds_count{${labels}} 3`)
+  })
+
+  test('should record status and labels per sub-endpoint for wrapped handlers', async () => {
+    const handler = withRouteMetrics(
+      (request, { params }) => `/api/${params.path[0]}`,
+      async function GET() {
+        return new Response(null, { status: 404 })
+      }
+    )
+
+    await handler({ method: 'GET' }, { params: { path: ['documents'] } })
+
+    expect(renderPrometheus()).toContain('spiread_http_requests_total{route="/api/documents",method="GET",status_class="4xx"} 1')
+  })
+
+  test('should count thrown errors as 5xx and rethrow them', async () => {
+    const handler = withRouteMetrics('/api/observability/throw', async function POST() {
+      throw new Error('boom')
+    })
+
+    await expect(handler({ method: 'POST' })).rejects.toThrow('boom')
+    expect(renderPrometheus()).toContain('route="/api/observability/throw",method="POST",status_class="5xx"} 1')
+    expect(renderPrometheus()).toContain('spiread_http_requests_in_flight{route="/api/observability/throw",method="POST"} 0')
+  })
+
+  test('should send routes past the series limit to a shared overflow series', () => {
+    for (let i = 0; i < 500; i++) recordRequest(`/api/route-${i}`, 'GET', 200, 1)
+    recordRequest('/api/one-too-many', 'DELETE', 204, 1)
+
+    const text = renderPrometheus()
+    expect(text).toContain('spiread_http_requests_total{route="other",method="DELETE",status_class="2xx"} 1')
+    expect(text).not.toContain('/api/one-too-many')
+  })
+})
@@ -0,0 +1,30 @@
+/**
+ * Seeded pseudo-random numbers for reproducible game rounds
+ * A (seed, level) pair always produces the same grid, so logged seeds can be
+ * replayed and difficulty tuning compares identical rounds.
+ */
+
+export type Rng = () => number;
+
+/**
+ * Mulberry32: small, fast 32-bit generator with good distribution for games
+ * @param seed Any integer; only the low 32 bits are used
+ * @returns Function returning floats in [0, 1)
+ */
+export function createRng(seed: number): Rng {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+/**
+ * Fresh random 32-bit seed for a new round
+ */
+export function randomSeed(): number {
+  return Math.floor(Math.random() * 4294967296) >>> 0;
+}
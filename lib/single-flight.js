@@ -0,0 +1,75 @@
+/**
+ * Single-flight request coalescing
+ *
+ * Concurrent callers with the same key share one execution of `fn`: the
+ * first caller (leader) runs it, later callers wait on the same promise.
+ * Used by the AI routes so a class opening the same document triggers one
+ * upstream LLM call instead of dozens.
+ *
+ * Waiters are bounded per key and give up after `timeoutMs`; both surface as
+ * SingleFlightError so callers can use their usual fallback.
+ */
+
+const inflight = new Map()
+
+export class SingleFlightError extends Error {
+  constructor(message, code) {
+    super(message)
+    this.name = 'SingleFlightError'
+    this.code = code
+  }
+}
+
+/**
+ * @param {string} key - Coalescing key (e.g. the AI cache hash)
+ * @param {Function} fn - Async work to share
+ * @param {Object} options
+ * @param {number} options.timeoutMs - Max time a waiter waits for the leader
+ * @param {number} options.maxWaiters - Max concurrent waiters per key
+ * @returns {Promise<{ value: any, shared: boolean }>} shared is false for the leader
+ */
+export async function singleFlight(key, fn, { timeoutMs = 30000, maxWaiters = 100 } = {}) {
+  const existing = inflight.get(key)
+
+  if (existing) {
+    if (existing.waiters >= maxWaiters) {
+      throw new SingleFlightError(`Too many waiters for ${key}`, 'TOO_MANY_WAITERS')
+    }
+
+    existing.waiters++
+    let timer
+    try {
+      const value = await Promise.race([
+        existing.promise,
+        new Promise((_, reject) => {
+          timer = setTimeout(
+            () => reject(new SingleFlightError(`Timed out waiting for ${key}`, 'TIMEOUT')),
+            timeoutMs
+          )
+        })
+      ])
+      return { value, shared: true }
+    } finally {
+      clearTimeout(timer)
+      existing.waiters--
+    }
+  }
+
+  const flight = { promise: null, waiters: 0 }
+  flight.promise = Promise.resolve()
+    .then(fn)
+    .finally(() => {
+      if (inflight.get(key) === flight) inflight.delete(key)
+    })
+  inflight.set(key, flight)
+
+  const value = await flight.promise
+  return { value, shared: false }
+}
+
+/**
+ * Number of keys currently in flight (for metrics/tests)
+ */
+export function inflightCount() {
+  return inflight.size
+}
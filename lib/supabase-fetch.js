@@ -0,0 +1,192 @@
+import http from 'http'
+import https from 'https'
+import { Readable } from 'stream'
+
+/**
+ * Server-side fetch for the Supabase client (Node runtime only)
+ *
+ * - Pooled keep-alive agents, so API routes reuse TLS connections to the
+ *   Supabase host instead of paying a handshake per request
+ * - Default deadline per call (SUPABASE_FETCH_TIMEOUT_MS), combined with any
+ *   caller signal, e.g. supabase.from(...).select().abortSignal(deadline(200)).
+ *   Both cover the whole call: once headers have arrived, a deadline or abort
+ *   errors the response body stream instead of rejecting the fetch
+ * - Counters for reused vs newly opened sockets, timeouts and errors
+ *
+ * Bodies other than strings/buffers (uploads with FormData/Blob) go through the
+ * platform fetch unchanged.
+ *
+ * Env: SUPABASE_FETCH_MAX_SOCKETS (default 50), SUPABASE_FETCH_MAX_FREE_SOCKETS (10),
+ *      SUPABASE_FETCH_IDLE_TIMEOUT_MS (30000), SUPABASE_FETCH_TIMEOUT_MS (10000)
+ */
+
+const stats = {
+  requests: 0,
+  reusedSockets: 0,
+  newSockets: 0,
+  timeouts: 0,
+  errors: 0,
+  inflight: 0
+}
+
+let agents = null
+
+function getAgents() {
+  if (!agents) {
+    const options = {
+      keepAlive: true,
+      maxSockets: parseInt(process.env.SUPABASE_FETCH_MAX_SOCKETS) || 50,
+      maxFreeSockets: parseInt(process.env.SUPABASE_FETCH_MAX_FREE_SOCKETS) || 10,
+      // Idle sockets are closed after this long
+      timeout: parseInt(process.env.SUPABASE_FETCH_IDLE_TIMEOUT_MS) || 30000,
+      scheduling: 'lifo'
+    }
+    agents = { 'http:': new http.Agent(options), 'https:': new https.Agent(options) }
+  }
+  return agents
+}
+
+export class FetchTimeoutError extends Error {
+  constructor(url, timeoutMs) {
+    super(`Supabase request timed out after ${timeoutMs}ms: ${url}`)
+    this.name = 'FetchTimeoutError'
+  }
+}
+
+/**
+ * AbortSignal that fires after `ms` (for per-query deadlines)
+ */
+export function deadline(ms) {
+  return AbortSignal.timeout(ms)
+}
+
+function toHeaderObject(headers) {
+  const result = {}
+  if (!headers) return result
+  new Headers(headers).forEach((value, key) => {
+    result[key] = value
+  })
+  // Node's http client does not decompress; ask for identity responses
+  delete result['accept-encoding']
+  return result
+}
+
+function toResponseHeaders(rawHeaders) {
+  const headers = new Headers()
+  for (let i = 0; i < rawHeaders.length; i += 2) {
+    headers.append(rawHeaders[i], rawHeaders[i + 1])
+  }
+  return headers
+}
+
+/**
+ * @param {Object} options
+ * @param {number} [options.timeoutMs] - Default per-call deadline
+ * @returns {Function} fetch-compatible function
+ */
+export function createKeepAliveFetch({ timeoutMs = parseInt(process.env.SUPABASE_FETCH_TIMEOUT_MS) || 10000 } = {}) {
+  return function keepAliveFetch(input, init = {}) {
+    const isRequest = typeof input === 'object' && !(input instanceof URL)
+    const url = new URL(isRequest ? input.url : input)
+    const method = (init.method || (isRequest ? input.method : 'GET')).toUpperCase()
+    const body = init.body
+
+    if ((body != null && typeof body !== 'string' && !Buffer.isBuffer(body) && !(body instanceof Uint8Array)) ||
+        (isRequest && input.body)) {
+      return fetch(input, init)
+    }
+
+    const agent = getAgents()[url.protocol]
+    if (!agent) return fetch(input, init)
+
+    stats.requests++
+    stats.inflight++
+
+    return new Promise((resolve, reject) => {
+      let settled = false
+      let finished = false
+      let incoming = null
+
+      // Runs once the body has been read, cancelled or has failed
+      const cleanup = () => {
+        if (finished) return
+        finished = true
+        stats.inflight--
+        clearTimeout(timer)
+        init.signal?.removeEventListener('abort', onAbort)
+      }
+
+      // Before the headers this rejects the call; afterwards it errors the body
+      const fail = (error) => {
+        if (finished) return
+        stats.errors++
+        incoming?.destroy(error)
+        request.destroy(error)
+        cleanup()
+        if (!settled) {
+          settled = true
+          reject(error)
+        }
+      }
+
+      const request = (url.protocol === 'https:' ? https : http).request(url, {
+        method,
+        agent,
+        headers: toHeaderObject(init.headers || (isRequest ? input.headers : undefined))
+      })
+
+      const timer = setTimeout(() => {
+        stats.timeouts++
+        fail(new FetchTimeoutError(url.pathname, timeoutMs))
+      }, timeoutMs)
+
+      const onAbort = () => {
+        fail(init.signal.reason || new DOMException('The operation was aborted', 'AbortError'))
+      }
+      if (init.signal) {
+        if (init.signal.aborted) return onAbort()
+        init.signal.addEventListener('abort', onAbort, { once: true })
+      }
+
+      request.on('socket', () => {
+        if (request.reusedSocket) stats.reusedSockets++
+        else stats.newSockets++
+      })
+
+      request.on('response', (res) => {
+        incoming = res
+        res.on('close', cleanup)
+
+        const status = res.statusCode || 500
+        const hasBody = method !== 'HEAD' && status !== 204 && status !== 304
+        if (!hasBody) res.resume()
+        settled = true
+        resolve(new Response(hasBody ? Readable.toWeb(res) : null, {
+          status,
+          statusText: res.statusMessage,
+          headers: toResponseHeaders(res.rawHeaders)
+        }))
+      })
+
+      request.on('error', fail)
+      request.end(body)
+    })
+  }
+}
+
+export function getSupabaseFetchStats() {
+  const connections = { active: 0, idle: 0, queued: 0 }
+  if (agents) {
+    for (const agent of Object.values(agents)) {
+      for (const sockets of Object.values(agent.sockets)) connections.active += sockets.length
+      for (const sockets of Object.values(agent.freeSockets)) connections.idle += sockets.length
+      for (const queued of Object.values(agent.requests)) connections.queued += queued.length
+    }
+  }
+  const opened = stats.reusedSockets + stats.newSockets
+  return {
+    ...stats,
+    reuseRate: opened > 0 ? stats.reusedSockets / opened : 0,
+    connections
+  }
+}
@@ -3,7 +3,32 @@ import { createClient } from '@supabase/supabase-js'
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL
 const supabaseAnonKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY
 
-export const supabase = createClient(supabaseUrl, supabaseAnonKey)
+// On the Node server, route Supabase HTTP calls through pooled keep-alive
+// agents with a default deadline (see lib/supabase-fetch.js). The browser and
+// Edge runtimes keep the platform fetch; the require is dropped from their bundles.
+const serverFetch = typeof window === 'undefined' && process.env.NEXT_RUNTIME !== 'edge'
+  ? require('./supabase-fetch').createKeepAliveFetch()
+  : undefined
+
+export const supabase = createClient(
+  supabaseUrl,
+  supabaseAnonKey,
+  serverFetch ? { global: { fetch: serverFetch } } : undefined
+)
+
+// Server-only client with the service role key, for RPCs that must not be
+// callable with the public anon key (AI quota accounting). Null in the browser
+// or when the key is not configured.
+const supabaseServiceRoleKey = typeof window === 'undefined'
+  ? process.env.SUPABASE_SERVICE_ROLE || process.env.SUPABASE_SERVICE_ROLE_KEY
+  : undefined
+
+export const supabaseAdmin = supabaseServiceRoleKey
+  ? createClient(supabaseUrl, supabaseServiceRoleKey, {
+    auth: { persistSession: false, autoRefreshToken: false },
+    ...(serverFetch ? { global: { fetch: serverFetch } } : {})
+  })
+  : null
 
 // Database initialization function
 export const initializeDatabase = async () => {
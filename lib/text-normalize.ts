@@ -171,10 +171,185 @@ export function matchesAnyAnswer(
   return { matches: false };
 }
 
+/**
+ * Suggestion index over a dictionary: a BK-tree of normalized words
+ * Each node keeps the original words that normalize to it (with their
+ * dictionary position, for stable ordering) and the largest child edge, so a
+ * query only computes distances up to the bound it can still use.
+ */
+interface BkNode {
+  normalized: string;
+  words: Array<{ word: string; position: number }>;
+  children: Map<number, BkNode>;
+  maxChildDistance: number;
+}
+
+export interface SuggestionIndex {
+  size: number;
+  has(word: string): boolean;
+  search(input: string, maxSuggestions?: number): string[];
+}
+
+// Similarity threshold used by getSuggestions (1 - distance / maxLen)
+const SUGGESTION_THRESHOLD = 0.6;
+
+// Reusable DP rows for the distance kernel (grown on demand)
+let previousRow = new Int32Array(64);
+let currentRow = new Int32Array(64);
+
+/**
+ * Levenshtein distance with an early exit: only the diagonal band of width
+ * 2 * maxDistance + 1 is computed, and if every cell in a row exceeds
+ * maxDistance the result is maxDistance + 1.
+ */
+export function boundedLevenshtein(a: string, b: string, maxDistance: number = Infinity): number {
+  if (a === b) return 0;
+  if (a.length > b.length) [a, b] = [b, a];
+  const len1 = a.length;
+  const len2 = b.length;
+  const limit = Math.min(maxDistance, len2);
+
+  if (len2 - len1 > limit) return limit + 1;
+  if (len1 === 0) return len2;
+
+  if (previousRow.length <= len1) {
+    previousRow = new Int32Array(len1 * 2 + 1);
+    currentRow = new Int32Array(len1 * 2 + 1);
+  }
+  let prev = previousRow;
+  let curr = currentRow;
+  const outside = limit + 1;
+
+  for (let i = 0; i <= len1; i++) prev[i] = i <= limit ? i : outside;
+
+  for (let j = 1; j <= len2; j++) {
+    const from = Math.max(1, j - limit);
+    const to = Math.min(len1, j + limit);
+    const bj = b.charCodeAt(j - 1);
+    let rowMin = outside;
+
+    curr[0] = j <= limit ? j : outside;
+    if (from > 1) curr[from - 1] = outside;
+
+    for (let i = from; i <= to; i++) {
+      const cost = a.charCodeAt(i - 1) === bj ? 0 : 1;
+      let value = prev[i - 1] + cost;
+      if (prev[i] + 1 < value) value = prev[i] + 1;
+      if (curr[i - 1] + 1 < value) value = curr[i - 1] + 1;
+      if (value > outside) value = outside;
+      curr[i] = value;
+      if (value < rowMin) rowMin = value;
+    }
+    if (to < len1) curr[to + 1] = outside;
+    if (from === 1 && curr[0] < rowMin) rowMin = curr[0];
+
+    if (rowMin > limit) return outside;
+    const swap = prev;
+    prev = curr;
+    curr = swap;
+  }
+
+  return prev[len1] > limit ? outside : prev[len1];
+}
+
+/**
+ * Build a reusable suggestion index for a dictionary
+ * @param dictionary - Array of valid words
+ */
+export function createSuggestionIndex(dictionary: string[]): SuggestionIndex {
+  const byNormalized = new Map<string, BkNode>();
+  let root: BkNode | null = null;
+
+  dictionary.forEach((word, position) => {
+    const normalized = normalizeText(word);
+    const existing = byNormalized.get(normalized);
+    if (existing) {
+      existing.words.push({ word, position });
+      return;
+    }
+
+    const node: BkNode = { normalized, words: [{ word, position }], children: new Map(), maxChildDistance: 0 };
+    byNormalized.set(normalized, node);
+
+    if (!root) {
+      root = node;
+      return;
+    }
+    let current: BkNode = root;
+    for (;;) {
+      const distance = boundedLevenshtein(normalized, current.normalized);
+      const child = current.children.get(distance);
+      if (!child) {
+        current.children.set(distance, node);
+        if (distance > current.maxChildDistance) current.maxChildDistance = distance;
+        break;
+      }
+      current = child;
+    }
+  });
+
+  return {
+    size: byNormalized.size,
+
+    has(word: string): boolean {
+      return byNormalized.has(normalizeText(word));
+    },
+
+    search(input: string, maxSuggestions: number = 3): string[] {
+      const normalizedInput = normalizeText(input);
+      const inputLength = normalizedInput.length;
+      if (!root) return [];
+
+      // score > 0.6 means distance < 0.4 * max(len1, len2); since the longer
+      // word is at most inputLength + distance, distance < 2/3 * inputLength
+      const radius = Math.ceil((2 * inputLength) / 3) - 1;
+      if (radius < 0) return [];
+
+      const matches: Array<{ word: string; position: number; score: number }> = [];
+      const stack: BkNode[] = [root];
+
+      while (stack.length > 0) {
+        const node = stack.pop() as BkNode;
+        const distance = boundedLevenshtein(normalizedInput, node.normalized, radius + node.maxChildDistance);
+
+        if (distance <= radius) {
+          const maxLen = Math.max(inputLength, node.normalized.length);
+          const score = maxLen === 0 ? 1 : 1 - distance / maxLen;
+          if (score > SUGGESTION_THRESHOLD) {
+            node.words.forEach(({ word, position }) => matches.push({ word, position, score }));
+          }
+        }
+
+        // Triangle inequality: only children with |edge - distance| <= radius can match
+        node.children.forEach((child, edge) => {
+          if (edge >= distance - radius && edge <= distance + radius) stack.push(child);
+        });
+      }
+
+      return matches
+        .sort((a, b) => b.score - a.score || a.position - b.position)
+        .slice(0, maxSuggestions)
+        .map(match => match.word);
+    }
+  };
+}
+
+// Indexes are built once per dictionary array
+const suggestionIndexes = new WeakMap<string[], SuggestionIndex>();
+
+function getSuggestionIndex(dictionary: string[]): SuggestionIndex {
+  let index = suggestionIndexes.get(dictionary);
+  if (!index) {
+    index = createSuggestionIndex(dictionary);
+    suggestionIndexes.set(dictionary, index);
+  }
+  return index;
+}
+
 /**
  * Get suggestions for misspelled words
  * @param input - User input
- * @param dictionary - Array of valid words
+ * @param dictionary - Array of valid words (indexed on first use)
  * @param maxSuggestions - Maximum number of suggestions to return
  */
 export function getSuggestions(
@@ -182,22 +357,7 @@ export function getSuggestions(
   dictionary: string[],
   maxSuggestions: number = 3
 ): string[] {
-  const normalizedInput = normalizeText(input);
-  const suggestions: Array<{ word: string; score: number }> = [];
-
-  dictionary.forEach(word => {
-    const normalizedWord = normalizeText(word);
-    const score = calculateSimilarity(normalizedInput, normalizedWord);
-    
-    if (score > 0.6) { // Threshold for similarity
-      suggestions.push({ word, score });
-    }
-  });
-
-  return suggestions
-    .sort((a, b) => b.score - a.score)
-    .slice(0, maxSuggestions)
-    .map(s => s.word);
+  return getSuggestionIndex(dictionary).search(input, maxSuggestions);
 }
 
 /**
@@ -206,31 +366,10 @@ export function getSuggestions(
 function calculateSimilarity(str1: string, str2: string): number {
   if (str1 === str2) return 1;
   
-  const len1 = str1.length;
-  const len2 = str2.length;
-  
-  if (len1 === 0) return len2 === 0 ? 1 : 0;
-  if (len2 === 0) return 0;
-
-  const matrix = Array(len2 + 1).fill(null).map(() => Array(len1 + 1).fill(null));
-
-  for (let i = 0; i <= len1; i++) matrix[0][i] = i;
-  for (let j = 0; j <= len2; j++) matrix[j][0] = j;
-
-  for (let j = 1; j <= len2; j++) {
-    for (let i = 1; i <= len1; i++) {
-      const cost = str1[i - 1] === str2[j - 1] ? 0 : 1;
-      matrix[j][i] = Math.min(
-        matrix[j - 1][i] + 1,     // deletion
-        matrix[j][i - 1] + 1,     // insertion
-        matrix[j - 1][i - 1] + cost // substitution
-      );
-    }
-  }
+  const maxLen = Math.max(str1.length, str2.length);
+  if (maxLen === 0) return 1;
 
-  const distance = matrix[len2][len1];
-  const maxLen = Math.max(len1, len2);
-  return 1 - distance / maxLen;
+  return 1 - boundedLevenshtein(str1, str2) / maxLen;
 }
 
 /**
@@ -321,10 +460,7 @@ export function getWordsByCategory(
  * Validate if a word exists in Spanish dictionary
  */
 export function isValidSpanishWord(word: string): boolean {
-  const normalized = normalizeText(word);
-  return SPANISH_COMMON_WORDS.some(dictWord => 
-    normalizeText(dictWord) === normalized
-  );
+  return getSuggestionIndex(SPANISH_COMMON_WORDS).has(word);
 }
 
 /**
@@ -0,0 +1,178 @@
+/**
+ * Bounded in-memory key/value store with per-entry expiry
+ *
+ * - LRU: entries are linked in access order; when `maxEntries` is reached the
+ *   least recently used entry is evicted in O(1), so memory stays flat under
+ *   key sprays. (Evicting from the front of a Map via keys().next() degrades
+ *   badly in V8 because deleted slots are skipped on every call.)
+ * - Expiry: a timer wheel with `resolutionMs` slots. sweep() only visits the
+ *   slots that elapsed since the last sweep, so cleanup is amortized O(1)
+ *   per entry instead of a scan of the whole store
+ *
+ * - Optional byte budget: with `maxBytes` and `sizeOf(value)`, LRU entries are
+ *   also evicted while the summed entry sizes exceed the budget
+ *
+ * Entries expiring beyond the wheel horizon sit in its last slot and are
+ * rescheduled when that slot is swept. get() also checks expiry lazily, so
+ * results never depend on how often sweep() runs.
+ */
+
+export class TtlLruStore {
+  constructor({
+    maxEntries = 10000,
+    maxBytes = Infinity,
+    sizeOf = null,
+    resolutionMs = 1000,
+    horizonMs = 60 * 1000,
+    onEvict = null
+  } = {}) {
+    this.maxEntries = maxEntries
+    this.maxBytes = maxBytes
+    this.sizeOf = sizeOf
+    this.bytes = 0
+    this.resolutionMs = resolutionMs
+    this.onEvict = onEvict
+    this.entries = new Map()
+    this.head = { prev: null, next: null }
+    this.tail = { prev: this.head, next: null }
+    this.head.next = this.tail
+    this.wheel = Array.from({ length: Math.ceil(horizonMs / resolutionMs) + 1 }, () => new Set())
+    this.lastSweptTick = Math.floor(Date.now() / resolutionMs) - 1
+    this.stats = { expired: 0, evicted: 0 }
+  }
+
+  get size() {
+    return this.entries.size
+  }
+
+  has(key, now = Date.now()) {
+    return this.get(key, now, { touch: false }) !== undefined
+  }
+
+  get(key, now = Date.now(), { touch = true } = {}) {
+    const entry = this.entries.get(key)
+    if (!entry) return undefined
+
+    if (entry.expiresAt <= now) {
+      this._remove(key, entry)
+      this.stats.expired++
+      return undefined
+    }
+
+    if (touch) {
+      this._unlink(entry)
+      this._append(entry)
+    }
+    return entry.value
+  }
+
+  set(key, value, expiresAt) {
+    const existing = this.entries.get(key)
+    if (existing) {
+      this._remove(key, existing)
+    } else if (this.entries.size >= this.maxEntries) {
+      this._evictOldest()
+    }
+
+    const size = this.sizeOf ? this.sizeOf(value) : 0
+    if (size > this.maxBytes) return this
+
+    const entry = { key, value, expiresAt, size, slot: 0, prev: null, next: null }
+    this._schedule(key, entry)
+    this._append(entry)
+    this.entries.set(key, entry)
+    this.bytes += size
+
+    while (this.bytes > this.maxBytes) {
+      this._evictOldest()
+    }
+    return this
+  }
+
+  delete(key) {
+    const entry = this.entries.get(key)
+    if (!entry) return false
+    this._remove(key, entry)
+    return true
+  }
+
+  clear() {
+    this.entries.clear()
+    this.bytes = 0
+    this.head.next = this.tail
+    this.tail.prev = this.head
+    this.wheel.forEach(slot => slot.clear())
+  }
+
+  /**
+   * Drop expired entries in the wheel slots that fully elapsed since the last sweep
+   * @returns {number} number of entries removed
+   */
+  sweep(now = Date.now()) {
+    const lastElapsedTick = Math.floor(now / this.resolutionMs) - 1
+    const firstTick = Math.max(this.lastSweptTick + 1, lastElapsedTick - this.wheel.length + 1)
+    let removed = 0
+
+    for (let tick = firstTick; tick <= lastElapsedTick; tick++) {
+      const slot = this.wheel[tick % this.wheel.length]
+      if (slot.size === 0) continue
+
+      const keys = Array.from(slot)
+      slot.clear()
+      this.lastSweptTick = tick
+
+      for (const key of keys) {
+        const entry = this.entries.get(key)
+        if (entry.expiresAt <= now) {
+          this._unlink(entry)
+          this.entries.delete(key)
+          this.bytes -= entry.size
+          removed++
+        } else {
+          this._schedule(key, entry)
+        }
+      }
+    }
+
+    this.lastSweptTick = Math.max(this.lastSweptTick, lastElapsedTick)
+    this.stats.expired += removed
+    return removed
+  }
+
+  _schedule(key, entry) {
+    // Slots after lastSweptTick map to distinct wheel positions
+    const tick = Math.min(
+      Math.max(Math.floor(entry.expiresAt / this.resolutionMs), this.lastSweptTick + 1),
+      this.lastSweptTick + this.wheel.length
+    )
+    entry.slot = tick % this.wheel.length
+    this.wheel[entry.slot].add(key)
+  }
+
+  _remove(key, entry) {
+    this.wheel[entry.slot].delete(key)
+    this._unlink(entry)
+    this.entries.delete(key)
+    this.bytes -= entry.size
+  }
+
+  _append(entry) {
+    entry.prev = this.tail.prev
+    entry.next = this.tail
+    this.tail.prev.next = entry
+    this.tail.prev = entry
+  }
+
+  _unlink(entry) {
+    entry.prev.next = entry.next
+    entry.next.prev = entry.prev
+  }
+
+  _evictOldest() {
+    const entry = this.head.next
+    const key = entry.key
+    this._remove(key, entry)
+    this.stats.evicted++
+    if (this.onEvict) this.onEvict(key, entry.value)
+  }
+}
@@ -0,0 +1,72 @@
+/**
+ * Tests for the bounded TTL + LRU store
+ * Validates LRU eviction, timer-wheel expiry and byte budgets
+ */
+
+import { describe, test, expect } from 'vitest'
+import { TtlLruStore } from '@/lib/ttl-store'
+
+describe('TtlLruStore', () => {
+  test('should evict the least recently used entry at capacity', () => {
+    const now = Date.now()
+    const store = new TtlLruStore({ maxEntries: 2 })
+    store.set('a', 1, now + 10000)
+    store.set('b', 2, now + 10000)
+    store.get('a', now) // 'b' is now least recently used
+    store.set('c', 3, now + 10000)
+
+    expect(store.has('a', now)).toBe(true)
+    expect(store.has('b', now)).toBe(false)
+    expect(store.size).toBe(2)
+  })
+
+  test('should sweep only expired entries', () => {
+    const now = Date.now()
+    const store = new TtlLruStore({ resolutionMs: 1000, horizonMs: 60000 })
+    for (let i = 0; i < 100; i++) {
+      store.set(`k${i}`, i, now + (i % 10) * 1000)
+    }
+
+    // Expiry is tracked per 1s slot, so up to one slot may still be pending
+    store.sweep(now + 5500)
+    expect(store.size).toBeGreaterThanOrEqual(40)
+    expect(store.size).toBeLessThanOrEqual(50)
+
+    store.sweep(now + 11000)
+    expect(store.size).toBe(0)
+  })
+
+  test('should never return expired entries, even before a sweep', () => {
+    const now = Date.now()
+    const store = new TtlLruStore()
+    store.set('a', 1, now + 100)
+
+    expect(store.get('a', now + 200)).toBeUndefined()
+  })
+
+  test('should reschedule entries beyond the wheel horizon instead of dropping them', () => {
+    const now = Date.now()
+    const store = new TtlLruStore({ resolutionMs: 1000, horizonMs: 5000 })
+    store.set('a', 1, now + 20000)
+
+    store.sweep(now + 10000)
+    expect(store.size).toBe(1)
+
+    store.sweep(now + 21000)
+    expect(store.size).toBe(0)
+  })
+
+  test('should evict by byte budget when sizeOf is given', () => {
+    const now = Date.now()
+    const store = new TtlLruStore({ maxBytes: 100, sizeOf: value => value.length })
+    store.set('a', 'x'.repeat(40), now + 10000)
+    store.set('b', 'x'.repeat(40), now + 10000)
+    store.set('c', 'x'.repeat(40), now + 10000)
+
+    expect(store.has('a', now)).toBe(false)
+    expect(store.bytes).toBe(80)
+
+    store.delete('b')
+    expect(store.bytes).toBe(40)
+  })
+})
@@ -0,0 +1,164 @@
+/**
+ * Upstash Redis REST client for Spiread
+ *
+ * Small client shared by server code and the Edge middleware:
+ * - One long-lived instance per runtime, so the platform fetch keeps its
+ *   pooled keep-alive connection to the Upstash host (Edge and Node/undici
+ *   both reuse connections per origin)
+ * - Single commands, /pipeline batches and /multi-exec transactions
+ * - Per-call timeout (AbortController) so callers can fall back quickly
+ * - Circuit breaker: after repeated failures calls fail fast until cooldown
+ *
+ * Env: UPSTASH_REDIS_REST_URL, UPSTASH_REDIS_REST_TOKEN,
+ *      UPSTASH_REDIS_TIMEOUT_MS (default 50)
+ */
+
+export class UpstashError extends Error {
+  constructor(message, code) {
+    super(message)
+    this.name = 'UpstashError'
+    this.code = code
+  }
+}
+
+export class UpstashClient {
+  constructor({ url, token, timeoutMs = 50, failureThreshold = 3, cooldownMs = 30 * 1000 }) {
+    this.url = url.replace(/\/$/, '')
+    this.timeoutMs = timeoutMs
+    this.failureThreshold = failureThreshold
+    this.cooldownMs = cooldownMs
+    this.headers = {
+      Authorization: `Bearer ${token}`,
+      'Content-Type': 'application/json'
+    }
+
+    this.consecutiveFailures = 0
+    this.openUntil = 0
+    this.stats = { calls: 0, failures: 0, timeouts: 0, rejected: 0 }
+  }
+
+  /**
+   * False while the circuit is open; callers should use their fallback
+   */
+  get available() {
+    return Date.now() >= this.openUntil
+  }
+
+  get circuitState() {
+    if (!this.available) return 'open'
+    return this.consecutiveFailures >= this.failureThreshold ? 'half-open' : 'closed'
+  }
+
+  async command(args, options) {
+    const data = await this._request('', args, options)
+    if (data.error) throw new UpstashError(data.error, 'COMMAND_ERROR')
+    return data.result
+  }
+
+  /**
+   * Send several commands in one HTTP round trip (not atomic)
+   * @returns {Promise<Array>} results in order; failed commands become UpstashError
+   */
+  async pipeline(commands, options) {
+    const data = await this._request('/pipeline', commands, options)
+    return data.map(entry => entry.error ? new UpstashError(entry.error, 'COMMAND_ERROR') : entry.result)
+  }
+
+  /**
+   * Send several commands as one MULTI/EXEC transaction
+   */
+  async multiExec(commands, options) {
+    const data = await this._request('/multi-exec', commands, options)
+    if (data.error) throw new UpstashError(data.error, 'COMMAND_ERROR')
+    return data.map(entry => entry.error ? new UpstashError(entry.error, 'COMMAND_ERROR') : entry.result)
+  }
+
+  eval(script, keys = [], args = [], options) {
+    return this.command(['EVAL', script, keys.length, ...keys, ...args.map(String)], options)
+  }
+
+  async _request(path, body, { timeoutMs = this.timeoutMs } = {}) {
+    if (!this.available) {
+      this.stats.rejected++
+      throw new UpstashError('Upstash circuit open', 'CIRCUIT_OPEN')
+    }
+
+    this.stats.calls++
+    const controller = new AbortController()
+    const timer = setTimeout(() => controller.abort(), timeoutMs)
+
+    try {
+      const response = await fetch(`${this.url}${path}`, {
+        method: 'POST',
+        headers: this.headers,
+        body: JSON.stringify(body),
+        signal: controller.signal,
+        cache: 'no-store'
+      })
+
+      // 4xx other than auth/rate are caller errors, not an unhealthy backend
+      if (!response.ok && (response.status >= 500 || response.status === 401 || response.status === 429)) {
+        throw new UpstashError(`Upstash HTTP ${response.status}`, 'HTTP_ERROR')
+      }
+
+      const data = await response.json()
+      this._recordSuccess()
+      return data
+    } catch (error) {
+      const timedOut = error.name === 'AbortError'
+      if (timedOut) this.stats.timeouts++
+      this._recordFailure()
+      throw timedOut
+        ? new UpstashError(`Upstash call exceeded ${timeoutMs}ms`, 'TIMEOUT')
+        : error
+    } finally {
+      clearTimeout(timer)
+    }
+  }
+
+  _recordSuccess() {
+    this.consecutiveFailures = 0
+    this.openUntil = 0
+  }
+
+  _recordFailure() {
+    this.stats.failures++
+    this.consecutiveFailures++
+    if (this.consecutiveFailures >= this.failureThreshold) {
+      this.openUntil = Date.now() + this.cooldownMs
+    }
+  }
+
+  getStats() {
+    return {
+      ...this.stats,
+      circuit: this.circuitState,
+      consecutiveFailures: this.consecutiveFailures
+    }
+  }
+}
+
+let sharedClient
+
+/**
+ * Shared client from environment, or null when Upstash is not configured
+ */
+export function getUpstashClient() {
+  if (sharedClient !== undefined) return sharedClient
+
+  const url = process.env.UPSTASH_REDIS_REST_URL
+  const token = process.env.UPSTASH_REDIS_REST_TOKEN
+
+  if (!url || !token) {
+    console.warn('Redis credentials not configured, using in-memory rate limiting')
+    sharedClient = null
+    return sharedClient
+  }
+
+  sharedClient = new UpstashClient({
+    url,
+    token,
+    timeoutMs: parseInt(process.env.UPSTASH_REDIS_TIMEOUT_MS || '50', 10)
+  })
+  return sharedClient
+}
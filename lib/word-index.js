@@ -0,0 +1,151 @@
+import { WORD_BANK } from './word-bank';
+
+/**
+ * Precomputed lookup index over word lists (anagram game dictionaries)
+ *
+ * Each word is normalized once (lowercase, accents removed) and stored under:
+ * - its sorted-letter signature, so all anagrams of a letter set are one Map lookup
+ * - its real length, so "words of length n" does not depend on the source buckets
+ * - a 26-bit letter mask, so words using letters outside a set are rejected
+ *   with one AND before counting letters
+ *
+ * Indexes are built lazily per locale and kept for the lifetime of the module.
+ */
+
+const A_CODE = 97;
+const ALPHABET_SIZE = 26;
+
+export function normalizeWord(word) {
+  return word
+    .toLowerCase()
+    .normalize('NFD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .trim();
+}
+
+export function wordSignature(word) {
+  return normalizeWord(word).split('').sort().join('');
+}
+
+function letterCounts(normalized) {
+  const counts = new Uint8Array(ALPHABET_SIZE);
+  for (let i = 0; i < normalized.length; i++) {
+    const code = normalized.charCodeAt(i) - A_CODE;
+    if (code >= 0 && code < ALPHABET_SIZE) counts[code]++;
+  }
+  return counts;
+}
+
+function maskOf(counts) {
+  let mask = 0;
+  for (let i = 0; i < ALPHABET_SIZE; i++) {
+    if (counts[i] > 0) mask |= 1 << i;
+  }
+  return mask;
+}
+
+function fitsIn(counts, available) {
+  for (let i = 0; i < ALPHABET_SIZE; i++) {
+    if (counts[i] > available[i]) return false;
+  }
+  return true;
+}
+
+/**
+ * Build an index over a flat list of words
+ * @param {string[]} words
+ */
+export function buildWordIndex(words) {
+  const entries = new Map();
+  const bySignature = new Map();
+  const byLength = new Map();
+
+  for (const word of words) {
+    const normalized = normalizeWord(word);
+    if (!normalized || entries.has(normalized)) continue;
+
+    const counts = letterCounts(normalized);
+    const entry = {
+      word,
+      normalized,
+      signature: normalized.split('').sort().join(''),
+      counts,
+      mask: maskOf(counts)
+    };
+    entries.set(normalized, entry);
+
+    if (!bySignature.has(entry.signature)) bySignature.set(entry.signature, []);
+    bySignature.get(entry.signature).push(entry);
+
+    if (!byLength.has(normalized.length)) byLength.set(normalized.length, []);
+    byLength.get(normalized.length).push(entry);
+  }
+
+  return { entries, bySignature, byLength, size: entries.size };
+}
+
+const localeIndexes = new Map();
+
+/**
+ * Index over WORD_BANK.anagrams for a locale (falls back to 'es')
+ */
+export function getAnagramIndex(locale = 'es') {
+  const key = WORD_BANK.anagrams[locale] ? locale : 'es';
+  let index = localeIndexes.get(key);
+  if (!index) {
+    index = buildWordIndex(Object.values(WORD_BANK.anagrams[key]).flat());
+    localeIndexes.set(key, index);
+  }
+  return index;
+}
+
+export function hasWord(index, word) {
+  return index.entries.has(normalizeWord(word));
+}
+
+/**
+ * Words of exactly `length` letters (after normalization)
+ */
+export function getWordsOfLength(index, length) {
+  return (index.byLength.get(length) || []).map(entry => entry.word);
+}
+
+/**
+ * All indexed words that use exactly the given letters
+ */
+export function findAnagrams(index, letters) {
+  return (index.bySignature.get(wordSignature(letters)) || []).map(entry => entry.word);
+}
+
+/**
+ * All indexed words that can be spelled from a subset of the given letters
+ * (e.g. a shuffled word plus decoy letters)
+ */
+export function findWordsFromLetters(index, letters, { minLength = 1 } = {}) {
+  const available = letterCounts(normalizeWord(letters));
+  const availableMask = maskOf(available);
+  const maxLength = normalizeWord(letters).length;
+  const found = [];
+
+  for (const [length, bucket] of index.byLength) {
+    if (length < minLength || length > maxLength) continue;
+    for (const entry of bucket) {
+      if ((entry.mask & ~availableMask) !== 0) continue;
+      if (fitsIn(entry.counts, available)) found.push(entry.word);
+    }
+  }
+  return found;
+}
+
+/**
+ * Whether `candidate` is a dictionary word spelled from `letters`.
+ * With `exact`, it must use every letter (a true anagram).
+ */
+export function isValidAnagram(index, candidate, letters, { exact = true } = {}) {
+  const entry = index.entries.get(normalizeWord(candidate));
+  if (!entry) return false;
+  if (exact) return entry.signature === wordSignature(letters);
+
+  const available = letterCounts(normalizeWord(letters));
+  return (entry.mask & ~maskOf(available)) === 0 && fitsIn(entry.counts, available);
+}
@@ -0,0 +1,57 @@
+/**
+ * Tests for the anagram / word index
+ * Validates signature lookups, accent folding and letter-set searches
+ */
+
+import { describe, test, expect } from 'vitest'
+import {
+  buildWordIndex,
+  findAnagrams,
+  findWordsFromLetters,
+  getAnagramIndex,
+  getWordsOfLength,
+  isValidAnagram
+} from '@/lib/word-index'
+
+describe('Word Index', () => {
+  test('should find all anagrams by signature', () => {
+    const index = buildWordIndex(['amor', 'roma', 'ramo', 'mora', 'mesa'])
+
+    expect(findAnagrams(index, 'oram').sort()).toEqual(['amor', 'mora', 'ramo', 'roma'])
+    expect(findAnagrams(index, 'xyz')).toEqual([])
+  })
+
+  test('should ignore accents and case', () => {
+    const index = buildWordIndex(['más', 'canción'])
+
+    expect(findAnagrams(index, 'SAM')).toEqual(['más'])
+    expect(isValidAnagram(index, 'CANCION', 'nócican')).toBe(true)
+  })
+
+  test('should verify exact and subset candidates', () => {
+    const index = buildWordIndex(['roma', 'mora'])
+
+    expect(isValidAnagram(index, 'roma', 'amor')).toBe(true)
+    expect(isValidAnagram(index, 'roma', 'amorx')).toBe(false)
+    expect(isValidAnagram(index, 'roma', 'amorx', { exact: false })).toBe(true)
+    expect(isValidAnagram(index, 'mora', 'mar', { exact: false })).toBe(false) // 'mar' is not in the index
+  })
+
+  test('should find words spelled from a letter set with decoys', () => {
+    const index = buildWordIndex(['amor', 'más', 'mesa', 'canción'])
+
+    const found = findWordsFromLetters(index, 'esamq')
+    expect(found).toHaveLength(2)
+    expect(found).toContain('más')
+    expect(found).toContain('mesa')
+    expect(findWordsFromLetters(index, 'esamq', { minLength: 4 })).toEqual(['mesa'])
+  })
+
+  test('should bucket words by normalized length', () => {
+    const es = getAnagramIndex('es')
+
+    expect(getWordsOfLength(es, 4)).not.toContain('más')
+    expect(getWordsOfLength(es, 3)).toContain('más')
+    expect(getAnagramIndex('xx')).toBe(es) // unknown locales fall back to Spanish
+  })
+})
@@ -0,0 +1,293 @@
+import fs from 'fs'
+import { join } from 'path'
+
+/**
+ * Write-behind buffer for high-volume inserts
+ *
+ * Rows are appended to a local journal (one JSON line each) and acknowledged
+ * once the append has been synced; a background flush then writes accumulated
+ * rows as one multi-row statement every `flushIntervalMs` or as soon as
+ * `maxBatch` rows are queued.
+ *
+ * - Group commit: rows added while a sync is running are written as one
+ *   buffer and synced once, so a burst costs one fdatasync per group rather
+ *   than per row; the journal fd stays open
+ *
+ * - Bounded: once `maxQueue` rows are pending, add() returns false and the
+ *   caller should write synchronously (backpressure instead of unbounded memory)
+ * - Durable: each process appends to its own segment file in `journalDir`
+ *   (`<name>-<pid>-<ts>.jsonl`) and only ever truncates or deletes its own
+ *   segments. At startup, segments of processes that are no longer running
+ *   (crash before flush) are claimed with an atomic rename and replayed; the
+ *   flush function must be idempotent on the row id
+ * - Requires a durable local disk and a long-lived process: `journalDir` must
+ *   be on the same host for all processes sharing it (owners are matched by
+ *   pid). Not suitable for serverless, where /tmp and timers do not survive
+ *   the request
+ * - Failed flushes keep the rows queued and retry with backoff
+ * - Pending rows are flushed on SIGTERM/SIGINT/beforeExit
+ */
+
+const buffers = new Set()
+let shutdownHooksInstalled = false
+
+function installShutdownHooks() {
+  if (shutdownHooksInstalled || typeof process === 'undefined' || !process.once) return
+  shutdownHooksInstalled = true
+
+  const flushAll = () => Promise.all(Array.from(buffers, buffer => buffer.close()))
+  process.once('beforeExit', flushAll)
+  for (const signal of ['SIGTERM', 'SIGINT']) {
+    process.once(signal, () => {
+      flushAll().finally(() => process.exit(0))
+    })
+  }
+}
+
+export class WriteBehindBuffer {
+  /**
+   * @param {Object} options
+   * @param {string} options.name - Label for logs and stats
+   * @param {Function} options.flush - async (rows) => void; must be idempotent per row
+   * @param {string} [options.journalDir] - Journal directory; omit to keep rows in memory only
+   * @param {number} [options.maxBatch=100] - Rows per flush statement
+   * @param {number} [options.flushIntervalMs=25] - Max time a row waits before a flush
+   * @param {number} [options.maxQueue=5000] - Pending rows before add() refuses
+   */
+  constructor({ name, flush, journalDir, maxBatch = 100, flushIntervalMs = 25, maxQueue = 5000 }) {
+    this.name = name
+    this.flushFn = flush
+    this.journalDir = journalDir
+    this.journalPath = journalDir ? join(journalDir, `${name}-${process.pid}-${Date.now()}.jsonl`) : null
+    this.journal = this.journalPath ? new GroupCommitJournal(this.journalPath) : null
+    // Segments of dead processes being replayed; deleted once flushed
+    this.claimedSegments = []
+    this.maxBatch = maxBatch
+    this.flushIntervalMs = flushIntervalMs
+    this.maxQueue = maxQueue
+
+    this.queue = []
+    this.timer = null
+    this.flushing = null
+    this.retryDelayMs = 0
+    this.closed = false
+    this.appending = 0
+    this.stats = { accepted: 0, rejected: 0, flushed: 0, batches: 0, failures: 0 }
+
+    this.replayJournal()
+    buffers.add(this)
+    installShutdownHooks()
+  }
+
+  get pending() {
+    return this.queue.length
+  }
+
+  /**
+   * Queue a row; resolves true once journaled, false if the buffer is full or closed
+   */
+  async add(row) {
+    if (this.closed || this.queue.length + this.appending >= this.maxQueue) {
+      this.stats.rejected++
+      return false
+    }
+
+    if (this.journal) {
+      this.appending++
+      try {
+        await this.journal.append(JSON.stringify(row) + '\n')
+      } finally {
+        this.appending--
+      }
+    }
+
+    this.queue.push(row)
+    this.stats.accepted++
+
+    if (this.queue.length >= this.maxBatch) {
+      this.flush()
+    } else {
+      this.schedule(this.flushIntervalMs)
+    }
+    return true
+  }
+
+  /**
+   * Flush queued rows now (one statement per maxBatch rows)
+   */
+  flush() {
+    if (this.flushing) return this.flushing
+    clearTimeout(this.timer)
+    this.timer = null
+
+    this.flushing = this.drain().finally(() => {
+      this.flushing = null
+      if (this.queue.length > 0 && !this.closed) this.schedule(this.retryDelayMs || this.flushIntervalMs)
+    })
+    return this.flushing
+  }
+
+  /**
+   * Stop accepting rows and flush everything pending
+   */
+  async close() {
+    this.closed = true
+    clearTimeout(this.timer)
+    this.timer = null
+    for (let attempt = 0; attempt < 3 && this.queue.length > 0; attempt++) {
+      await this.flush()
+    }
+    await this.journal?.close()
+    buffers.delete(this)
+  }
+
+  getStats() {
+    return { name: this.name, pending: this.queue.length, ...this.stats }
+  }
+
+  schedule(delayMs) {
+    if (this.timer) return
+    this.timer = setTimeout(() => {
+      this.timer = null
+      this.flush()
+    }, delayMs)
+    this.timer.unref?.()
+  }
+
+  async drain() {
+    while (this.queue.length > 0) {
+      const batch = this.queue.slice(0, this.maxBatch)
+      try {
+        await this.flushFn(batch)
+      } catch (error) {
+        this.stats.failures++
+        this.retryDelayMs = Math.min(5000, Math.max(100, this.retryDelayMs * 2))
+        console.error(`Write-behind flush failed (${this.name}, ${batch.length} rows):`, error)
+        return
+      }
+
+      this.queue.splice(0, batch.length)
+      this.retryDelayMs = 0
+      this.stats.flushed += batch.length
+      this.stats.batches++
+    }
+
+    // Everything is in the database; our segment can start over and the
+    // replayed segments are done (unless a row is journaled but not queued yet)
+    if (this.journalPath && this.appending === 0) {
+      try {
+        fs.truncateSync(this.journalPath, 0)
+      } catch (error) {
+        if (error.code !== 'ENOENT') console.error(`Write-behind journal truncate failed (${this.name}):`, error)
+      }
+      for (const segment of this.claimedSegments.splice(0)) {
+        fs.unlink(segment, error => {
+          if (error && error.code !== 'ENOENT') console.error(`Write-behind segment delete failed (${this.name}):`, error)
+        })
+      }
+    }
+  }
+
+  replayJournal() {
+    if (!this.journalDir) return
+    let files
+    try {
+      fs.mkdirSync(this.journalDir, { recursive: true })
+      files = fs.readdirSync(this.journalDir)
+    } catch (error) {
+      console.error(`Write-behind journal directory unavailable (${this.name}):`, error)
+      return
+    }
+
+    const pattern = new RegExp(`^${this.name}-(\\d+)-(\\d+)\\.jsonl$`)
+    let claimed = 0
+    for (const file of files) {
+      const match = pattern.exec(file)
+      if (!match || isProcessAlive(parseInt(match[1], 10))) continue
+
+      // Rename first: if another process claimed the segment, ours fails
+      const segment = join(this.journalDir, `${this.name}-${process.pid}-${match[2]}${claimed}.jsonl`)
+      try {
+        fs.renameSync(join(this.journalDir, file), segment)
+      } catch (error) {
+        if (error.code !== 'ENOENT') console.error(`Write-behind segment claim failed (${this.name}):`, error)
+        continue
+      }
+      claimed++
+      this.claimedSegments.push(segment)
+
+      for (const line of fs.readFileSync(segment, 'utf8').split('\n')) {
+        if (!line) continue
+        try {
+          this.queue.push(JSON.parse(line))
+        } catch (error) {
+          // Torn last line from a crash mid-append; the request was never acknowledged
+        }
+      }
+    }
+
+    if (claimed > 0) {
+      console.log(`Write-behind (${this.name}): replaying ${this.queue.length} journaled rows from ${claimed} segments`)
+      this.schedule(0)
+    }
+  }
+}
+
+function isProcessAlive(pid) {
+  if (pid === process.pid) return true
+  try {
+    process.kill(pid, 0)
+    return true
+  } catch (error) {
+    // EPERM: the process exists but belongs to another user
+    return error.code === 'EPERM'
+  }
+}
+
+// Append-only journal file with group commit. Appends made while a write and
+// sync are in flight are queued and committed together by the next round.
+class GroupCommitJournal {
+  constructor(path) {
+    this.path = path
+    this.handle = null
+    this.waiting = []
+    this.committing = null
+    // After a failed write the file may end in a partial line; start the
+    // next group on a new line so that fragment cannot swallow a good row
+    this.torn = false
+  }
+
+  append(data) {
+    return new Promise((resolve, reject) => {
+      this.waiting.push({ data, resolve, reject })
+      if (!this.committing) this.committing = this.commitAll()
+    })
+  }
+
+  async commitAll() {
+    while (this.waiting.length > 0) {
+      const group = this.waiting.splice(0)
+      try {
+        if (!this.handle) this.handle = await fs.promises.open(this.path, 'a')
+        const data = (this.torn ? '\n' : '') + group.map(entry => entry.data).join('')
+        await this.handle.appendFile(data)
+        await this.handle.datasync()
+        this.torn = false
+        for (const entry of group) entry.resolve()
+      } catch (error) {
+        this.torn = true
+        this.handle?.close().catch(() => {})
+        this.handle = null
+        for (const entry of group) entry.reject(error)
+      }
+    }
+    this.committing = null
+  }
+
+  async close() {
+    await this.committing
+    const handle = this.handle
+    this.handle = null
+    await handle?.close()
+  }
+}
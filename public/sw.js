@@ -19,11 +19,21 @@ const APP_SHELL_URLS = [
   '/accelerator-worker.js'
 ]
 
-// Offline queue for background sync with exponential backoff
-let offlineQueue = {
-  game_runs: [],
-  session_schedules: []
-}
+// Offline queue for background sync - durable in IndexedDB so queued actions
+// survive the worker being terminated
+const QUEUE_DB_NAME = 'spiread-sw'
+const QUEUE_DB_VERSION = 1
+const QUEUE_STORE = 'offline_queue'
+const QUEUE_TYPES = ['game_run', 'session_schedule', 'progress_save']
+
+// Items per /api/sync request (the server accepts up to 25)
+const SYNC_BATCH_SIZE = 25
+// Random delay before a sync starts, so clients coming back online together
+// do not all hit the API in the same instant
+const SYNC_START_JITTER_MS = 3000
+// Failed syncs (server errors, not offline) before an action is dropped, so
+// one action the server can never store does not block the queue forever
+const MAX_SYNC_ATTEMPTS = 8
 
 // Pre-cache offline: app shell + 9 games (assets mínimos para cargar cada juego) + últimos N=5 documentos y resultados de quiz
 const OFFLINE_GAME_ASSETS = [
@@ -57,6 +67,147 @@ const GAME_ASSETS_PATTERNS = [
   /\/lib\/adaptive-difficulty\.js/
 ]
 
+// Cache budgets - runtime caches are trimmed least-recently-used first so
+// they never grow until the browser evicts the whole origin.
+// The shell cache is small and fixed; entries under /offline/ (recent docs and
+// quiz results, managed N=5 below) and internal /__*__ keys are not budgeted.
+const CACHE_BUDGETS = {
+  assets: { maxEntries: 150, maxBytes: 25 * 1024 * 1024 },
+  data: { maxEntries: 60, maxBytes: 4 * 1024 * 1024 }
+}
+
+// A single response larger than this share of the budget is not cached
+const MAX_ENTRY_SHARE = 0.25
+
+// Cached API data older than this is not served before revalidating
+const API_STALE_MAX_MS = 24 * 60 * 60 * 1000
+
+// LRU metadata per budgeted cache: url -> { size, storedAt, lastAccess }
+// Kept in memory, persisted (debounced) as a JSON entry in the same cache
+const CACHE_META_KEY = '/__cache_meta__'
+const META_PERSIST_DELAY_MS = 2000
+const cacheMeta = {}
+const metaPersistTimers = {}
+
+function isBudgetExempt(url) {
+  const { pathname } = new URL(url, self.location.origin)
+  return pathname.startsWith('/offline/') || pathname.startsWith('/__')
+}
+
+async function responseSize(response) {
+  const length = parseInt(response.headers.get('content-length'), 10)
+  if (Number.isFinite(length)) return length
+  return (await response.clone().blob()).size
+}
+
+function getCacheMeta(cacheKey) {
+  if (!cacheMeta[cacheKey]) {
+    cacheMeta[cacheKey] = loadCacheMeta(cacheKey)
+  }
+  return cacheMeta[cacheKey]
+}
+
+async function loadCacheMeta(cacheKey) {
+  const cache = await caches.open(CACHES[cacheKey])
+  const meta = new Map()
+
+  try {
+    const stored = await cache.match(CACHE_META_KEY)
+    if (stored) {
+      for (const [url, entry] of await stored.json()) meta.set(url, entry)
+    }
+  } catch (error) {
+    console.log(`[SW] Cache metadata for ${cacheKey} unreadable, rebuilding`)
+  }
+
+  // Reconcile with the cache contents: drop metadata for evicted entries and
+  // index entries cached before metadata existed (oldest first in LRU order)
+  const urls = new Set()
+  for (const request of await cache.keys()) {
+    if (isBudgetExempt(request.url)) continue
+    urls.add(request.url)
+    if (!meta.has(request.url)) {
+      const response = await cache.match(request)
+      meta.set(request.url, { size: response ? await responseSize(response) : 0, storedAt: 0, lastAccess: 0 })
+    }
+  }
+  for (const url of meta.keys()) {
+    if (!urls.has(url)) meta.delete(url)
+  }
+
+  return meta
+}
+
+function persistCacheMeta(cacheKey) {
+  if (metaPersistTimers[cacheKey]) return
+  metaPersistTimers[cacheKey] = setTimeout(async () => {
+    metaPersistTimers[cacheKey] = null
+    try {
+      const meta = await getCacheMeta(cacheKey)
+      const cache = await caches.open(CACHES[cacheKey])
+      await cache.put(CACHE_META_KEY, new Response(JSON.stringify(Array.from(meta)), {
+        headers: { 'Content-Type': 'application/json' }
+      }))
+    } catch (error) {
+      console.error(`[SW] Failed to persist cache metadata for ${cacheKey}:`, error)
+    }
+  }, META_PERSIST_DELAY_MS)
+}
+
+// Record a cache hit for LRU ordering; returns the entry's metadata
+async function touchCacheEntry(cacheKey, url) {
+  if (!CACHE_BUDGETS[cacheKey] || isBudgetExempt(url)) return null
+  const meta = await getCacheMeta(cacheKey)
+  const entry = meta.get(url)
+  if (entry) {
+    entry.lastAccess = Date.now()
+    persistCacheMeta(cacheKey)
+  }
+  return entry || null
+}
+
+// cache.put with size accounting and LRU eviction down to the cache's budget
+async function putWithBudget(cacheKey, request, response) {
+  const cache = await caches.open(CACHES[cacheKey])
+  const budget = CACHE_BUDGETS[cacheKey]
+  const url = typeof request === 'string' ? new URL(request, self.location.origin).href : request.url
+
+  if (!budget || isBudgetExempt(url)) {
+    await cache.put(request, response)
+    return
+  }
+
+  const size = await responseSize(response)
+  if (size > budget.maxBytes * MAX_ENTRY_SHARE) return
+
+  await cache.put(request, response)
+
+  const meta = await getCacheMeta(cacheKey)
+  const now = Date.now()
+  meta.set(url, { size, storedAt: now, lastAccess: now })
+  await enforceCacheBudget(cacheKey, cache, meta, url)
+  persistCacheMeta(cacheKey)
+}
+
+async function enforceCacheBudget(cacheKey, cache, meta, keepUrl) {
+  const budget = CACHE_BUDGETS[cacheKey]
+  let bytes = 0
+  for (const entry of meta.values()) bytes += entry.size
+  if (meta.size <= budget.maxEntries && bytes <= budget.maxBytes) return
+
+  const byAge = Array.from(meta).sort((a, b) => a[1].lastAccess - b[1].lastAccess)
+  let evicted = 0
+  for (const [url, entry] of byAge) {
+    if (meta.size <= budget.maxEntries && bytes <= budget.maxBytes) break
+    if (url === keepUrl) continue
+    meta.delete(url)
+    bytes -= entry.size
+    evicted++
+    await cache.delete(url)
+  }
+  console.log(`[SW] Evicted ${evicted} entries from ${cacheKey} cache (${meta.size} entries, ${bytes} bytes left)`)
+}
+
 // Install event - precache app shell and critical assets
 self.addEventListener('install', event => {
   console.log(`[SW] Installing ${SW_VERSION} (${SW_BUILD})...`)
@@ -133,9 +284,9 @@ self.addEventListener('fetch', event => {
     return
   }
   
-  // API requests - network-first with cache fallback
+  // API requests - stale-while-revalidate for cacheable data, network otherwise
   if (url.pathname.startsWith('/api/')) {
-    event.respondWith(handleAPIRequest(request))
+    event.respondWith(handleAPIRequest(request, event))
     return
   }
   
@@ -152,55 +303,81 @@ self.addEventListener('fetch', event => {
   }
   
   // Default - stale-while-revalidate
-  event.respondWith(handleDefault(request))
+  event.respondWith(handleDefault(request, event))
 })
 
-// API requests - network-first with smart fallback
-async function handleAPIRequest(request) {
+// Revalidations in flight, so concurrent hits on one URL fetch it once.
+// Every caller gets its own clone; the shared response is never consumed.
+// The cache write runs as its own task: a quota or cache error must not turn
+// a successful network response into a failure.
+const revalidations = new Map()
+
+function revalidate(cacheKey, request, event) {
+  const url = request.url
+  if (!revalidations.has(url)) {
+    const promise = fetch(request)
+      .then(response => {
+        if (response.ok) {
+          event.waitUntil(putWithBudget(cacheKey, request, response.clone()).catch(error => {
+            console.error(`[SW] Failed to cache ${url}:`, error)
+          }))
+        }
+        return response
+      })
+      .finally(() => revalidations.delete(url))
+    revalidations.set(url, promise)
+  }
+  return revalidations.get(url).then(response => response.clone())
+}
+
+function offlineAPIResponse() {
+  return new Response(
+    JSON.stringify({
+      error: 'Offline',
+      message: 'Network unavailable. Some features may be limited.',
+      offline: true
+    }),
+    {
+      status: 503,
+      headers: { 'Content-Type': 'application/json' }
+    }
+  )
+}
+
+// API requests - stale-while-revalidate for cacheable data
+async function handleAPIRequest(request, event) {
   const url = new URL(request.url)
-  
-  try {
-    // Try network first with timeout
-    const networkResponse = await Promise.race([
-      fetch(request),
-      new Promise((_, reject) => 
-        setTimeout(() => reject(new Error('Network timeout')), 5000)
-      )
-    ])
-    
-    // Cache successful responses for offline use (stale-while-revalidate for recent data)
-    if (networkResponse.ok && shouldCacheAPI(url.pathname)) {
-      const cache = await caches.open(CACHES.data)
-      await cache.put(request, networkResponse.clone())
+
+  if (!shouldCacheAPI(url.pathname)) {
+    try {
+      return await fetch(request)
+    } catch (error) {
+      console.log(`[SW] Network failed for ${url.pathname}`)
+      return offlineAPIResponse()
     }
-    
-    return networkResponse
-    
+  }
+
+  const cache = await caches.open(CACHES.data)
+  const cachedResponse = await cache.match(request)
+  const entry = cachedResponse ? await touchCacheEntry('data', request.url) : null
+  const network = revalidate('data', request, event)
+
+  // Serve the cached copy now and refresh it in the background, unless it is
+  // too old to show without trying the network first. The user's own data is
+  // network-first: a cached copy from before their last save would roll it back.
+  const fresh = entry && Date.now() - entry.storedAt < API_STALE_MAX_MS
+  if (cachedResponse && fresh && !isUserDataAPI(url.pathname)) {
+    event.waitUntil(network.catch(() => {
+      console.log(`[SW] Revalidation failed for ${url.pathname}`)
+    }))
+    return cachedResponse
+  }
+
+  try {
+    return await network
   } catch (error) {
     console.log(`[SW] Network failed for ${url.pathname}, trying cache...`)
-    
-    // Network failed - try cache
-    const cachedResponse = await caches.match(request)
-    if (cachedResponse) {
-      return cachedResponse
-    }
-    
-    // No cache - return offline response
-    if (url.pathname.startsWith('/api/')) {
-      return new Response(
-        JSON.stringify({
-          error: 'Offline',
-          message: 'Network unavailable. Some features may be limited.',
-          offline: true
-        }),
-        {
-          status: 503,
-          headers: { 'Content-Type': 'application/json' }
-        }
-      )
-    }
-    
-    throw error
+    return cachedResponse || offlineAPIResponse()
   }
 }
 
@@ -211,6 +388,7 @@ async function handleStaticAsset(request) {
   // Try cache first
   const cachedResponse = await cache.match(request)
   if (cachedResponse) {
+    touchCacheEntry('assets', request.url)
     return cachedResponse
   }
   
@@ -218,7 +396,7 @@ async function handleStaticAsset(request) {
   try {
     const networkResponse = await fetch(request)
     if (networkResponse.ok) {
-      await cache.put(request, networkResponse.clone())
+      await putWithBudget('assets', request, networkResponse.clone())
     }
     return networkResponse
   } catch (error) {
@@ -262,25 +440,26 @@ async function handleAppShell(request) {
 }
 
 // Default strategy - stale-while-revalidate
-async function handleDefault(request) {
+async function handleDefault(request, event) {
   const cache = await caches.open(CACHES.data)
   
   // Get cached version immediately
   const cachedResponse = await cache.match(request)
   
   // Fetch new version in background
-  const networkPromise = fetch(request).then(response => {
-    if (response.ok) {
-      cache.put(request, response.clone())
-    }
-    return response
-  }).catch(() => null)
+  const networkPromise = revalidate('data', request, event).catch(() => null)
   
-  // Return cached version or wait for network
-  return cachedResponse || await networkPromise || new Response('Offline', { status: 503 })
+  if (cachedResponse) {
+    touchCacheEntry('data', request.url)
+    event.waitUntil(networkPromise)
+    return cachedResponse
+  }
+
+  // Nothing cached - wait for network
+  return await networkPromise || new Response('Offline', { status: 503 })
 }
 
-// Background Sync - handle offline actions with exponential backoff
+// Background Sync - handle offline actions with jittered exponential backoff
 self.addEventListener('sync', event => {
   console.log(`[SW] Background sync triggered: ${event.tag}`)
   
@@ -289,51 +468,172 @@ self.addEventListener('sync', event => {
   }
 })
 
-// Process offline queue with exponential backoff and persistence in IndexedDB
-async function processOfflineQueue() {
-  try {
-    // Process game runs
-    for (const gameRun of offlineQueue.game_runs) {
-      try {
-        const response = await fetch('/api/progress/save', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(gameRun)
-        })
-        
-        if (response.ok) {
-          offlineQueue.game_runs = offlineQueue.game_runs.filter(item => item !== gameRun)
-          console.log('[SW] Game run synced successfully')
-        }
-      } catch (error) {
-        console.log('[SW] Failed to sync game run:', error)
+// IndexedDB helpers for the offline queue
+// Records: { idempotencyKey, type, payload, compactKey?, queuedAt, attempts }
+let queueDbPromise = null
+
+function openQueueDb() {
+  if (!queueDbPromise) {
+    queueDbPromise = new Promise((resolve, reject) => {
+      const request = indexedDB.open(QUEUE_DB_NAME, QUEUE_DB_VERSION)
+      request.onupgradeneeded = () => {
+        const store = request.result.createObjectStore(QUEUE_STORE, { keyPath: 'idempotencyKey' })
+        store.createIndex('queuedAt', 'queuedAt')
+        store.createIndex('compactKey', 'compactKey')
       }
+      request.onsuccess = () => resolve(request.result)
+      request.onerror = () => reject(request.error)
+    }).catch(error => {
+      queueDbPromise = null
+      throw error
+    })
+  }
+  return queueDbPromise
+}
+
+function idbRequest(request) {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result)
+    request.onerror = () => reject(request.error)
+  })
+}
+
+function idbTransactionDone(tx) {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve()
+    tx.onerror = () => reject(tx.error)
+    tx.onabort = () => reject(tx.error)
+  })
+}
+
+// Progress saves for the same user and game supersede each other; the server
+// merges each patch shallowly, so merging queued patches gives the same result.
+// They are stamped with the time they were recorded so the server can ignore
+// them if a newer save got there first.
+function compactKeyFor(type, payload) {
+  return type === 'progress_save' ? `${payload.userId || payload.user_id}:${payload.game}` : undefined
+}
+
+async function enqueueOfflineAction(type, payload) {
+  if (!QUEUE_TYPES.includes(type)) {
+    console.log(`[SW] Ignoring unknown offline action: ${type}`)
+    return
+  }
+
+  const db = await openQueueDb()
+  const tx = db.transaction(QUEUE_STORE, 'readwrite')
+  const store = tx.objectStore(QUEUE_STORE)
+  const compactKey = compactKeyFor(type, payload)
+  if (type === 'progress_save' && payload.updatedAt == null) {
+    payload = { ...payload, updatedAt: Date.now() }
+  }
+
+  // The key is fixed when the action is queued, so every retry of it (this
+  // sync or a later one) is deduplicated by the server
+  const record = {
+    idempotencyKey: payload.idempotencyKey || self.crypto.randomUUID(),
+    type,
+    payload,
+    queuedAt: Date.now(),
+    attempts: 0
+  }
+
+  if (compactKey) {
+    record.compactKey = compactKey
+    const superseded = await idbRequest(store.index('compactKey').getAll(compactKey))
+    for (const older of superseded) {
+      record.payload = {
+        ...older.payload,
+        ...payload,
+        progress: { ...older.payload.progress, ...payload.progress },
+        updatedAt: Math.max(older.payload.updatedAt || 0, payload.updatedAt)
+      }
+      // Keep the original position so compaction does not starve old saves
+      record.queuedAt = Math.min(record.queuedAt, older.queuedAt)
+      store.delete(older.idempotencyKey)
     }
-    
-    // Process session schedules
-    for (const session of offlineQueue.session_schedules) {
-      try {
-        const response = await fetch('/api/sessions', {
-          method: 'POST', 
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(session)
-        })
-        
-        if (response.ok) {
-          offlineQueue.session_schedules = offlineQueue.session_schedules.filter(item => item !== session)
-          console.log('[SW] Session schedule synced successfully')
-        }
-      } catch (error) {
-        console.log('[SW] Failed to sync session schedule:', error)
+  }
+
+  store.put(record)
+  await idbTransactionDone(tx)
+  console.log(`[SW] Queued offline action: ${type}${compactKey ? ' (compacted)' : ''}`)
+}
+
+async function readQueueBatch(limit) {
+  const db = await openQueueDb()
+  const index = db.transaction(QUEUE_STORE, 'readonly').objectStore(QUEUE_STORE).index('queuedAt')
+  return idbRequest(index.getAll(null, limit))
+}
+
+async function removeQueued(keys, failedKeys = []) {
+  if (keys.length === 0 && failedKeys.length === 0) return
+  const db = await openQueueDb()
+  const tx = db.transaction(QUEUE_STORE, 'readwrite')
+  const store = tx.objectStore(QUEUE_STORE)
+  for (const key of keys) store.delete(key)
+  for (const key of failedKeys) {
+    const request = store.get(key)
+    request.onsuccess = () => {
+      const record = request.result
+      if (!record) return
+      if (record.attempts + 1 >= MAX_SYNC_ATTEMPTS) {
+        console.error(`[SW] Dropping offline action ${key} (${record.type}) after ${MAX_SYNC_ATTEMPTS} failed syncs`)
+        store.delete(key)
+      } else {
+        store.put({ ...record, attempts: record.attempts + 1 })
       }
     }
-    
-    // Persist queue state
-    await persistOfflineQueue()
-    
+  }
+  await idbTransactionDone(tx)
+}
+
+async function getQueueLengths() {
+  const lengths = { game_runs: 0, session_schedules: 0, progress_saves: 0 }
+  try {
+    const db = await openQueueDb()
+    const records = await idbRequest(db.transaction(QUEUE_STORE, 'readonly').objectStore(QUEUE_STORE).getAll())
+    for (const record of records) lengths[`${record.type}s`]++
   } catch (error) {
-    console.error('[SW] Background sync failed:', error)
+    console.error('[SW] Failed to read offline queue:', error)
+  }
+  return lengths
+}
+
+// Upload one batch; returns the number of items the server settled
+async function syncQueueBatch(batch) {
+  const response = await fetch('/api/sync', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      items: batch.map(({ idempotencyKey, type, payload }) => ({ idempotencyKey, type, payload }))
+    })
+  })
+
+  if (!response.ok) {
+    // Rate limited: nothing was attempted, so it does not count against the items
+    if (response.status !== 429) await removeQueued([], batch.map(record => record.idempotencyKey))
+    throw new Error(`HTTP ${response.status}: ${response.statusText}`)
   }
+
+  const { results = [] } = await response.json()
+  const done = []
+  const retry = []
+  for (const result of results) {
+    // 2xx: stored (or an idempotent replay); other 4xx will never succeed
+    const permanent = result.status >= 400 && result.status < 500 && result.status !== 408 && result.status !== 429
+    if (result.status < 300 || permanent) {
+      if (permanent) console.log(`[SW] Dropping offline action ${result.idempotencyKey}: HTTP ${result.status}`)
+      done.push(result.idempotencyKey)
+    } else {
+      retry.push(result.idempotencyKey)
+    }
+  }
+
+  await removeQueued(done, retry)
+  if (retry.length > 0 || done.length === 0) {
+    throw new Error(`${retry.length || batch.length} offline actions not synced`)
+  }
+  return done.length
 }
 
 // Message handler - communicate with main thread (for debug endpoint)
@@ -342,42 +642,31 @@ self.addEventListener('message', event => {
   
   switch (action) {
     case 'GET_SW_STATUS':
-      event.ports[0].postMessage({
+      getQueueLengths().then(queueLengths => event.ports[0].postMessage({
         version: SW_VERSION,
         build: SW_BUILD,
         caches: Object.keys(CACHES),
-        queueLengths: {
-          game_runs: offlineQueue.game_runs.length,
-          session_schedules: offlineQueue.session_schedules.length
-        }
-      })
+        queueLengths
+      }))
       break
     
     case 'GET_PWA_STATUS':
       // For debug endpoint - return detailed PWA status
-      getCacheStats().then(cacheStats => {
+      Promise.all([getCacheStats(), getQueueLengths()]).then(([cacheStats, queueLengths]) => {
         event.ports[0].postMessage({
           swVersion: SW_VERSION,
           installed: true, // SW is installed if we're responding
           caches: cacheStats,
           bgSync: {
-            queueLengths: {
-              game_runs: offlineQueue.game_runs.length,
-              session_schedules: offlineQueue.session_schedules.length
-            }
+            queueLengths
           }
         })
       })
       break
       
     case 'QUEUE_OFFLINE_ACTION':
-      if (data.type === 'game_run') {
-        offlineQueue.game_runs.push(data.payload)
-      } else if (data.type === 'session_schedule') {
-        offlineQueue.session_schedules.push(data.payload)
-      }
-      console.log(`[SW] Queued offline action: ${data.type}`)
-      persistOfflineQueue()
+      // data: { type: 'game_run' | 'session_schedule' | 'progress_save', payload }
+      event.waitUntil(enqueueOfflineAction(data.type, data.payload).then(requestQueueSync))
       break
       
     case 'CLEAR_CACHES':
@@ -418,33 +707,34 @@ async function getCacheStats() {
   return stats
 }
 
-// Persist offline queue (simplified - in production use IndexedDB)
-async function persistOfflineQueue() {
+// Ask for a background sync; without Background Sync support, try right away
+async function requestQueueSync() {
   try {
-    // Store in cache as a simple persistence mechanism
-    const dataCache = await caches.open(CACHES.data)
-    const queueResponse = new Response(JSON.stringify(offlineQueue), {
-      headers: { 'Content-Type': 'application/json' }
-    })
-    await dataCache.put('__offline_queue__', queueResponse)
+    if (self.registration.sync) {
+      await self.registration.sync.register('background-sync-spiread')
+      return
+    }
   } catch (error) {
-    console.error('[SW] Failed to persist offline queue:', error)
+    console.log('[SW] Background sync registration failed:', error)
   }
+  await processOfflineQueueWithBackoff()
 }
 
-// Load offline queue on startup
-async function loadOfflineQueue() {
+// Move a queue persisted by older versions (JSON entry in the data cache)
+// into IndexedDB
+async function migrateLegacyOfflineQueue() {
   try {
     const dataCache = await caches.open(CACHES.data)
     const queueResponse = await dataCache.match('__offline_queue__')
-    
-    if (queueResponse) {
-      const queue = await queueResponse.json()
-      offlineQueue = { ...offlineQueue, ...queue }
-      console.log('[SW] Loaded offline queue:', offlineQueue)
-    }
+    if (!queueResponse) return
+
+    const queue = await queueResponse.json()
+    for (const payload of queue.game_runs || []) await enqueueOfflineAction('game_run', payload)
+    for (const payload of queue.session_schedules || []) await enqueueOfflineAction('session_schedule', payload)
+    await dataCache.delete('__offline_queue__')
+    console.log('[SW] Migrated offline queue to IndexedDB')
   } catch (error) {
-    console.error('[SW] Failed to load offline queue:', error)
+    console.error('[SW] Failed to migrate offline queue:', error)
   }
 }
 
@@ -471,11 +761,16 @@ function isAppShellRequest(pathname) {
 function shouldCacheAPI(pathname) {
   // Cache for stale-while-revalidate strategy (recent docs/quiz data)
   return pathname.includes('/api/health') ||
-         pathname.includes('/api/progress/get') ||
-         pathname.includes('/api/settings') ||
+         isUserDataAPI(pathname) ||
          pathname.includes('/api/ai/health')
 }
 
+// Cached only as an offline fallback (network-first)
+function isUserDataAPI(pathname) {
+  return pathname.includes('/api/progress/get') ||
+         pathname.includes('/api/settings')
+}
+
 async function clearAllCaches() {
   const cacheNames = await caches.keys()
   await Promise.all(
@@ -483,6 +778,8 @@ async function clearAllCaches() {
       .filter(name => name.includes('spiread'))
       .map(name => caches.delete(name))
   )
+  // LRU metadata described the deleted entries
+  for (const cacheKey of Object.keys(cacheMeta)) delete cacheMeta[cacheKey]
   console.log('[SW] All caches cleared')
 }
 
@@ -526,7 +823,8 @@ async function cacheRecentQuizResults(quizResults) {
   }
 }
 
-// BG Sync: reintentos exponenciales con backoff
+// BG Sync: reintentos exponenciales con backoff y jitter completo
+// (random delay in [0, base * 2^attempt]) so clients do not retry in lockstep
 async function retryWithBackoff(fn, maxRetries = 3, baseDelay = 1000) {
   for (let attempt = 0; attempt < maxRetries; attempt++) {
     try {
@@ -534,80 +832,47 @@ async function retryWithBackoff(fn, maxRetries = 3, baseDelay = 1000) {
     } catch (error) {
       if (attempt === maxRetries - 1) throw error
       
-      const delay = baseDelay * Math.pow(2, attempt) // Exponential backoff
+      const delay = Math.round(Math.random() * baseDelay * Math.pow(2, attempt))
       console.log(`[SW] Retry attempt ${attempt + 1} failed, waiting ${delay}ms...`)
       await new Promise(resolve => setTimeout(resolve, delay))
     }
   }
 }
 
-// Enhanced background sync with exponential backoff
-async function processOfflineQueueWithBackoff() {
-  try {
-    // Process game runs with exponential backoff
-    for (const gameRun of [...offlineQueue.game_runs]) {
-      try {
-        await retryWithBackoff(async () => {
-          const response = await fetch('/api/progress/save', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(gameRun)
-          })
-          
-          if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`)
-          }
-          
-          return response
-        })
-        
-        // Success - remove from queue
-        offlineQueue.game_runs = offlineQueue.game_runs.filter(item => item !== gameRun)
-        console.log('[SW] Game run synced successfully with backoff')
-        
-      } catch (error) {
-        console.log('[SW] Failed to sync game run after retries:', error)
-        // Keep in queue for next sync attempt
-      }
-    }
-    
-    // Process session schedules with exponential backoff
-    for (const session of [...offlineQueue.session_schedules]) {
-      try {
-        await retryWithBackoff(async () => {
-          const response = await fetch('/api/sessions', {
-            method: 'POST', 
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(session)
-          })
-          
-          if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`)
-          }
-          
-          return response
+// Background sync: upload the queue oldest first, SYNC_BATCH_SIZE items per
+// request. A batch that keeps failing rejects, so the browser schedules
+// another sync later.
+let queueSyncPromise = null
+
+function processOfflineQueueWithBackoff() {
+  if (!queueSyncPromise) {
+    queueSyncPromise = (async () => {
+      await new Promise(resolve => setTimeout(resolve, Math.random() * SYNC_START_JITTER_MS))
+
+      let synced = 0
+      for (;;) {
+        // Each attempt re-reads the head of the queue, so a retry only
+        // resends the items that are still pending
+        const settled = await retryWithBackoff(async () => {
+          const batch = await readQueueBatch(SYNC_BATCH_SIZE)
+          return batch.length === 0 ? null : syncQueueBatch(batch)
         })
-        
-        // Success - remove from queue
-        offlineQueue.session_schedules = offlineQueue.session_schedules.filter(item => item !== session)
-        console.log('[SW] Session schedule synced successfully with backoff')
-        
-      } catch (error) {
-        console.log('[SW] Failed to sync session schedule after retries:', error)
-        // Keep in queue for next sync attempt
+        if (settled === null) break
+        synced += settled
       }
-    }
-    
-    // Persist updated queue state
-    await persistOfflineQueue()
-    
-  } catch (error) {
-    console.error('[SW] Background sync with backoff failed:', error)
+      if (synced > 0) console.log(`[SW] Synced ${synced} offline actions`)
+    })().catch(error => {
+      console.log('[SW] Background sync incomplete, will retry:', error)
+      throw error
+    }).finally(() => {
+      queueSyncPromise = null
+    })
   }
+  return queueSyncPromise
 }
 
-// Load offline queue when SW starts
-loadOfflineQueue()
+// Move any queue left by older versions into IndexedDB when SW starts
+migrateLegacyOfflineQueue()
 
 // Notify clients when SW is ready
 console.log(`[SW] ${SW_VERSION} (${SW_BUILD}) ready for offline use`)
\ No newline at end of file
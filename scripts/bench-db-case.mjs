@@ -0,0 +1,68 @@
+#!/usr/bin/env node
+
+/**
+ * Microbenchmark for lib/dbCase.ts conversions
+ * Measures per-row cost of fromDbFormat/toDbFormat on 50-row game_runs
+ * responses (including the nested `metrics` JSON column).
+ *
+ * Usage: yarn bench:db-case
+ * Imports lib/dbCase.ts without a build step, so it needs Node 22.6+ with
+ * --experimental-strip-types (the script sets the flag).
+ */
+
+const [major, minor] = process.versions.node.split('.').map(Number)
+if (major < 22 || (major === 22 && minor < 6)) {
+  console.error(`bench-db-case needs Node 22.6+ for TypeScript type stripping (running ${process.versions.node})`)
+  process.exit(1)
+}
+
+const { fromDbFormat, toDbFormat } = await import('../lib/dbCase.ts')
+
+const ROWS = 50
+const ITERATIONS = 2000
+
+function makeRow(i) {
+  return {
+    id: `run_${i}`,
+    user_id: 'user_123',
+    game: 'schulte',
+    difficulty_level: 1 + (i % 10),
+    duration_ms: 60000,
+    score: 100 + i,
+    created_at: new Date(Date.now() - i * 60000).toISOString(),
+    metrics: {
+      total_tables: 5,
+      average_time_ms: 12000 + i,
+      best_table_time: 9000,
+      rounds: Array.from({ length: 10 }, (_, r) => ({
+        round_index: r,
+        reaction_time_ms: 400 + r,
+        is_correct: r % 3 !== 0
+      }))
+    }
+  }
+}
+
+const rows = Array.from({ length: ROWS }, (_, i) => makeRow(i))
+
+function bench(name, fn) {
+  // Warm up JIT and key caches
+  for (let i = 0; i < 200; i++) fn()
+
+  const start = performance.now()
+  for (let i = 0; i < ITERATIONS; i++) fn()
+  const elapsed = performance.now() - start
+
+  const perResponseUs = (elapsed / ITERATIONS) * 1000
+  console.log(
+    `${name.padEnd(36)} ${perResponseUs.toFixed(1).padStart(8)} µs/response ` +
+    `${(perResponseUs / ROWS).toFixed(2).padStart(7)} µs/row`
+  )
+}
+
+console.log(`dbCase benchmark: ${ROWS} rows x ${ITERATIONS} iterations\n`)
+
+bench('fromDbFormat (deep)', () => fromDbFormat(rows))
+
+const camelRows = fromDbFormat(rows)
+bench('toDbFormat (deep)', () => toDbFormat(camelRows))
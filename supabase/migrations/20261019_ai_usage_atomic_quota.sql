@@ -0,0 +1,90 @@
+-- Spiread: atomic AI quota counters
+-- Replaces the select-then-update quota check with one statement per AI call,
+-- and token accounting with one batched call per flush.
+
+-- Daily rows: ai_usage(user_id, period_start) holds one row per user per day.
+
+-- Both functions are security definer and trust their arguments (user id,
+-- limits, token counts), so they are callable by the service role only: the
+-- API routes call them with the server-side client and limits from server
+-- config (AI_MAX_CALLS_PER_DAY, AI_MAX_TOKENS_PER_MONTH). Never grant them to
+-- anon/authenticated.
+
+-- 1. Consume one AI call if the user is under the daily call limit and the
+--    monthly token limit. Returns allowed/remaining in a single round trip.
+create or replace function consume_ai_call(
+  p_user_id uuid,
+  p_max_calls int,
+  p_max_tokens_month int,
+  p_day date default current_date
+)
+returns table (allowed boolean, calls_used int, remaining int, reason text)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+  v_month_tokens bigint;
+  v_calls int;
+begin
+  select coalesce(sum(u.tokens_used), 0) into v_month_tokens
+  from ai_usage u
+  where u.user_id = p_user_id
+    and u.period_start >= date_trunc('month', p_day)::date
+    and u.period_start <= p_day;
+
+  if v_month_tokens >= p_max_tokens_month then
+    return query select false, null::int, 0, 'Monthly tokens limit exceeded';
+    return;
+  end if;
+
+  -- Row lock on conflict makes increment-and-check atomic across requests
+  insert into ai_usage as u (user_id, period_start, calls_used, tokens_used)
+  values (p_user_id, p_day, 1, 0)
+  on conflict (user_id, period_start) do update
+    set calls_used = u.calls_used + 1,
+        updated_at = now()
+    where u.calls_used < p_max_calls
+  returning u.calls_used into v_calls;
+
+  if v_calls is null then
+    return query select false, p_max_calls, 0, 'Daily calls limit exceeded';
+  else
+    return query select true, v_calls, p_max_calls - v_calls, null::text;
+  end if;
+end;
+$$;
+
+-- 2. Add token usage for many (user, day) pairs at once
+--    p_entries: [{ "user_id": uuid, "day": "YYYY-MM-DD", "tokens": int }, ...]
+--    Entries must have tokens > 0; usage can only grow.
+create or replace function add_ai_tokens(p_entries jsonb)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if exists (
+    select 1 from jsonb_array_elements(p_entries) as e
+    where coalesce((e->>'tokens')::int, 0) <= 0
+  ) then
+    raise exception 'add_ai_tokens: tokens must be positive' using errcode = '22023';
+  end if;
+
+  insert into ai_usage as u (user_id, period_start, calls_used, tokens_used)
+  select (e->>'user_id')::uuid, (e->>'day')::date, 0, sum((e->>'tokens')::int)
+  from jsonb_array_elements(p_entries) as e
+  group by 1, 2
+  on conflict (user_id, period_start) do update
+    set tokens_used = u.tokens_used + excluded.tokens_used,
+        updated_at = now();
+end;
+$$;
+
+-- Functions are executable by PUBLIC by default; restrict to the service role
+revoke execute on function consume_ai_call(uuid, int, int, date) from public, anon, authenticated;
+revoke execute on function add_ai_tokens(jsonb) from public, anon, authenticated;
+grant execute on function consume_ai_call(uuid, int, int, date) to service_role;
+grant execute on function add_ai_tokens(jsonb) to service_role;
@@ -0,0 +1,122 @@
+-- Spiread: single post-run RPC
+-- Applies XP/level, streak and achievement unlocks for one finished game in
+-- one transaction, replacing the separate profile, streak and achievement
+-- reads and writes made by the client after every run.
+
+-- Uses the tables from supabase-tables.sql:
+--   profiles(user_id, xp, level), streaks(user_id, current, longest, last_activity_date),
+--   achievements(user_id, achievement_type, title, description, icon, unlocked_at)
+
+create index if not exists idx_achievements_user_type on achievements(user_id, achievement_type);
+
+-- p_candidates: achievements whose per-run rule passed on the client
+--   [{ "type": text, "title": text, "description": text, "icon": text, "min_streak": int|null }, ...]
+--   Entries with min_streak are only unlocked once the updated streak reaches it.
+create or replace function complete_game_run(
+  p_user_id uuid,
+  p_xp_gain int,
+  p_is_valid boolean,
+  p_candidates jsonb default '[]'::jsonb,
+  p_day date default current_date
+)
+returns table (
+  xp int,
+  level int,
+  level_up boolean,
+  streak_current int,
+  streak_longest int,
+  streak_increased boolean,
+  new_achievements jsonb,
+  unlocked_types text[]
+)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+  v_xp_gain int := case when p_is_valid then greatest(0, p_xp_gain) else 0 end;
+  v_old_xp int;
+  v_new_xp int;
+  v_old_current int;
+  v_last_day date;
+  v_current int;
+  v_longest int;
+  v_new jsonb := '[]'::jsonb;
+begin
+  -- security definer: callers may only update their own rows
+  if auth.uid() is not null and auth.uid() <> p_user_id then
+    raise exception 'complete_game_run: user mismatch' using errcode = '42501';
+  end if;
+
+  -- Lock the user's profile row first: concurrent runs of the same user
+  -- serialize here, so the streak and achievement checks below cannot race
+  select p.xp into v_old_xp from profiles p where p.user_id = p_user_id for update;
+
+  insert into profiles as p (user_id, xp, level, updated_at)
+  values (p_user_id, v_xp_gain, floor(v_xp_gain / 1000) + 1, now())
+  on conflict (user_id) do update
+    set xp = p.xp + v_xp_gain,
+        level = floor((p.xp + v_xp_gain) / 1000) + 1,
+        updated_at = now()
+  returning p.xp into v_new_xp;
+
+  -- Streak: same day keeps, consecutive day increments, gap restarts at 1;
+  -- an invalid run breaks the streak
+  select s.current, s.longest, s.last_activity_date
+    into v_old_current, v_longest, v_last_day
+  from streaks s where s.user_id = p_user_id for update;
+
+  if p_is_valid then
+    if v_last_day = p_day then
+      v_current := v_old_current;
+    elsif v_last_day = p_day - 1 then
+      v_current := v_old_current + 1;
+    else
+      v_current := 1;
+    end if;
+    v_longest := greatest(coalesce(v_longest, 0), v_current);
+  else
+    v_current := 0;
+    v_longest := coalesce(v_longest, 0);
+  end if;
+
+  insert into streaks as s (user_id, current, longest, last_activity_date, updated_at)
+  values (p_user_id, v_current, v_longest, p_day, now())
+  on conflict (user_id) do update
+    set current = excluded.current,
+        longest = excluded.longest,
+        last_activity_date = excluded.last_activity_date,
+        updated_at = now();
+
+  -- Achievements: insert candidates not yet unlocked, in one statement
+  if p_is_valid and jsonb_array_length(p_candidates) > 0 then
+    with inserted as (
+      insert into achievements (user_id, achievement_type, title, description, icon, unlocked_at)
+      select distinct on (c->>'type')
+        p_user_id, c->>'type', c->>'title', c->>'description', coalesce(c->>'icon', '🏆'), now()
+      from jsonb_array_elements(p_candidates) as c
+      where ((c->>'min_streak') is null or v_current >= (c->>'min_streak')::int)
+        and not exists (
+          select 1 from achievements a
+          where a.user_id = p_user_id and a.achievement_type = c->>'type'
+        )
+      returning achievement_type, title, description, icon, unlocked_at
+    )
+    select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_new from inserted;
+  end if;
+
+  return query
+  select
+    v_new_xp,
+    floor(v_new_xp / 1000)::int + 1,
+    v_old_xp is not null and floor(v_new_xp / 1000) > floor(v_old_xp / 1000),
+    v_current,
+    v_longest,
+    p_is_valid and v_current > coalesce(v_old_current, 0),
+    v_new,
+    array(select a.achievement_type from achievements a where a.user_id = p_user_id);
+end;
+$$;
+
+grant execute on function complete_game_run(uuid, int, boolean, jsonb, date) to authenticated, service_role;
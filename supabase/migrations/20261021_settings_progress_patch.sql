@@ -0,0 +1,34 @@
+-- Spiread: single-statement progress saves
+-- Merges one game's progress into settings.progress at the database instead of
+-- read-merge-upsert in the API route: one round trip, and concurrent saves
+-- for different games (or the same game) no longer overwrite each other.
+
+-- p_patch: the game's progress fields in storage format (snake_case keys);
+-- merged shallowly over progress[p_game], stamped with updated_at.
+-- Returns the merged progress[p_game].
+-- Runs as the caller (security invoker), so settings RLS applies as before.
+create or replace function save_game_progress(
+  p_user_id uuid,
+  p_game text,
+  p_patch jsonb
+)
+returns jsonb
+language sql
+set search_path = public
+as $$
+  insert into settings as s (user_id, progress, updated_at)
+  values (
+    p_user_id,
+    jsonb_build_object(p_game, p_patch || jsonb_build_object('updated_at', now())),
+    now()
+  )
+  on conflict (user_id) do update
+    set progress = coalesce(s.progress, '{}'::jsonb) || jsonb_build_object(
+          p_game,
+          coalesce(s.progress -> p_game, '{}'::jsonb) || p_patch || jsonb_build_object('updated_at', now())
+        ),
+        updated_at = now()
+  returning s.progress -> p_game;
+$$;
+
+grant execute on function save_game_progress(uuid, text, jsonb) to authenticated, service_role;
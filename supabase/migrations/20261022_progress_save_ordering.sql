@@ -0,0 +1,62 @@
+-- Spiread: ordered progress saves
+-- Offline saves are synced in batches, possibly long after newer saves for the
+-- same game reached the server. Each save now carries the client time it was
+-- recorded; a patch older than the stored one is ignored instead of rolling
+-- back last_level / last_best_score. last_best_score never decreases.
+
+drop function if exists save_game_progress(uuid, text, jsonb);
+
+-- p_client_updated_at: when the client recorded the progress; null stamps the
+-- save with the server time (online saves).
+-- Returns the stored progress[p_game], whether or not the patch was applied.
+-- Runs as the caller (security invoker), so settings RLS applies as before.
+create or replace function save_game_progress(
+  p_user_id uuid,
+  p_game text,
+  p_patch jsonb,
+  p_client_updated_at timestamptz default null
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+  v_recorded_at timestamptz := coalesce(p_client_updated_at, now());
+  v_progress jsonb;
+begin
+  insert into settings as s (user_id, progress, updated_at)
+  values (
+    p_user_id,
+    jsonb_build_object(
+      p_game,
+      p_patch || jsonb_build_object('updated_at', now(), 'client_updated_at', v_recorded_at)
+    ),
+    now()
+  )
+  on conflict (user_id) do update
+    set progress = coalesce(s.progress, '{}'::jsonb) || jsonb_build_object(
+          p_game,
+          coalesce(s.progress -> p_game, '{}'::jsonb)
+            || p_patch
+            || jsonb_strip_nulls(jsonb_build_object(
+                 'last_best_score', greatest(
+                   (s.progress -> p_game ->> 'last_best_score')::numeric,
+                   (p_patch ->> 'last_best_score')::numeric
+                 )
+               ))
+            || jsonb_build_object('updated_at', now(), 'client_updated_at', v_recorded_at)
+        ),
+        updated_at = now()
+    where coalesce((s.progress -> p_game ->> 'client_updated_at')::timestamptz, '-infinity') <= v_recorded_at
+  returning s.progress -> p_game into v_progress;
+
+  -- Older than the stored save: leave it and return what is stored
+  if not found then
+    select s.progress -> p_game into v_progress from settings s where s.user_id = p_user_id;
+  end if;
+
+  return v_progress;
+end;
+$$;
+
+grant execute on function save_game_progress(uuid, text, jsonb, timestamptz) to authenticated, service_role;
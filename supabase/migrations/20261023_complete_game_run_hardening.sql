@@ -0,0 +1,138 @@
+-- Spiread: harden complete_game_run
+-- The function is security definer, so it must not trust the browser:
+--   - only the signed-in user may complete their own runs (no anon, no null
+--     auth.uid() bypass)
+--   - XP per run is capped at 300, as in calculateXpGain
+--   - achievements come from a server-side list; the client only names the
+--     types whose per-run rule passed, and titles, icons and streak minimums
+--     are taken from the list
+--   - the streak day is the database's current_date, not a client value
+
+drop function if exists complete_game_run(uuid, int, boolean, jsonb, date);
+
+-- p_candidates: achievement types whose per-run rule passed on the client,
+--   as [{ "type": text }, ...]; unknown types are ignored
+create or replace function complete_game_run(
+  p_user_id uuid,
+  p_xp_gain int,
+  p_is_valid boolean,
+  p_candidates jsonb default '[]'::jsonb
+)
+returns table (
+  xp int,
+  level int,
+  level_up boolean,
+  streak_current int,
+  streak_longest int,
+  streak_increased boolean,
+  new_achievements jsonb,
+  unlocked_types text[]
+)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+  v_day date := current_date;
+  v_xp_gain int := case when p_is_valid then least(300, greatest(0, coalesce(p_xp_gain, 0))) else 0 end;
+  v_old_xp int;
+  v_new_xp int;
+  v_old_current int;
+  v_last_day date;
+  v_current int;
+  v_longest int;
+  v_new jsonb := '[]'::jsonb;
+begin
+  -- security definer: callers may only update their own rows
+  if auth.uid() is null or auth.uid() <> p_user_id then
+    raise exception 'complete_game_run: user mismatch' using errcode = '42501';
+  end if;
+
+  -- Lock the user's profile row first: concurrent runs of the same user
+  -- serialize here, so the streak and achievement checks below cannot race
+  select p.xp into v_old_xp from profiles p where p.user_id = p_user_id for update;
+
+  insert into profiles as p (user_id, xp, level, updated_at)
+  values (p_user_id, v_xp_gain, floor(v_xp_gain / 1000) + 1, now())
+  on conflict (user_id) do update
+    set xp = p.xp + v_xp_gain,
+        level = floor((p.xp + v_xp_gain) / 1000) + 1,
+        updated_at = now()
+  returning p.xp into v_new_xp;
+
+  -- Streak: same day keeps, consecutive day increments, gap restarts at 1;
+  -- an invalid run breaks the streak
+  select s.current, s.longest, s.last_activity_date
+    into v_old_current, v_longest, v_last_day
+  from streaks s where s.user_id = p_user_id for update;
+
+  if p_is_valid then
+    if v_last_day = v_day then
+      v_current := v_old_current;
+    elsif v_last_day = v_day - 1 then
+      v_current := v_old_current + 1;
+    else
+      v_current := 1;
+    end if;
+    v_longest := greatest(coalesce(v_longest, 0), v_current);
+  else
+    v_current := 0;
+    v_longest := coalesce(v_longest, 0);
+  end if;
+
+  insert into streaks as s (user_id, current, longest, last_activity_date, updated_at)
+  values (p_user_id, v_current, v_longest, v_day, now())
+  on conflict (user_id) do update
+    set current = excluded.current,
+        longest = excluded.longest,
+        last_activity_date = excluded.last_activity_date,
+        updated_at = now();
+
+  -- Achievements: allowed candidates not yet unlocked, in one statement.
+  -- Keep in sync with ACHIEVEMENT_RULES in lib/gamification.js.
+  if p_is_valid and jsonb_typeof(p_candidates) = 'array' and jsonb_array_length(p_candidates) > 0 then
+    with allowed (achievement_type, title, description, icon, min_streak) as (
+      values
+        ('first_run', 'Primer Entrenamiento', 'Completaste tu primera sesión de entrenamiento', '🎯', null::int),
+        ('week_streak_7', 'Constancia Semanal', 'Mantuviste una racha de 7 días', '🔥', 7),
+        ('speed_600_wpm', 'Velocidad Supersónica', 'Alcanzaste 600 WPM en lectura rápida', '⚡', null),
+        ('schulte_7x7', 'Maestro Schulte', 'Completaste una tabla Schulte 7x7', '🎯', null),
+        ('digits_7', 'Memoria Excepcional', 'Recordaste una secuencia de 7 dígitos', '🧠', null),
+        ('twinwords_90acc', 'Ojo de Águila', 'Logaste 90% de precisión en Twin Words', '👁️', null),
+        ('runningwords_lvl10', 'Memoria Secuencial', 'Alcanzaste nivel 10 en Running Words', '🏃', null),
+        ('letters_grid_15', 'Vista de Águila', 'Completaste una cuadrícula 15x15 en Letters Grid', '🎯', null),
+        ('wordsearch_10_words', 'Cazador de Palabras', 'Encontraste 10 o más palabras en una sola partida', '🔍', null),
+        ('anagram_7len', 'Descifrador Experto', 'Resolviste un anagrama de 7 o más letras', '🔤', null),
+        ('reading_quiz_5of5', 'Comprensión Perfecta', 'Acertaste 5 de 5 preguntas en el quiz de comprensión', '🧠', null)
+    ),
+    inserted as (
+      insert into achievements (user_id, achievement_type, title, description, icon, unlocked_at)
+      select p_user_id, d.achievement_type, d.title, d.description, d.icon, now()
+      from allowed d
+      where d.achievement_type in (select c->>'type' from jsonb_array_elements(p_candidates) as c)
+        and (d.min_streak is null or v_current >= d.min_streak)
+        and not exists (
+          select 1 from achievements a
+          where a.user_id = p_user_id and a.achievement_type = d.achievement_type
+        )
+      returning achievement_type, title, description, icon, unlocked_at
+    )
+    select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_new from inserted;
+  end if;
+
+  return query
+  select
+    v_new_xp,
+    floor(v_new_xp / 1000)::int + 1,
+    v_old_xp is not null and floor(v_new_xp / 1000) > floor(v_old_xp / 1000),
+    v_current,
+    v_longest,
+    p_is_valid and v_current > coalesce(v_old_current, 0),
+    v_new,
+    array(select a.achievement_type from achievements a where a.user_id = p_user_id);
+end;
+$$;
+
+revoke execute on function complete_game_run(uuid, int, boolean, jsonb) from public, anon;
+grant execute on function complete_game_run(uuid, int, boolean, jsonb) to authenticated, service_role;
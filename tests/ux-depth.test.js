@@ -17,7 +17,10 @@ import {
 import { 
   normalizeText, 
   compareTexts, 
-  matchesAnyAnswer 
+  matchesAnyAnswer,
+  getSuggestions,
+  boundedLevenshtein,
+  SPANISH_COMMON_WORDS
 } from '@/lib/text-normalize'
 import { 
   calculateQuizScore, 
@@ -107,6 +110,18 @@ describe('Spanish Text Normalization', () => {
     expect(compareTexts('CASA', 'casa')).toBe(true)
     expect(compareTexts('Mesa', 'MESA')).toBe(true)
   })
+  test('should suggest close dictionary words', () => {
+    expect(getSuggestions('corazn', SPANISH_COMMON_WORDS)[0]).toBe('corazón')
+    expect(getSuggestions('informacon', SPANISH_COMMON_WORDS)).toContain('información')
+    expect(getSuggestions('xyz', SPANISH_COMMON_WORDS)).toEqual([])
+  })
+
+  test('should stop edit distance early past the bound', () => {
+    expect(boundedLevenshtein('kitten', 'sitting')).toBe(3)
+    expect(boundedLevenshtein('kitten', 'sitting', 3)).toBe(3)
+    expect(boundedLevenshtein('kitten', 'sitting', 2)).toBe(3)
+    expect(boundedLevenshtein('casa', 'casamiento', 2)).toBe(3)
+  })
 })
 
 describe('RSVP Quiz System', () => {
@@ -0,0 +1,17 @@
+import { fileURLToPath } from 'url'
+
+// Unit tests only; Playwright specs in e2e/ and tests/smoke/ run with `yarn test:e2e`.
+// Plain object instead of defineConfig: vitest is run through npx and is not
+// a project dependency, so 'vitest/config' cannot be imported here.
+export default {
+  resolve: {
+    alias: {
+      '@': fileURLToPath(new URL('.', import.meta.url))
+    }
+  },
+  test: {
+    include: ['lib/**/*.test.{js,ts}', 'tests/*.test.js'],
+    environment: 'node',
+    globals: true
+  }
+}